@@ -1,23 +1,74 @@
 from fastapi import APIRouter, Depends, HTTPException
 import logging
 from fastapi.responses import StreamingResponse
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy import select
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, get_session_factory
+from app.core.versions import resource_versions
+from app.core.write_queue import WriteQueue, get_write_queue
 from app.schemas import ChatRequest, ChatResponse
-from app.models import Conversation, Message, Source
+from app.models import Conversation
 from app.services.search_service import SearchService
+from app.services.fallback_search import ALL_MODES, CrossSourceFallback
+from app.services.prefetch import follow_up_prefetcher
+from app.services.query_decomposition import decompose_query, search_sub_queries
 from app.services.llm_service import LLMService
+from app.services.chat_turn import ChatTurn
+from typing import Dict, List, Optional
 import json
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def _search_modes(request) -> List[str]:
+    """The focus modes a chat request searches first"""
+    if request.focus_modes:
+        return list(request.focus_modes)
+    # In Pro mode, expand across all modes for better diversity
+    return list(ALL_MODES) if request.pro_mode else [request.focus_mode]
+
+
+async def _focus_search(search_service: SearchService, request, modes: List[str], max_results: int) -> List[Dict]:
+    if request.pro_mode:
+        # Questions asking several things are searched part by part, in parallel
+        sub_queries = decompose_query(request.query, settings.pro_mode_sub_queries)
+        if len(sub_queries) > 1:
+            return await search_sub_queries(
+                search_service, sub_queries, modes, max_results, settings.pro_mode_search_deadline_seconds
+            )
+    if request.pro_mode or request.focus_modes:
+        return await search_service.search_across_modes(request.query, modes, max_results)
+    return await search_service.multi_source_search(request.query, max_results, request.focus_mode)
+
+
+def _prefetch_follow_ups(search_service: SearchService, request, modes: List[str], max_results: int,
+                         questions: List[str]) -> None:
+    """Warm the cache with the searches clicking each follow-up question would run"""
+    queries = questions
+    if request.pro_mode:
+        queries = [sub_query for question in questions
+                   for sub_query in decompose_query(question, settings.pro_mode_sub_queries)]
+    follow_up_prefetcher.submit(search_service, queries, modes, max_results)
+
+
+def _create_conversation(title: str, model_id: Optional[int]):
+    """Write operation that creates a conversation up front (the stream announces its id first)"""
+    async def operation(session: AsyncSession) -> Conversation:
+        conversation = Conversation(title=title, selected_model_id=model_id)
+        session.add(conversation)
+        await session.flush()
+        return conversation
+    return operation
+
+
 @router.post("/", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    sessions: async_sessionmaker = Depends(get_session_factory),
+    writer: WriteQueue = Depends(get_write_queue)
 ):
     """Process a chat query with AI response and sources"""
     
@@ -30,31 +81,24 @@ async def chat(
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
     else:
-        # Create new conversation with query as title
-        title = request.query[:100] + "..." if len(request.query) > 100 else request.query
-        conversation = Conversation(title=title, selected_model_id=request.model_id)
-        db.add(conversation)
-        await db.commit()
-        await db.refresh(conversation)
+        # New conversation with query as title; it is created together with the turn
+        conversation = None
     
-    # Save user message
-    user_message = Message(
-        conversation_id=conversation.id,
-        role="user",
-        content=request.query
+    # Stage the user message; the whole turn is written in one transaction at the end
+    title = request.query[:100] + "..." if len(request.query) > 100 else request.query
+    turn = ChatTurn(
+        request.query,
+        conversation_id=conversation.id if conversation else None,
+        title=title,
+        model_id=request.model_id
     )
-    db.add(user_message)
-    await db.commit()
     
-    search_service = SearchService(db)
+    # Short-lived sessions: the speculative fallback may search alongside the focus search
+    search_service = SearchService(writer=writer, session_factory=sessions)
     max_results = 15 if request.pro_mode else 10
-    if request.pro_mode and (not request.focus_modes or len(request.focus_modes) == 0):
-        # In Pro mode, expand across all modes for better diversity
-        search_results = await search_service.search_across_modes(request.query, ['web', 'social', 'academic'], max_results)
-    elif request.focus_modes and len(request.focus_modes) > 0:
-        search_results = await search_service.search_across_modes(request.query, request.focus_modes, max_results)
-    else:
-        search_results = await search_service.multi_source_search(request.query, max_results, request.focus_mode)
+    modes = _search_modes(request)
+    fallback = CrossSourceFallback(search_service, request.query, modes, max_results)
+    search_results = await fallback.primary(_focus_search(search_service, request, modes, max_results))
     
     # Evaluate result quality and perform smart fallback if needed
     llm_service = LLMService()
@@ -62,140 +106,106 @@ async def chat(
         await llm_service.set_model(request.model_id, db)
         # Ensure conversation reflects selected model
         if conversation and conversation.selected_model_id != request.model_id:
-            conversation.selected_model_id = request.model_id
-            db.add(conversation)
-            await db.commit()
+            turn.select_model(request.model_id)
     
     quality_eval = await llm_service._evaluate_result_quality(request.query, search_results)
     
-    # If results are insufficient, try searching all sources
+    # If results are insufficient, add the other sources (already searching when speculated)
     if not quality_eval["is_sufficient"]:
-        logger.info("Initial search quality insufficient (%.2f), trying cross-source fallback...", quality_eval['score'])
-        fallback_results = await search_service.search_all_sources(request.query, max_results)
-        
-        # Merge results, prioritizing original focus mode results
-        merged_results = search_results.copy()
-        seen_urls = {r.get('url', '') for r in merged_results}
-        
-        for result in fallback_results:
-            if result.get('url') not in seen_urls:
-                merged_results.append(result)
-                seen_urls.add(result.get('url', ''))
-        
-        search_results = merged_results[:max_results]
+        logger.info("Initial search quality insufficient (%.2f), using cross-source fallback...", quality_eval['score'])
+        # Merge and re-rank, so fallback results only displace weaker matches
+        search_results = await fallback.merge(search_results)
         logger.info("After fallback: %d total results", len(search_results))
+    else:
+        fallback.discard()
     
     # Generate AI response
     ai_response = await llm_service.generate_response(
         query=request.query,
         search_results=search_results,
-        conversation_id=conversation.id,
+        conversation_id=turn.conversation_id,
         db=db,
-        model_id=request.model_id
+        model_id=request.model_id,
+        staged_messages=turn.staged_messages
     )
     
-    assistant_message = Message(
-        conversation_id=conversation.id,
-        role="assistant",
-        content=ai_response["content"]
+    conversation_id, assistant_message, sources = await writer.submit(
+        turn.complete(ai_response["content"], search_results)
     )
-    sources = []
-    for result in search_results[:10]:
-        sources.append(
-            Source(
-                message_id=0,
-                title=result["title"],
-                url=result["url"],
-                snippet=result["snippet"],
-                source_type=result["source_type"]
-            )
-        )
-    db.add(assistant_message)
-    await db.flush()
-    for s in sources:
-        s.message_id = assistant_message.id
-        db.add(s)
-    await db.commit()
+    resource_versions.conversation_changed(conversation_id)
+    follow_up_questions = ai_response.get("follow_up_questions", [])
+    _prefetch_follow_ups(search_service, request, modes, max_results, follow_up_questions)
     
     return ChatResponse(
-        conversation_id=conversation.id,
+        conversation_id=conversation_id,
         message_id=assistant_message.id,
         content=ai_response["content"],
         sources=sources,
-        follow_up_questions=ai_response.get("follow_up_questions", [])
+        follow_up_questions=follow_up_questions
     )
 
 
 @router.post("/stream")
 async def chat_stream(
     request: ChatRequest,
-    db: AsyncSession = Depends(get_db)
+    sessions: async_sessionmaker = Depends(get_session_factory),
+    writer: WriteQueue = Depends(get_write_queue)
 ):
-    """Stream chat response using SSE"""
+    """Stream chat response using SSE
+
+    The stream runs for as long as the LLM takes, so it never holds a request-scoped
+    session: reads use short-lived sessions and writes go through the write queue.
+    """
     
     async def generate():
         try:
             # Get or create conversation
             if request.conversation_id:
-                result = await db.execute(
-                    select(Conversation).where(Conversation.id == request.conversation_id)
-                )
-                conversation = result.scalar_one_or_none()
+                async with sessions() as db:
+                    result = await db.execute(
+                        select(Conversation).where(Conversation.id == request.conversation_id)
+                    )
+                    conversation = result.scalar_one_or_none()
                 if not conversation:
                     yield f"data: {json.dumps({'error': 'Conversation not found'})}\n\n"
                     return
             else:
                 title = request.query[:100] + "..." if len(request.query) > 100 else request.query
-                conversation = Conversation(title=title, selected_model_id=request.model_id)
-                db.add(conversation)
-                await db.commit()
-                await db.refresh(conversation)
+                conversation = await writer.submit(_create_conversation(title, request.model_id))
+                resource_versions.conversation_changed(conversation.id)
             
             # Send conversation ID
             yield f"data: {json.dumps({'type': 'conversation_id', 'conversation_id': conversation.id})}\n\n"
             
-            # Save user message
-            user_message = Message(
-                conversation_id=conversation.id,
-                role="user",
-                content=request.query
-            )
-            db.add(user_message)
-            await db.commit()
+            # Stage the user message; the whole turn is written in one transaction at the end
+            turn = ChatTurn(request.query, conversation_id=conversation.id, model_id=request.model_id)
             
             # Perform search
             yield f"data: {json.dumps({'type': 'status', 'message': 'Searching...'})}\n\n"
-            search_service = SearchService(db)
+            search_service = SearchService(writer=writer, session_factory=sessions)
             max_results = 15 if request.pro_mode else 10
-            if request.pro_mode and (not request.focus_modes or len(request.focus_modes) == 0):
-                search_results = await search_service.search_across_modes(request.query, ['web', 'social', 'academic'], max_results)
-            elif request.focus_modes and len(request.focus_modes) > 0:
-                search_results = await search_service.search_across_modes(request.query, request.focus_modes, max_results)
-            else:
-                search_results = await search_service.multi_source_search(request.query, max_results, request.focus_mode)
+            modes = _search_modes(request)
+            fallback = CrossSourceFallback(search_service, request.query, modes, max_results)
+            search_results = await fallback.primary(_focus_search(search_service, request, modes, max_results))
             
             # Evaluate result quality and perform smart fallback if needed
             llm_service = LLMService()
             if request.model_id:
-                await llm_service.set_model(request.model_id, db)
+                async with sessions() as db:
+                    await llm_service.set_model(request.model_id, db)
+                # Ensure conversation reflects selected model
+                if conversation.selected_model_id != request.model_id:
+                    turn.select_model(request.model_id)
             
             quality_eval = await llm_service._evaluate_result_quality(request.query, search_results)
             
-            # If results are insufficient, try searching all sources
+            # If results are insufficient, add the other sources (already searching when speculated)
             if not quality_eval["is_sufficient"]:
                 yield f"data: {json.dumps({'type': 'status', 'message': 'Expanding search...'})}\n\n"
-                fallback_results = await search_service.search_all_sources(request.query, max_results)
-                
-                # Merge results, prioritizing original focus mode results
-                merged_results = search_results.copy()
-                seen_urls = {r.get('url', '') for r in merged_results}
-                
-                for result in fallback_results:
-                    if result.get('url') not in seen_urls:
-                        merged_results.append(result)
-                        seen_urls.add(result.get('url', ''))
-                
-                search_results = merged_results[:max_results]
+                # Merge and re-rank, so fallback results only displace weaker matches
+                search_results = await fallback.merge(search_results)
+            else:
+                fallback.discard()
             
             # Send sources
             yield f"data: {json.dumps({'type': 'sources', 'sources': search_results[:10]})}\n\n"
@@ -209,39 +219,22 @@ async def chat_stream(
                 query=request.query,
                 search_results=search_results,
                 conversation_id=conversation.id,
-                db=db,
-                model_id=request.model_id
+                model_id=request.model_id,
+                staged_messages=turn.staged_messages,
+                session_factory=sessions
             ):
                 full_content += chunk
                 yield f"data: {json.dumps({'type': 'content', 'content': chunk})}\n\n"
             
-            # Save assistant message
-            assistant_message = Message(
-                conversation_id=conversation.id,
-                role="assistant",
-                content=full_content
-            )
-            db.add(assistant_message)
-            await db.commit()
-            await db.refresh(assistant_message)
-            
-            # Save sources
-            for result in search_results[:10]:
-                source = Source(
-                    message_id=assistant_message.id,
-                    title=result["title"],
-                    url=result["url"],
-                    snippet=result["snippet"],
-                    source_type=result["source_type"]
-                )
-                db.add(source)
-            
-            await db.commit()
+            # Save the turn: user message, assistant message and its sources
+            _, assistant_message, _ = await writer.submit(turn.complete(full_content, search_results))
+            resource_versions.conversation_changed(conversation.id)
             
             # Generate and send follow-up questions
             try:
                 follow_up_questions = await llm_service._generate_follow_up_questions(request.query, full_content)
                 yield f"data: {json.dumps({'type': 'follow_up_questions', 'questions': follow_up_questions})}\n\n"
+                _prefetch_follow_ups(search_service, request, modes, max_results, follow_up_questions)
             except Exception as e:
                 logger.exception("Error generating follow-up questions")
             
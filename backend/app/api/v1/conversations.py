@@ -1,59 +1,351 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+import base64
+import binascii
+import json
 import logging
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
-from sqlalchemy.orm import joinedload
-from typing import List
-from app.core.database import get_db
-from app.models import Conversation, Message
-from app.schemas import Conversation as ConversationSchema, ConversationList, ConversationCreate
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import String, cast, desc, func, literal, select, tuple_, type_coerce
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.core.database import get_db, get_session_factory
+from app.core.versions import CONVERSATIONS, LLM_MODELS, conversation_key, resource_versions
+from app.core.write_queue import WriteQueue, get_write_queue
+from app.services.conversation_transfer import ImportFormatError, export_conversations, import_conversations
+from app.services.history_search import search_history
+from app.services.retention import delete_conversations
+from app.models import Conversation, LLMModel, Message, Source
+from app.schemas import (
+    Conversation as ConversationSchema, ConversationList, ConversationCreate, ConversationSearchHit, LLMModelResponse,
+    Message as MessageSchema, Source as SourceSchema
+)
+from app.utils.conditional import conditional_response, make_etag
+from app.utils.fast_json import (
+    StreamedArray, encode_array, encode_object, fast_json_enabled, json_stream_response, schema_fields
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+# Response header carrying the cursor of the next page; absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(timestamp_key: str, row_id: int) -> str:
+    payload = json.dumps([timestamp_key, row_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp_key, row_id = json.loads(payload)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(timestamp_key, str) or not isinstance(row_id, int):
+        raise ValueError("Invalid cursor")
+    return timestamp_key, row_id
+
+
+def _cursor_key(column):
+    """
+    The timestamp exactly as stored, so the next page resumes from the same value without a
+    datetime round-trip (SQLite keeps DATETIME as text and SQLAlchemy re-renders it differently)
+    """
+    return cast(column, String).label("cursor_key")
+
+
+def _before(column, id_column, cursor: Tuple[str, int], dialect: str):
+    """(column, id) < cursor, as a row-value comparison the composite indexes can range-scan"""
+    timestamp_key, row_id = cursor
+    if dialect == "sqlite":
+        after = type_coerce(timestamp_key, String)
+    else:
+        after = cast(literal(timestamp_key, String), column.type)
+    return tuple_(column, id_column) < tuple_(after, row_id)
+
+
+def _parse_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    try:
+        return decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def conversation_list_query(limit: int = 50, cursor: Optional[Tuple[str, int]] = None, dialect: str = "sqlite"):
+    """
+    One page of conversations, most recently updated first.
+
+    Keyset pagination on (updated_at, id), served by ix_conversations_updated_at_id, so
+    deep pages cost the same as the first. Only the columns the sidebar shows are loaded.
+    """
+    query = (
+        select(
+            Conversation.id,
+            Conversation.title,
+            Conversation.selected_model_id,
+            Conversation.created_at,
+            Conversation.updated_at,
+            Conversation.message_count,
+            Conversation.last_message_preview,
+            _cursor_key(Conversation.updated_at)
+        )
+        .order_by(desc(Conversation.updated_at), desc(Conversation.id))
+        .limit(limit)
+    )
+    if cursor is not None:
+        query = query.where(_before(Conversation.updated_at, Conversation.id, cursor, dialect))
+    return query
+
+
+def conversation_detail_query(conversation_id: int, include_messages: bool = True):
+    """
+    A conversation, optionally with its messages and their sources.
+
+    Messages and sources are loaded with one batched IN query each rather than a join,
+    which would return a row per message x source.
+    """
+    query = (
+        select(Conversation)
+        .options(joinedload(Conversation.selected_model))
+        .where(Conversation.id == conversation_id)
+    )
+    if include_messages:
+        query = query.options(selectinload(Conversation.messages).selectinload(Message.sources))
+    else:
+        # Never loaded: the handler sets an empty list, any other access raises
+        query = query.options(raiseload(Conversation.messages))
+    return query
+
+
+def message_page_query(
+    conversation_id: int,
+    limit: int = 50,
+    cursor: Optional[Tuple[str, int]] = None,
+    dialect: str = "sqlite",
+    columns_only: bool = False
+):
+    """
+    One page of a conversation's messages, newest first.
+
+    Keyset pagination on (created_at, id), served by ix_messages_conversation_id_created_at_id;
+    sources for the page are fetched with a single IN query. With columns_only the page is
+    plain Core rows and sources are left to the caller.
+    """
+    if columns_only:
+        query = select(*Message.__table__.columns, _cursor_key(Message.created_at))
+    else:
+        query = select(Message, _cursor_key(Message.created_at)).options(selectinload(Message.sources))
+    query = (
+        query
+        .where(Message.conversation_id == conversation_id)
+        .order_by(desc(Message.created_at), desc(Message.id))
+        .limit(limit)
+    )
+    if cursor is not None:
+        query = query.where(_before(Message.created_at, Message.id, cursor, dialect))
+    return query
+
+
+# Message ids per IN query when loading sources, well below SQLite's bound-parameter limit
+SOURCE_BATCH_SIZE = 500
+
+
+async def _source_documents(db: AsyncSession, message_ids: Sequence[int]) -> Dict[int, List[dict]]:
+    """Sources of the given messages as response documents, grouped by message id"""
+    sources: Dict[int, List[dict]] = {message_id: [] for message_id in message_ids}
+    for start in range(0, len(message_ids), SOURCE_BATCH_SIZE):
+        result = await db.execute(
+            select(Source.__table__)
+            .where(Source.message_id.in_(message_ids[start:start + SOURCE_BATCH_SIZE]))
+            .order_by(Source.id)
+        )
+        for row in result.mappings():
+            sources[row["message_id"]].append(schema_fields(SourceSchema, row))
+    return sources
+
+
+async def _message_documents(db: AsyncSession, rows: Sequence) -> List[dict]:
+    sources = await _source_documents(db, [row["id"] for row in rows])
+    return [schema_fields(MessageSchema, row, sources=sources[row["id"]]) for row in rows]
+
+
+async def _fast_conversation(db: AsyncSession, conversation_id: int, include_messages: bool, headers=None):
+    """get_conversation through the orjson fast path"""
+    conversation = (await db.execute(
+        select(Conversation.__table__).where(Conversation.id == conversation_id)
+    )).mappings().one_or_none()
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    selected_model = None
+    if conversation["selected_model_id"] is not None:
+        model = (await db.execute(
+            select(LLMModel.__table__).where(LLMModel.id == conversation["selected_model_id"])
+        )).mappings().one_or_none()
+        if model is not None:
+            selected_model = schema_fields(LLMModelResponse, model)
+
+    messages = []
+    if include_messages:
+        rows = (await db.execute(
+            select(Message.__table__)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at, Message.id)
+        )).mappings().all()
+        messages = await _message_documents(db, rows)
+
+    document = schema_fields(
+        ConversationSchema, conversation, messages=StreamedArray(messages), selected_model=selected_model
+    )
+    return json_stream_response(encode_object(document), headers)
+
+
 @router.get("/", response_model=List[ConversationList])
 async def get_conversations(
-    skip: int = 0,
-    limit: int = 50,
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all conversations"""
+    """Get conversations, newest first; pass the X-Next-Cursor header back as `cursor` for the next page"""
+    position = _parse_cursor(cursor)
     try:
+        # Any insert, delete or touched conversation changes the count or the newest updated_at
+        count, last_updated = (await db.execute(
+            select(func.count(Conversation.id), func.max(Conversation.updated_at))
+        )).one()
+        etag = make_etag(resource_versions.get(CONVERSATIONS), count, last_updated, request.url.query)
+        not_modified = conditional_response(request, response, etag, last_updated)
+        if not_modified:
+            return not_modified
+
+        # One extra row tells us whether another page exists
         result = await db.execute(
-            select(Conversation)
-            .options(joinedload(Conversation.selected_model))
-            .order_by(desc(Conversation.updated_at))
-            .offset(skip)
-            .limit(limit)
+            conversation_list_query(limit + 1, position, db.get_bind().dialect.name)
         )
-        conversations = result.unique().scalars().all()
-        
-        return conversations
+        rows = result.all()
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].cursor_key, rows[-1].id)
+
+        if fast_json_enabled():
+            documents = (schema_fields(ConversationList, row._mapping) for row in rows)
+            return json_stream_response(encode_array(documents), response.headers)
+        return rows
     except Exception as e:
         logger.exception("Error fetching conversations")
         raise HTTPException(status_code=500, detail=f"Error fetching conversations: {str(e)}")
 
 
+# Deepest result offset a search can page to; relevance ordering makes deep pages meaningless
+MAX_SEARCH_OFFSET = 1000
+
+
+@router.get("/search", response_model=List[ConversationSearchHit])
+async def search_conversations(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Full-text search over message content and conversation titles, best matches first"""
+    # The cursor is the offset of the next page, tied to the query it was issued for
+    offset = 0
+    if cursor:
+        cursor_query, offset = _parse_cursor(cursor)
+        if cursor_query != q or not 0 < offset <= MAX_SEARCH_OFFSET:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        hits = await search_history(db, q, limit + 1, offset)
+    except Exception as e:
+        logger.exception("Error searching conversations")
+        raise HTTPException(status_code=500, detail=f"Error searching conversations: {str(e)}")
+
+    if len(hits) > limit:
+        hits = hits[:limit]
+        if offset + limit <= MAX_SEARCH_OFFSET:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(q, offset + limit)
+    return hits
+
+
+@router.get("/export")
+async def export_history(sessions: async_sessionmaker = Depends(get_session_factory)):
+    """Stream every conversation, message and source as NDJSON"""
+    return StreamingResponse(
+        export_conversations(sessions),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="moplexity-conversations.ndjson"'}
+    )
+
+
+@router.post("/import")
+async def import_history(request: Request, writer: WriteQueue = Depends(get_write_queue)):
+    """Import an NDJSON export (streamed request body) as new conversations"""
+    try:
+        counts = await import_conversations(request.stream(), writer)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    resource_versions.bump(CONVERSATIONS)
+    return counts
+
+
 @router.get("/{conversation_id}", response_model=ConversationSchema)
 async def get_conversation(
     conversation_id: int,
+    request: Request,
+    response: Response,
+    include_messages: bool = True,
     db: AsyncSession = Depends(get_db)
 ):
-    """Get a specific conversation with all messages"""
+    """
+    Get a specific conversation with all messages.
+
+    With include_messages=false only the conversation itself is returned (messages is
+    empty); clients then lazy-load history from /{conversation_id}/messages.
+    """
     try:
-        result = await db.execute(
-            select(Conversation)
-            .options(
-                joinedload(Conversation.messages).joinedload(Message.sources),
-                joinedload(Conversation.selected_model)
+        # Row version: every chat turn bumps updated_at and message_count; the embedded
+        # model is covered by its own updated_at
+        version = (await db.execute(
+            select(
+                Conversation.updated_at,
+                Conversation.message_count,
+                Conversation.selected_model_id,
+                LLMModel.updated_at.label("model_updated_at")
             )
+            .outerjoin(LLMModel, LLMModel.id == Conversation.selected_model_id)
             .where(Conversation.id == conversation_id)
+        )).one_or_none()
+        if version is None:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+        etag = make_etag(
+            resource_versions.get(conversation_key(conversation_id)),
+            resource_versions.get(LLM_MODELS),
+            *version,
+            include_messages
         )
+        not_modified = conditional_response(request, response, etag, version.updated_at)
+        if not_modified:
+            return not_modified
+
+        if fast_json_enabled():
+            return await _fast_conversation(db, conversation_id, include_messages, response.headers)
+
+        result = await db.execute(conversation_detail_query(conversation_id, include_messages))
         conversation = result.unique().scalar_one_or_none()
         
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
+        if not include_messages:
+            set_committed_value(conversation, "messages", [])
         
         return conversation
     except HTTPException:
@@ -63,6 +355,42 @@ async def get_conversation(
         raise HTTPException(status_code=500, detail=f"Error fetching conversation: {str(e)}")
 
 
+@router.get("/{conversation_id}/messages", response_model=List[MessageSchema])
+async def get_messages(
+    conversation_id: int,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a page of messages with their sources, newest first; paginate with the X-Next-Cursor header"""
+    position = _parse_cursor(cursor)
+    try:
+        if position is None and await db.get(Conversation, conversation_id) is None:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+        fast = fast_json_enabled()
+        result = await db.execute(message_page_query(
+            conversation_id, limit + 1, position, db.get_bind().dialect.name, columns_only=fast
+        ))
+        rows = result.all()
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_id = rows[-1].id if fast else rows[-1].Message.id
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].cursor_key, last_id)
+
+        if fast:
+            documents = await _message_documents(db, [row._mapping for row in rows])
+            return json_stream_response(encode_array(documents), response.headers)
+        return [row.Message for row in rows]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error fetching messages for conversation %s", conversation_id)
+        raise HTTPException(status_code=500, detail=f"Error fetching messages: {str(e)}")
+
+
 @router.post("/", response_model=ConversationSchema)
 async def create_conversation(
     conversation: ConversationCreate,
@@ -72,25 +400,45 @@ async def create_conversation(
     db_conversation = Conversation(**conversation.dict())
     db.add(db_conversation)
     await db.commit()
-    await db.refresh(db_conversation)
-    return db_conversation
+    resource_versions.conversation_changed(db_conversation.id)
+
+    # Reload with relationships; lazy loading is not available while serializing
+    result = await db.execute(
+        conversation_detail_query(db_conversation.id).execution_options(populate_existing=True)
+    )
+    return result.unique().scalar_one()
+
+
+# Upper bound on ids per bulk delete request
+MAX_BULK_DELETE = 500
+
+
+@router.delete("/")
+async def delete_conversations_bulk(
+    ids: List[int] = Query(..., max_length=MAX_BULK_DELETE),
+    writer: WriteQueue = Depends(get_write_queue)
+):
+    """Delete several conversations (and their messages and sources) in one transaction"""
+    async def delete_all(session: AsyncSession) -> List[int]:
+        return await delete_conversations(session, ids)
+
+    deleted = await writer.submit(delete_all)
+    for conversation_id in deleted:
+        resource_versions.conversation_changed(conversation_id)
+    return {"deleted": len(deleted)}
 
 
 @router.delete("/{conversation_id}")
 async def delete_conversation(
     conversation_id: int,
-    db: AsyncSession = Depends(get_db)
+    writer: WriteQueue = Depends(get_write_queue)
 ):
     """Delete a conversation"""
-    result = await db.execute(
-        select(Conversation).where(Conversation.id == conversation_id)
-    )
-    conversation = result.scalar_one_or_none()
-    
-    if not conversation:
+    async def delete_one(session: AsyncSession) -> List[int]:
+        return await delete_conversations(session, [conversation_id])
+
+    if not await writer.submit(delete_one):
         raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    await db.delete(conversation)
-    await db.commit()
-    return {"message": "Conversation deleted successfully"}
 
+    resource_versions.conversation_changed(conversation_id)
+    return {"message": "Conversation deleted successfully"}
@@ -1,8 +1,9 @@
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Header
 from app.core.database import get_db
+from app.core.versions import LLM_MODELS, resource_versions
 from app.models import LLMModel
 from app.schemas import (
     LLMModelCreate,
@@ -11,7 +12,8 @@ from app.schemas import (
     LLMModelActiveResponse
 )
 from app.schemas.llm import infer_provider_type, LLMModelPublicResponse
-from app.core.config import settings
+from app.core.auth import require_admin
+from app.utils.conditional import conditional_response, make_etag
 
 router = APIRouter()
 
@@ -28,8 +30,17 @@ async def get_models(db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/models/active", response_model=List[LLMModelActiveResponse])
-async def get_active_models(db: AsyncSession = Depends(get_db)):
+async def get_active_models(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """Get all active LLM models for dropdown selection"""
+    # Adding, removing or editing a model changes the count or the newest updated_at
+    count, last_updated = (await db.execute(
+        select(func.count(LLMModel.id), func.max(LLMModel.updated_at))
+    )).one()
+    etag = make_etag(resource_versions.get(LLM_MODELS), count, last_updated)
+    not_modified = conditional_response(request, response, etag, last_updated)
+    if not_modified:
+        return not_modified
+
     result = await db.execute(
         select(LLMModel)
         .where(LLMModel.is_active == True)
@@ -39,20 +50,9 @@ async def get_active_models(db: AsyncSession = Depends(get_db)):
     return models
 
 
-def _require_admin(authorization: Optional[str]):
-    admin_token = getattr(settings, "admin_token", None)
-    if not admin_token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Admin token not configured")
-    token = None
-    if authorization and authorization.lower().startswith("bearer "):
-        token = authorization.split(" ", 1)[1]
-    if token == admin_token:
-        return
-    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-
 @router.post("/models", response_model=LLMModelPublicResponse, status_code=status.HTTP_201_CREATED)
 async def create_model(model: LLMModelCreate, db: AsyncSession = Depends(get_db), authorization: Optional[str] = Header(None)):
-    _require_admin(authorization)
+    require_admin(authorization)
     """Create a new LLM model"""
     # Check if model name already exists
     result = await db.execute(
@@ -74,6 +74,7 @@ async def create_model(model: LLMModelCreate, db: AsyncSession = Depends(get_db)
     db.add(db_model)
     await db.commit()
     await db.refresh(db_model)
+    resource_versions.bump(LLM_MODELS)
 
     return db_model
 
@@ -100,7 +101,7 @@ async def update_model(
     db: AsyncSession = Depends(get_db),
     authorization: Optional[str] = Header(None)
 ):
-    _require_admin(authorization)
+    require_admin(authorization)
     """Update an LLM model"""
     result = await db.execute(
         select(LLMModel).where(LLMModel.id == model_id)
@@ -140,13 +141,14 @@ async def update_model(
 
     await db.commit()
     await db.refresh(model)
+    resource_versions.bump(LLM_MODELS)
 
     return model
 
 
 @router.delete("/models/{model_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_model(model_id: int, db: AsyncSession = Depends(get_db), authorization: Optional[str] = Header(None)):
-    _require_admin(authorization)
+    require_admin(authorization)
     """Delete an LLM model"""
     result = await db.execute(
         select(LLMModel).where(LLMModel.id == model_id)
@@ -160,3 +162,4 @@ async def delete_model(model_id: int, db: AsyncSession = Depends(get_db), author
 
     await db.delete(model)
     await db.commit()
+    resource_versions.bump(LLM_MODELS)
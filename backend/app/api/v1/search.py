@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.auth import require_admin
 from app.core.database import get_db
-from app.schemas import SearchResponse
+from app.core.write_queue import WriteQueue, get_write_queue
+from app.schemas import ProviderStatsResponse, SearchResponse
+from app.services.fallback_search import speculation_budget
+from app.services.prefetch import follow_up_prefetcher
+from app.services.search_providers import provider_executor
 from app.services.search_service import SearchService
 
 router = APIRouter()
@@ -14,13 +19,14 @@ async def search(
     max_results: int = 10,
     focus_mode: str = 'web',
     modes: Optional[str] = None,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    writer: WriteQueue = Depends(get_write_queue)
 ):
     """Perform multi-source search"""
     if not query:
         raise HTTPException(status_code=400, detail="Query parameter is required")
     
-    search_service = SearchService(db)
+    search_service = SearchService(db, writer)
     if modes:
         try:
             parsed_modes = [m.strip() for m in modes.split(',') if m.strip()]
@@ -36,3 +42,17 @@ async def search(
         total_results=len(results)
     )
 
+
+
+@router.get("/providers/stats", response_model=ProviderStatsResponse)
+async def provider_stats(authorization: Optional[str] = Header(None)):
+    """Rolling per-mode provider statistics that order the search plans, and totals since startup (admin)"""
+    require_admin(authorization)
+    return ProviderStatsResponse(
+        deadline_seconds=provider_executor.deadline or None,
+        exploration_rate=provider_executor.exploration_rate,
+        modes=provider_executor.stats_snapshot(),
+        totals=[{"provider": name, **totals} for name, totals in provider_executor.snapshot().items()],
+        speculation=speculation_budget.as_dict(),
+        prefetch=follow_up_prefetcher.as_dict(),
+    )
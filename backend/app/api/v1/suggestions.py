@@ -3,7 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.core.database import get_db
 from app.models import LLMModel
-from app.services.llm_service import LLMService
+from app.services.llm_service import LLMService, get_litellm
 from pydantic import BaseModel
 from typing import List
 
@@ -43,8 +43,7 @@ async def get_suggestions(db: AsyncSession = Depends(get_db)):
 Make them thought-provoking, current, and cover different topics. 
 Return only the questions, one per line, without numbering or bullets."""
 
-        import litellm
-        response = await litellm.acompletion(
+        response = await get_litellm().acompletion(
             model=model.model_name,
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that generates engaging search questions."},
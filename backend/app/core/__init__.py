@@ -1,5 +1,8 @@
 from .config import settings
-from .database import get_db, init_db, AsyncSessionLocal
+from .database import get_db, get_session_factory, init_db, AsyncSessionLocal
+from .write_queue import WriteQueue, write_queue, get_write_queue
+from .versions import ResourceVersions, resource_versions
 
-__all__ = ["settings", "get_db", "init_db", "AsyncSessionLocal"]
+__all__ = ["settings", "get_db", "get_session_factory", "init_db", "AsyncSessionLocal", "WriteQueue", "write_queue", "get_write_queue",
+           "ResourceVersions", "resource_versions"]
 
@@ -0,0 +1,18 @@
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+
+def require_admin(authorization: Optional[str]):
+    """Reject the request unless it carries `Authorization: Bearer <ADMIN_TOKEN>`"""
+    admin_token = getattr(settings, "admin_token", None)
+    if not admin_token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Admin token not configured")
+    token = None
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization.split(" ", 1)[1]
+    if token == admin_token:
+        return
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
@@ -1,14 +1,107 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy import select
+from typing import Optional
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine, async_sessionmaker
+from sqlalchemy import select, event
+from sqlalchemy.engine import make_url
 from .config import settings
 from app.base import Base
 
+
+def async_database_url(database_url: str) -> str:
+    """Point plain PostgreSQL URLs (as most hosting providers hand them out) at asyncpg"""
+    for prefix in ("postgres://", "postgresql://"):
+        if database_url.startswith(prefix):
+            return "postgresql+asyncpg://" + database_url[len(prefix):]
+    return database_url
+
+
+def is_sqlite_file(database_url: str) -> bool:
+    """True for file-backed SQLite URLs (in-memory databases live in a single connection)"""
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def _sqlite_pragmas() -> list:
+    return [
+        # Must precede journal_mode so it applies when a new database file gets its first page
+        f"PRAGMA auto_vacuum={settings.sqlite_auto_vacuum}",
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}",
+        # Negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}",
+        f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}",
+        f"PRAGMA temp_store={settings.sqlite_temp_store}",
+    ]
+
+
+def _apply_sqlite_profile(engine: AsyncEngine, immediate_writes: bool) -> None:
+    pragmas = _sqlite_pragmas()
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        if immediate_writes:
+            # Let SQLAlchemy's begin event below control transactions instead of pysqlite
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    if immediate_writes:
+        @event.listens_for(engine.sync_engine, "begin")
+        def _on_begin(conn):
+            # Take the write lock when the transaction starts; a deferred transaction that
+            # upgrades later can fail with SQLITE_BUSY without waiting on busy_timeout
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def build_engine(
+    database_url: str,
+    *,
+    writer: bool = False,
+    performance_profile: Optional[bool] = None,
+) -> AsyncEngine:
+    """Create an async engine with the configured pool and, for SQLite, the performance profile.
+
+    SQLite allows a single writer, so the writer engine holds exactly one connection and opens
+    every transaction with BEGIN IMMEDIATE; WAL keeps the reader pool unblocked meanwhile.
+    """
+    if performance_profile is None:
+        performance_profile = settings.sqlite_performance_profile
+
+    database_url = async_database_url(database_url)
+    backend = make_url(database_url).get_backend_name()
+    engine_kwargs = {"echo": settings.debug, "future": True}
+    if backend != "sqlite":
+        # Server databases: one pool shared by readers and writers, checked before use
+        engine_kwargs.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=True,
+        )
+    elif is_sqlite_file(database_url):
+        if writer:
+            engine_kwargs.update(pool_size=1, max_overflow=0)
+        else:
+            engine_kwargs.update(pool_size=settings.db_pool_size, max_overflow=settings.db_max_overflow)
+        engine_kwargs["pool_timeout"] = settings.db_pool_timeout
+
+    new_engine = create_async_engine(database_url, **engine_kwargs)
+    if backend == "sqlite" and performance_profile:
+        _apply_sqlite_profile(new_engine, immediate_writes=writer)
+    return new_engine
+
+
 # Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    future=True
-)
+engine = build_engine(settings.database_url)
+
+# Dedicated writer for file-backed SQLite; other backends handle concurrent writers themselves
+if is_sqlite_file(settings.database_url) and settings.sqlite_performance_profile:
+    writer_engine = build_engine(settings.database_url, writer=True)
+else:
+    writer_engine = engine
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -17,6 +110,12 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+WriterSessionLocal = async_sessionmaker(
+    writer_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 
 # Dependency to get DB session
 async def get_db():
@@ -27,6 +126,12 @@ async def get_db():
             await session.close()
 
 
+# Dependency to get the session factory, for handlers that must not hold a session
+# (and its pooled connection) for the whole request, e.g. long-running streams
+def get_session_factory() -> async_sessionmaker:
+    return AsyncSessionLocal
+
+
 # Seed default data
 async def seed_default_data():
     """Seed default LLM models (optional - users should add models via LLM Settings page)"""
@@ -51,18 +156,10 @@ async def seed_default_data():
 
 # Initialize database
 async def init_db():
-    # Run migrations first to handle existing databases
+    # Versioned migrations create new databases and upgrade existing ones; a database
+    # already at head costs a single query here
     from app.utils.migrations import migrate_schema
-    try:
-        await migrate_schema(engine)
-    except Exception as e:
-        print(f"Migration warning: {e}")
-        # Continue even if migration has issues
-    
-    # Create all tables (for new databases or new tables)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await migrate_schema(engine)
 
     # Seed default data
     await seed_default_data()
-
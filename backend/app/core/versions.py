@@ -0,0 +1,36 @@
+"""
+In-memory version counters for conditional GETs.
+
+Write endpoints bump the counters of the resources they change and read endpoints fold
+them into their ETags, so a client revalidating with If-None-Match gets 304 Not Modified
+until something it depends on is written. Counters only see writes made by this process;
+ETags also include a cheap row version read from the database (updated_at, counts) so
+writes made by other workers invalidate them too.
+"""
+from typing import Dict
+
+CONVERSATIONS = "conversations"
+LLM_MODELS = "llm_models"
+
+
+def conversation_key(conversation_id: int) -> str:
+    return f"conversation:{conversation_id}"
+
+
+class ResourceVersions:
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+
+    def get(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def bump(self, *keys: str) -> None:
+        for key in keys:
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def conversation_changed(self, conversation_id: int) -> None:
+        """A conversation's messages, title or model changed; the list changes with it"""
+        self.bump(CONVERSATIONS, conversation_key(conversation_id))
+
+
+resource_versions = ResourceVersions()
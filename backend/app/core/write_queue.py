@@ -0,0 +1,134 @@
+"""
+Single-writer queue for database persistence.
+
+SQLite allows one writer at a time, so concurrent chat streams that each commit several
+small transactions end up fighting over the write lock. Writes are submitted here as
+operations and executed by one background task that commits them in groups: every
+operation waiting in the queue shares a single transaction (and a single fsync).
+Reads keep using regular sessions and stay concurrent.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import WriterSessionLocal
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# An operation receives the writer's session and must not commit it. It may be re-run
+# on its own if another operation in its group fails, so it should build the objects
+# it writes itself instead of reusing ones from a previous attempt.
+WriteOperation = Callable[[AsyncSession], Awaitable[T]]
+
+
+class WriteQueue:
+    """Serializes write operations through one task with group commit"""
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], max_batch: int = 64):
+        self._session_factory = session_factory
+        self._max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything already submitted, then stop the writer task"""
+        if not self.running:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    async def submit(self, operation: WriteOperation) -> Any:
+        """Run a write operation and wait until it has been committed.
+
+        Returns the operation's result. When the writer task is not running (scripts,
+        tests) the operation runs immediately in its own transaction.
+        """
+        if not self.running:
+            return await self._run_single(operation)
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, future))
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # Group commit: take whatever else queued up while the previous batch was committing
+            while len(batch) < self._max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._commit_batch(batch)
+            except Exception:
+                logger.exception("Write queue batch failed")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit_batch(self, batch: List[Tuple[WriteOperation, asyncio.Future]]) -> None:
+        pending = [(operation, future) for operation, future in batch if not future.cancelled()]
+        if not pending:
+            return
+
+        try:
+            async with self._session_factory() as session:
+                results = []
+                for operation, _ in pending:
+                    results.append(await operation(session))
+                await session.commit()
+        except Exception as exc:
+            if len(pending) == 1:
+                self._resolve(pending[0][1], error=exc)
+                return
+            # Something in the group failed; replay it one transaction per operation so
+            # only the offending caller sees the error
+            for operation, future in pending:
+                try:
+                    self._resolve(future, result=await self._run_single(operation))
+                except Exception as single_exc:
+                    self._resolve(future, error=single_exc)
+            return
+
+        for (_, future), result in zip(pending, results):
+            self._resolve(future, result=result)
+
+    async def _run_single(self, operation: WriteOperation) -> Any:
+        async with self._session_factory() as session:
+            result = await operation(session)
+            await session.commit()
+            return result
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+write_queue = WriteQueue(WriterSessionLocal)
+
+
+# Dependency to get the write queue
+def get_write_queue() -> WriteQueue:
+    return write_queue
@@ -1,9 +1,14 @@
 from fastapi import FastAPI
+import asyncio
 import logging
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.core.database import init_db
+from app.core.write_queue import write_queue
+from app.services.llm_service import prewarm_litellm
+from app.services.prefetch import follow_up_prefetcher
+from app.services.retention import build_retention_job
 from app.api.v1 import chat, search, conversations, llm_config, suggestions
 
 
@@ -11,8 +16,21 @@ from app.api.v1 import chat, search, conversations, llm_config, suggestions
 async def lifespan(app: FastAPI):
     # Startup: Initialize database
     await init_db()
+    await write_queue.start()
+    # Retention only runs when a limit (conversations or local knowledge) is configured
+    retention_job = build_retention_job(write_queue)
+    await retention_job.start()
+    # Follow-up prefetch is opt-in (PREFETCH_FOLLOW_UPS); start() is a no-op otherwise
+    await follow_up_prefetcher.start()
+    # LiteLLM is imported lazily; optionally warm it up without delaying readiness
+    prewarm_task = asyncio.create_task(prewarm_litellm()) if settings.litellm_prewarm else None
     yield
     # Shutdown: cleanup if needed
+    if prewarm_task and not prewarm_task.done():
+        prewarm_task.cancel()
+    await follow_up_prefetcher.stop()
+    await retention_job.stop()
+    await write_queue.stop()
 
 
 app = FastAPI(
@@ -41,6 +59,7 @@ app.add_middleware(
     allow_credentials=allow_credentials,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[conversations.NEXT_CURSOR_HEADER],
 )
 
 # Include routers
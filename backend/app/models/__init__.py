@@ -3,12 +3,14 @@ from .message import Message
 from .source import Source
 from .search_cache import SearchCache
 from .llm import LLMModel
+from .knowledge import KnowledgeEntry
 
 __all__ = [
     "Conversation",
     "Message",
     "Source",
     "SearchCache",
-    "LLMModel"
+    "LLMModel",
+    "KnowledgeEntry"
 ]
 
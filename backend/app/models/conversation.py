@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.base import Base
@@ -6,14 +6,24 @@ from app.base import Base
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Conversation list: ORDER BY updated_at DESC, id as tie-breaker
+        Index("ix_conversations_updated_at_id", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(500), nullable=False)
     selected_model_id = Column(Integer, ForeignKey("llm_models.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    # Denormalized for the conversation list; maintained by ChatTurn on every write
+    message_count = Column(Integer, nullable=False, server_default="0")
+    last_message_preview = Column(Text, nullable=True)
 
     # Relationships
-    messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
+    messages = relationship(
+        "Message", back_populates="conversation", cascade="all, delete-orphan",
+        order_by="(Message.created_at, Message.id)"
+    )
     selected_model = relationship("LLMModel", back_populates="conversations")
 
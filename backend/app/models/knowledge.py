@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.base import Base
+
+
+class KnowledgeEntry(Base):
+    """A search result we have already fetched, once per canonical URL; searched by the local provider"""
+    __tablename__ = "knowledge_entries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # canonical_url(url); refreshed results overwrite the entry instead of adding another
+    url_key = Column(String(2048), nullable=False, unique=True)
+    url = Column(Text, nullable=False)
+    title = Column(String(500), nullable=False)
+    snippet = Column(Text)
+    source_type = Column(String(50), nullable=False)
+    # When a provider last returned this URL; drives the recency weighting of local results
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.base import Base
@@ -6,7 +6,11 @@ from app.base import Base
 
 class Message(Base):
     __tablename__ = "messages"
-    
+    __table_args__ = (
+        # History loads: WHERE conversation_id = ? ORDER BY created_at, id
+        Index("ix_messages_conversation_id_created_at_id", "conversation_id", "created_at", "id"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"))
     role = Column(String(50), nullable=False)  # 'user' or 'assistant'
@@ -15,5 +19,5 @@ class Message(Base):
     
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
-    sources = relationship("Source", back_populates="message", cascade="all, delete-orphan")
+    sources = relationship("Source", back_populates="message", cascade="all, delete-orphan", order_by="Source.id")
 
@@ -1,4 +1,5 @@
 from sqlalchemy import Column, Integer, String, JSON, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from app.base import Base
 
@@ -7,7 +8,8 @@ class SearchCache(Base):
     __tablename__ = "search_cache"
 
     id = Column(Integer, primary_key=True, index=True)
-    query = Column(String(500), nullable=False, index=True)
-    results_json = Column(JSON, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # One row per cache key; writes upsert with ON CONFLICT (query)
+    query = Column(String(500), nullable=False, unique=True, index=True)
+    results_json = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
@@ -8,7 +8,7 @@ class Source(Base):
     __tablename__ = "sources"
     
     id = Column(Integer, primary_key=True, index=True)
-    message_id = Column(Integer, ForeignKey("messages.id", ondelete="CASCADE"))
+    message_id = Column(Integer, ForeignKey("messages.id", ondelete="CASCADE"), index=True)
     title = Column(String(500), nullable=False)
     url = Column(Text, nullable=False)
     snippet = Column(Text)
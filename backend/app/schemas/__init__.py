@@ -1,6 +1,6 @@
 from .chat import ChatRequest, ChatResponse
-from .search import SearchResult, SearchResponse
-from .conversation import Conversation, ConversationCreate, ConversationList
+from .search import SearchResult, SearchResponse, ProviderModeStats, ProviderTotals, ProviderStatsResponse
+from .conversation import Conversation, ConversationCreate, ConversationList, ConversationSearchHit
 from .message import Message, MessageCreate
 from .source import Source, SourceCreate
 from .llm import (
@@ -9,8 +9,8 @@ from .llm import (
 
 __all__ = [
     "ChatRequest", "ChatResponse",
-    "SearchResult", "SearchResponse",
-    "Conversation", "ConversationCreate", "ConversationList",
+    "SearchResult", "SearchResponse", "ProviderModeStats", "ProviderTotals", "ProviderStatsResponse",
+    "Conversation", "ConversationCreate", "ConversationList", "ConversationSearchHit",
     "Message", "MessageCreate",
     "Source", "SourceCreate",
     "LLMModelBase", "LLMModelCreate", "LLMModelUpdate", "LLMModelResponse", "LLMModelActiveResponse"
@@ -1,13 +1,8 @@
 from pydantic import BaseModel
-from typing import List, Optional, TYPE_CHECKING
+from typing import List, Optional
 from datetime import datetime
-
-if TYPE_CHECKING:
-    from .llm import LLMModelResponse
-    from .message import Message
-else:
-    from .llm import LLMModelResponse
-    Message = "Message"
+from .llm import LLMModelResponse
+from .message import Message
 
 
 class ConversationBase(BaseModel):
@@ -23,7 +18,7 @@ class Conversation(ConversationBase):
     id: int
     created_at: datetime
     updated_at: datetime
-    messages: List["Message"] = []
+    messages: List[Message] = []
     selected_model: Optional[LLMModelResponse] = None
 
     class Config:
@@ -31,13 +26,27 @@ class Conversation(ConversationBase):
 
 
 class ConversationList(BaseModel):
+    """Sidebar entry; built from a column-only projection"""
     id: int
     title: str
     selected_model_id: Optional[int] = None
     created_at: datetime
     updated_at: datetime
-    selected_model: Optional[LLMModelResponse] = None
+    message_count: int = 0
+    last_message_preview: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+
+
+class ConversationSearchHit(BaseModel):
+    """A message or conversation title matching a history search"""
+    conversation_id: int
+    conversation_title: str
+    message_id: Optional[int] = None
+    role: Optional[str] = None
+    created_at: Optional[datetime] = None
+    # HTML-escaped, with the matched words wrapped in <mark>
+    snippet: str
+    score: float
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List, Optional
 
 
 class SearchResult(BaseModel):
@@ -14,3 +14,39 @@ class SearchResponse(BaseModel):
     results: List[SearchResult]
     total_results: int
 
+
+
+class ProviderModeStats(BaseModel):
+    """Rolling statistics of one provider in one focus mode"""
+    mode: str
+    provider: str
+    samples: int
+    latency_seconds: float
+    error_rate: float
+    mean_yield: float
+    # unsampled, healthy, degraded (asked last) or failing (skipped unless exploring)
+    state: str
+
+
+class ProviderTotals(BaseModel):
+    """Counters since startup for one provider"""
+    provider: str
+    calls: int
+    failures: int
+    timeouts: int
+    results: int
+    mean_latency: float
+    mean_yield: float
+    cost: float
+    cached_misses: int
+
+
+class ProviderStatsResponse(BaseModel):
+    deadline_seconds: Optional[float]
+    exploration_rate: float
+    modes: List[ProviderModeStats]
+    totals: List[ProviderTotals]
+    # Chat's speculative cross-source fallbacks: in flight, started, used, discarded
+    speculation: Dict[str, int]
+    # Follow-up prefetch: queued, completed, dropped (load, strained providers, budget), cancelled
+    prefetch: Dict[str, int]
@@ -0,0 +1,114 @@
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Conversation, Message, Source
+
+# Characters of the latest message kept on the conversation for the sidebar
+PREVIEW_LENGTH = 200
+
+
+def message_preview(content: str) -> str:
+    """Single-line, truncated form of a message for conversation lists"""
+    return " ".join(content.split())[:PREVIEW_LENGTH]
+
+
+class ChatTurn:
+    """Unit of work for one chat turn.
+
+    The user message is staged in memory when the turn starts (the history query sees it
+    through `staged_messages`) and is written together with the assistant message, its
+    sources and any model change in a single transaction once the answer is ready.
+    """
+
+    def __init__(
+        self,
+        query: str,
+        conversation_id: Optional[int] = None,
+        title: Optional[str] = None,
+        model_id: Optional[int] = None
+    ):
+        self.query = query
+        self.conversation_id = conversation_id
+        self.title = title
+        self.model_id = model_id
+        self.model_changed = False
+        self.user_message = Message(conversation_id=conversation_id, role="user", content=query)
+
+    @property
+    def staged_messages(self) -> List[Message]:
+        """Messages of this turn that are not in the database yet"""
+        return [self.user_message]
+
+    def select_model(self, model_id: int) -> None:
+        """Record a model switch to persist with the turn"""
+        self.model_id = model_id
+        self.model_changed = True
+
+    def complete(self, content: str, search_results: List[Dict], max_sources: int = 10):
+        """Build the write operation that persists the whole turn.
+
+        The operation returns (conversation_id, assistant_message, sources).
+        The conversation's message_count, last_message_preview and updated_at are
+        refreshed in the same transaction.
+        """
+        source_rows = [
+            {
+                "title": result["title"],
+                "url": result["url"],
+                "snippet": result["snippet"],
+                "source_type": result["source_type"]
+            }
+            for result in search_results[:max_sources]
+        ]
+
+        preview = message_preview(content)
+
+        async def operation(session: AsyncSession) -> Tuple[int, Message, List[Source]]:
+            conversation_id = self.conversation_id
+            if conversation_id is None:
+                conversation_id = await session.scalar(
+                    insert(Conversation)
+                    .values(
+                        title=self.title,
+                        selected_model_id=self.model_id,
+                        message_count=2,
+                        last_message_preview=preview
+                    )
+                    .returning(Conversation.id)
+                )
+            else:
+                values = {
+                    "message_count": Conversation.message_count + 2,
+                    "last_message_preview": preview,
+                    "updated_at": func.now()
+                }
+                if self.model_changed:
+                    values["selected_model_id"] = self.model_id
+                await session.execute(
+                    update(Conversation).where(Conversation.id == conversation_id).values(**values)
+                )
+
+            # One multi-row INSERT ... VALUES per table. Ids are assigned in VALUES order, so
+            # sorting the returned rows on id restores it (SQLite's RETURNING order is not
+            # guaranteed, and executemany with ordered RETURNING is one statement per row there).
+            messages = await _insert_rows(session, Message, [
+                {"conversation_id": conversation_id, "role": "user", "content": self.query},
+                {"conversation_id": conversation_id, "role": "assistant", "content": content},
+            ])
+            assistant_message = messages[-1]
+
+            sources: List[Source] = []
+            if source_rows:
+                sources = await _insert_rows(
+                    session, Source, [{**row, "message_id": assistant_message.id} for row in source_rows]
+                )
+
+            return conversation_id, assistant_message, sources
+
+        return operation
+
+
+async def _insert_rows(session: AsyncSession, model, rows: List[Dict]) -> list:
+    """Insert rows with a single statement; returns the new objects in row order"""
+    inserted = (await session.scalars(insert(model).values(rows).returning(model))).all()
+    return sorted(inserted, key=lambda row: row.id)
@@ -0,0 +1,271 @@
+"""
+NDJSON export and import of conversation history.
+
+The export is one line per record, grouped so each conversation line is followed by its
+messages and each message line by its sources:
+
+    {"type": "conversation", "id": 1, "title": ..., ...}
+    {"type": "message", "id": 10, "conversation_id": 1, ...}
+    {"type": "source", "id": 7, "message_id": 10, ...}
+
+It is produced from a single server-side cursor over conversations joined to messages
+and sources, so memory stays constant however large the database is. Import assigns new
+ids and inserts in batches; because of the grouping it only has to remember the ids of the
+current conversation and message, plus those of the batch being written. Nothing is written
+until the whole stream has been checked: it is spooled (to disk past IMPORT_SPOOL_BYTES)
+while every line is validated, then replayed into the database, so a malformed line
+anywhere leaves the database untouched.
+"""
+import json
+import tempfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import DateTime, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.write_queue import WriteQueue
+from app.models import Conversation, LLMModel, Message, Source
+
+# Rows fetched per round trip from the export cursor
+EXPORT_FETCH_SIZE = 1000
+# Encoded bytes collected before a chunk of the export is yielded
+EXPORT_CHUNK_BYTES = 64 * 1024
+# Records (conversations + messages + sources) written per import transaction
+IMPORT_BATCH_SIZE = 2000
+# Import stream kept in memory while it is validated; the rest is spooled to a temporary file
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+_TABLES = (("conversation", Conversation.__table__), ("message", Message.__table__), ("source", Source.__table__))
+
+
+class ImportFormatError(ValueError):
+    """A line of the import stream is not a record produced by the export"""
+
+
+def _export_query():
+    columns = [column for _, table in _TABLES for column in table.columns]
+    return (
+        select(*columns)
+        .select_from(Conversation)
+        .outerjoin(Message, Message.conversation_id == Conversation.id)
+        .outerjoin(Source, Source.message_id == Message.id)
+        .order_by(Conversation.id, Message.created_at, Message.id, Source.id)
+        .execution_options(yield_per=EXPORT_FETCH_SIZE)
+    )
+
+
+def _row_slices() -> List[Tuple[str, List[str], slice]]:
+    """(record type, column names, position in an export row) for each table"""
+    slices, start = [], 0
+    for kind, table in _TABLES:
+        names = [column.name for column in table.columns]
+        slices.append((kind, names, slice(start, start + len(names))))
+        start += len(names)
+    return slices
+
+
+def _encode(kind: str, names: List[str], values) -> bytes:
+    record = {"type": kind}
+    for name, value in zip(names, values):
+        record[name] = value.isoformat() if isinstance(value, datetime) else value
+    return json.dumps(record, ensure_ascii=False).encode() + b"\n"
+
+
+async def export_conversations(session_factory: async_sessionmaker) -> AsyncIterator[bytes]:
+    """Yield the whole conversation history as NDJSON chunks"""
+    conversations, messages, sources = _row_slices()
+    # The primary key is the first column of each table
+    conversation_key, message_key, source_key = (part.start for _, _, part in (conversations, messages, sources))
+
+    conversation_id = message_id = None
+    buffer = bytearray()
+    async with session_factory() as session:
+        result = await session.stream(_export_query())
+        async for partition in result.partitions():
+            for row in partition:
+                if row[conversation_key] != conversation_id:
+                    conversation_id, message_id = row[conversation_key], None
+                    buffer += _encode(conversations[0], conversations[1], row[conversations[2]])
+                if row[message_key] is not None and row[message_key] != message_id:
+                    message_id = row[message_key]
+                    buffer += _encode(messages[0], messages[1], row[messages[2]])
+                if row[source_key] is not None:
+                    buffer += _encode(sources[0], sources[1], row[sources[2]])
+            if len(buffer) >= EXPORT_CHUNK_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    yield pending
+
+
+async def _spooled(chunks: AsyncIterator[bytes], spool) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        spool.write(chunk)
+        yield chunk
+
+
+async def _replay(spool) -> AsyncIterator[bytes]:
+    spool.seek(0)
+    while chunk := spool.read(EXPORT_CHUNK_BYTES):
+        yield chunk
+
+
+def _values(table, record: Dict[str, Any], skip: Tuple[str, ...]) -> Dict[str, Any]:
+    values = {}
+    for column in table.columns:
+        if column.name in skip or column.name not in record:
+            continue
+        value = record[column.name]
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        values[column.name] = value
+    return values
+
+
+class _ImportBatch:
+    """Records waiting to be inserted, keyed by the ids they had in the export"""
+
+    def __init__(self):
+        self.conversations: List[Tuple[int, Dict]] = []
+        self.messages: List[Tuple[int, int, Dict]] = []
+        self.sources: List[Tuple[int, Dict]] = []
+
+    def __len__(self) -> int:
+        return len(self.conversations) + len(self.messages) + len(self.sources)
+
+
+class ConversationImporter:
+    """Validates an export stream, then inserts it through the write queue, one transaction per batch"""
+
+    def __init__(self, writer: WriteQueue, batch_size: int = IMPORT_BATCH_SIZE):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.counts = {"conversations": 0, "messages": 0, "sources": 0}
+        self._batch = _ImportBatch()
+        # Export id -> new id, for records already written that later lines may still reference
+        self._conversation_ids: Dict[int, int] = {}
+        self._message_ids: Dict[int, int] = {}
+        self._model_ids: Optional[set] = None
+        self._last_conversation: Optional[int] = None
+        self._last_message: Optional[int] = None
+
+    async def run(self, chunks: AsyncIterator[bytes]) -> Dict[str, int]:
+        self._model_ids = set(await self.writer.submit(self._existing_models))
+        with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as spool:
+            # First pass: check every line, keeping a copy of the stream; nothing is written
+            await self._add_lines(_spooled(chunks, spool), self._discard)
+            await self._discard()
+            self._last_conversation = self._last_message = None
+            await self._add_lines(_replay(spool), self._flush)
+        await self._flush()
+        return self.counts
+
+    async def _add_lines(self, chunks: AsyncIterator[bytes], batch_full: Callable) -> None:
+        line_number = 0
+        async for line in _lines(chunks):
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                self._add(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                raise ImportFormatError(f"Invalid record on line {line_number}: {e}") from e
+            if len(self._batch) >= self.batch_size:
+                await batch_full()
+
+    async def _discard(self) -> None:
+        self._batch = _ImportBatch()
+
+    @staticmethod
+    async def _existing_models(session: AsyncSession) -> List[int]:
+        return (await session.scalars(select(LLMModel.id))).all()
+
+    def _add(self, record: Dict[str, Any]) -> None:
+        kind = record["type"]
+        if kind == "conversation":
+            values = _values(Conversation.__table__, record, skip=("id",))
+            # Model ids are local to each database; unknown ones fall back to the default model
+            if values.get("selected_model_id") not in self._model_ids:
+                values["selected_model_id"] = None
+            self._batch.conversations.append((record["id"], values))
+            self._last_conversation = record["id"]
+        elif kind == "message":
+            if record["conversation_id"] != self._last_conversation:
+                raise ValueError("message does not follow its conversation")
+            values = _values(Message.__table__, record, skip=("id", "conversation_id"))
+            self._batch.messages.append((record["id"], record["conversation_id"], values))
+            self._last_message = record["id"]
+        elif kind == "source":
+            if record["message_id"] != self._last_message:
+                raise ValueError("source does not follow its message")
+            values = _values(Source.__table__, record, skip=("id", "message_id"))
+            self._batch.sources.append((record["message_id"], values))
+        else:
+            raise ValueError(f"unknown record type {kind!r}")
+
+    async def _flush(self) -> None:
+        batch, self._batch = self._batch, _ImportBatch()
+        if not len(batch):
+            return
+        await self.writer.submit(self._write(batch))
+        self.counts["conversations"] += len(batch.conversations)
+        self.counts["messages"] += len(batch.messages)
+        self.counts["sources"] += len(batch.sources)
+        # Only the current conversation and message can still be referenced by later lines
+        self._conversation_ids = {
+            key: value for key, value in self._conversation_ids.items() if key == self._last_conversation
+        }
+        self._message_ids = {key: value for key, value in self._message_ids.items() if key == self._last_message}
+
+    def _write(self, batch: _ImportBatch) -> Callable:
+        async def operation(session: AsyncSession) -> None:
+            # Ids are resolved into local copies so a replayed operation starts from the same state
+            conversation_ids = dict(self._conversation_ids)
+            message_ids = dict(self._message_ids)
+            if batch.conversations:
+                new_ids = await _insert_returning_ids(session, Conversation, [values for _, values in batch.conversations])
+                conversation_ids.update(zip((old for old, _ in batch.conversations), new_ids))
+            if batch.messages:
+                new_ids = await _insert_returning_ids(session, Message, [
+                    {**values, "conversation_id": conversation_ids[conversation_id]}
+                    for _, conversation_id, values in batch.messages
+                ])
+                message_ids.update(zip((old for old, _, _ in batch.messages), new_ids))
+            if batch.sources:
+                await session.execute(insert(Source), [
+                    {**values, "message_id": message_ids[message_id]} for message_id, values in batch.sources
+                ])
+            self._conversation_ids, self._message_ids = conversation_ids, message_ids
+
+        return operation
+
+
+async def _insert_returning_ids(session: AsyncSession, model, rows: List[Dict]) -> List[int]:
+    """Insert rows and return their new ids in row order"""
+    if session.get_bind().dialect.name == "sqlite":
+        # SQLite only guarantees RETURNING order one row per statement. Writes are serialized
+        # (the writer holds the database lock for the whole transaction), so hand out the ids
+        # after the current maximum and insert in one executemany instead.
+        start = (await session.scalar(select(func.max(model.id)))) or 0
+        ids = list(range(start + 1, start + 1 + len(rows)))
+        await session.execute(insert(model), [{**row, "id": new_id} for row, new_id in zip(rows, ids)])
+        return ids
+    return (await session.scalars(
+        insert(model).returning(model.id, sort_by_parameter_order=True), rows
+    )).all()
+
+
+async def import_conversations(chunks: AsyncIterator[bytes], writer: WriteQueue) -> Dict[str, int]:
+    """Insert an NDJSON export; returns how many conversations, messages and sources were added"""
+    return await ConversationImporter(writer).run(chunks)
@@ -0,0 +1,83 @@
+"""
+Duplicate collapsing for merged search results.
+
+Two results are duplicates when their URLs share a canonical form (canonical_url) or when
+their snippets are near-identical, as with the same article syndicated across sites.
+Snippets are compared by 64-bit SimHash over word shingles: near-identical texts differ in
+only a few bits. Fingerprints are split into bands, and two fingerprints within
+MAX_DISTANCE bits agree exactly on at least one band (pigeonhole), so each result is only
+compared with results sharing a band bucket and the whole pass stays linear in the
+number of candidates in practice.
+"""
+import hashlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.utils.text import tokenize
+from app.utils.urls import canonical_url
+
+# Words per shingle; snippets are short, and longer shingles let a single changed word
+# flip too many bits
+SHINGLE_SIZE = 2
+# Snippets shorter than this (in words) carry too little text to call near-duplicates
+MIN_WORDS = 8
+# Fingerprints differing in at most this many of 64 bits are near-duplicates
+MAX_DISTANCE = 8
+# MAX_DISTANCE + 1 bands, so at least one band is untouched by the differing bits
+BANDS = MAX_DISTANCE + 1
+_BAND_BITS = 64 // BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+_BIT_WEIGHTS = np.uint64(1) << np.arange(64, dtype=np.uint64)
+
+
+def _shingle_hash(shingle: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "little")
+
+
+def simhash(text: Optional[str]) -> Optional[int]:
+    """64-bit SimHash of the text's word shingles, or None when the text is too short to judge"""
+    words = tokenize(text)
+    if len(words) < MIN_WORDS:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    hashes = np.array([_shingle_hash(shingle) for shingle in shingles], dtype=np.uint64)
+    # Each bit is set when most shingle hashes have it set
+    bits = (hashes[:, None] & _BIT_WEIGHTS) != 0
+    majority = bits.sum(axis=0) * 2 > len(hashes)
+    return int(_BIT_WEIGHTS[majority].sum())
+
+
+def _bands(fingerprint: int):
+    return [(band, (fingerprint >> (band * _BAND_BITS)) & _BAND_MASK) for band in range(BANDS)]
+
+
+def collapse_duplicates(results: List[Dict]) -> List[Dict]:
+    """
+    The results without duplicates, in their original order; the first of each group is
+    kept, so callers put the results they prefer first. Results without a URL are dropped.
+    """
+    kept: List[Dict] = []
+    seen_urls = set()
+    buckets: Dict[tuple, List[int]] = {}
+    for result in results:
+        url = result.get("url")
+        if not url:
+            continue
+        key = canonical_url(url)
+        if key in seen_urls:
+            continue
+
+        fingerprint = simhash(result.get("snippet"))
+        if fingerprint is not None:
+            bands = _bands(fingerprint)
+            candidates = {other for band in bands for other in buckets.get(band, ())}
+            if any(bin(fingerprint ^ other).count("1") <= MAX_DISTANCE for other in candidates):
+                continue
+            for band in bands:
+                buckets.setdefault(band, []).append(fingerprint)
+
+        seen_urls.add(key)
+        kept.append(result)
+    return kept
@@ -0,0 +1,138 @@
+"""
+Speculative cross-source fallback for chat searches.
+
+Chat used to search the focus mode, evaluate the results and, when they were thin, run a
+whole new search across all sources: a weak result set paid two search latencies back to
+back. The fallback (the modes the focus search did not cover) is now started while the
+focus search is still running, once that search is clearly slower than usual: it has run
+search_speculative_latency_factor times as long as the focus modes' plans typically take
+(the executor's rolling plan latency), and at least search_speculative_delay_seconds.
+Slow providers are the usual reason results come back thin; a search taking its normal
+time does not speculate. Once quality is known the fallback is merged, or cancelled and
+discarded. search_speculative_max_inflight caps how many speculative
+fallbacks run at once across requests; beyond it, and with speculation disabled, the
+fallback runs sequentially as before, only when it is needed.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Dict, List, Optional, Sequence
+
+from app.core.config import settings
+from app.services.search_providers import ProviderExecutor, provider_executor
+
+logger = logging.getLogger(__name__)
+
+ALL_MODES = ["web", "social", "academic"]
+
+
+class SpeculationBudget:
+    """Process-wide count of speculative fallbacks in flight, and what became of them"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.started = 0
+        self.used = 0
+        self.discarded = 0
+
+    def try_acquire(self, limit: int) -> bool:
+        if self.in_flight >= limit:
+            return False
+        self.in_flight += 1
+        self.started += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"in_flight": self.in_flight, "started": self.started, "used": self.used, "discarded": self.discarded}
+
+
+speculation_budget = SpeculationBudget()
+
+
+class CrossSourceFallback:
+    """
+    The fallback for one chat search. Run the focus search through primary(), then either
+    merge() the fallback into its results or discard() it.
+    """
+
+    def __init__(self, search_service, query: str, primary_modes: Sequence[str], max_results: int,
+                 speculate: Optional[bool] = None, delay: Optional[float] = None,
+                 max_in_flight: Optional[int] = None, budget: Optional[SpeculationBudget] = None,
+                 latency_factor: Optional[float] = None, executor: Optional[ProviderExecutor] = None):
+        self.search_service = search_service
+        self.query = query
+        self.max_results = max_results
+        self.primary_modes = list(primary_modes)
+        # Modes the focus search already covered are not searched again
+        self.modes = [mode for mode in ALL_MODES if mode not in primary_modes]
+        self.speculate = settings.search_speculative_fallback if speculate is None else speculate
+        # The least the focus search runs before the fallback starts
+        self.delay = settings.search_speculative_delay_seconds if delay is None else delay
+        self.latency_factor = settings.search_speculative_latency_factor if latency_factor is None else latency_factor
+        self.executor = executor or provider_executor
+        self.max_in_flight = settings.search_speculative_max_inflight if max_in_flight is None else max_in_flight
+        self.budget = budget or speculation_budget
+        self._task: Optional[asyncio.Task] = None
+
+    async def _search(self) -> List[Dict]:
+        if not self.modes:
+            # The focus search covered every mode; this re-reads its cached results
+            return await self.search_service.search_all_sources(self.query, self.max_results)
+        return await self.search_service.search_across_modes(self.query, self.modes, self.max_results)
+
+    def speculation_delay(self) -> float:
+        """How long the focus search runs before the fallback starts"""
+        expected = [self.executor.expected_latency(mode) for mode in self.primary_modes]
+        if not expected or None in expected:
+            return self.delay
+        return max(self.delay, self.latency_factor * sum(expected))
+
+    def _start(self) -> None:
+        if not self.budget.try_acquire(self.max_in_flight):
+            logger.info("Speculative fallback skipped: %d already in flight", self.budget.in_flight)
+            return
+        self._task = asyncio.create_task(self._search())
+        self._task.add_done_callback(lambda _: self.budget.release())
+
+    async def primary(self, search: Awaitable[List[Dict]]) -> List[Dict]:
+        """Await the focus search, starting the fallback alongside it once it is slow"""
+        primary = asyncio.ensure_future(search)
+        # With nothing left to search the fallback is just a cache read; no need to speculate
+        if self.speculate and self.modes:
+            delay = self.speculation_delay()
+            if delay > 0:
+                await asyncio.wait({primary}, timeout=delay)
+            if not primary.done():
+                self._start()
+        try:
+            return await primary
+        except BaseException:
+            self.discard()
+            raise
+
+    async def merge(self, results: List[Dict]) -> List[Dict]:
+        """The focus results merged with the fallback's, re-ranked to max_results"""
+        if self._task is not None:
+            self.budget.used += 1
+            try:
+                fallback = await self._task
+            except Exception:
+                logger.exception("Cross-source fallback failed")
+                fallback = []
+        else:
+            fallback = await self._search()
+        return self.search_service.merge_fallback(self.query, results, fallback, self.max_results)
+
+    def discard(self) -> None:
+        """Drop the speculative fallback; a search still running is cancelled"""
+        if self._task is None:
+            return
+        self.budget.discarded += 1
+        if not self._task.done():
+            self._task.cancel()
+        elif not self._task.cancelled():
+            # Retrieve a failure nobody is going to await
+            self._task.exception()
+        self._task = None
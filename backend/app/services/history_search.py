@@ -0,0 +1,146 @@
+"""
+Full-text search over conversation history.
+
+Message content and conversation titles are indexed by the migration layer (FTS5 on
+SQLite, GIN over to_tsvector on PostgreSQL; see create_history_search_index). A search
+runs in two steps: the ranked page of hits is selected first, and only those rows are then
+loaded with their snippets, since snippet generation is the expensive part and would
+otherwise run for every match.
+"""
+import html
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import DateTime, bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.utils.text import search_terms
+
+# Title matches outrank message matches of the same relevance
+TITLE_WEIGHT = 2.0
+# Approximate snippet length in words
+SNIPPET_WORDS = 16
+
+# Highlight markers used inside the database, swapped for <mark> after HTML-escaping
+_START, _END = "\x02", "\x03"
+
+
+def _fts5_match(terms: Sequence[str]) -> str:
+    # Every term must match; the last one is a prefix so results appear while typing
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _tsquery(terms: Sequence[str]) -> str:
+    return " & ".join(list(terms[:-1]) + [f"{terms[-1]}:*"])
+
+
+def highlight_html(fragment: Optional[str]) -> str:
+    """Escape a snippet and turn the highlight markers into <mark> tags"""
+    escaped = html.escape(fragment or "")
+    return escaped.replace(_START, "<mark>").replace(_END, "</mark>")
+
+
+_SQLITE_RANKED = text(
+    "SELECT kind, id, score FROM ("
+    " SELECT 'message' AS kind, rowid AS id, bm25(messages_fts) AS score"
+    " FROM messages_fts WHERE messages_fts MATCH :match"
+    " UNION ALL"
+    " SELECT 'conversation', rowid, bm25(conversations_fts) * :title_weight"
+    " FROM conversations_fts WHERE conversations_fts MATCH :match"
+    ") ORDER BY score, kind, id DESC LIMIT :limit OFFSET :offset"
+)
+
+_SQLITE_MESSAGES = text(
+    "SELECT m.id AS message_id, m.conversation_id, c.title AS conversation_title, m.role, m.created_at,"
+    f" snippet(messages_fts, 0, char(2), char(3), '…', {SNIPPET_WORDS}) AS snippet"
+    " FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid"
+    " JOIN conversations c ON c.id = m.conversation_id"
+    " WHERE messages_fts MATCH :match AND messages_fts.rowid IN :ids"
+).bindparams(bindparam("ids", expanding=True)).columns(created_at=DateTime(timezone=True))
+
+_SQLITE_CONVERSATIONS = text(
+    "SELECT c.id AS conversation_id, c.title AS conversation_title, c.updated_at AS created_at,"
+    " highlight(conversations_fts, 0, char(2), char(3)) AS snippet"
+    " FROM conversations_fts JOIN conversations c ON c.id = conversations_fts.rowid"
+    " WHERE conversations_fts MATCH :match AND conversations_fts.rowid IN :ids"
+).bindparams(bindparam("ids", expanding=True)).columns(created_at=DateTime(timezone=True))
+
+# ts_rank is "higher is better"; negate it so both dialects sort ascending
+_POSTGRES_RANKED = text(
+    "SELECT kind, id, score FROM ("
+    " SELECT 'message' AS kind, id, -ts_rank(to_tsvector('english', content), q) AS score"
+    " FROM messages, to_tsquery('english', :match) AS q WHERE to_tsvector('english', content) @@ q"
+    " UNION ALL"
+    " SELECT 'conversation', id, -ts_rank(to_tsvector('english', title), q) * :title_weight"
+    " FROM conversations, to_tsquery('english', :match) AS q WHERE to_tsvector('english', title) @@ q"
+    ") AS hits ORDER BY score, kind, id DESC LIMIT :limit OFFSET :offset"
+)
+
+_HEADLINE_OPTIONS = f"StartSel=\u0002, StopSel=\u0003, MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}"
+
+_POSTGRES_MESSAGES = text(
+    "SELECT m.id AS message_id, m.conversation_id, c.title AS conversation_title, m.role, m.created_at,"
+    " ts_headline('english', m.content, to_tsquery('english', :match), :options) AS snippet"
+    " FROM messages m JOIN conversations c ON c.id = m.conversation_id WHERE m.id IN :ids"
+).bindparams(bindparam("ids", expanding=True)).columns(created_at=DateTime(timezone=True))
+
+_POSTGRES_CONVERSATIONS = text(
+    "SELECT c.id AS conversation_id, c.title AS conversation_title, c.updated_at AS created_at,"
+    " ts_headline('english', c.title, to_tsquery('english', :match), :options) AS snippet"
+    " FROM conversations c WHERE c.id IN :ids"
+).bindparams(bindparam("ids", expanding=True)).columns(created_at=DateTime(timezone=True))
+
+
+async def search_history(session: AsyncSession, query: str, limit: int = 20, offset: int = 0) -> List[Dict]:
+    """
+    One page of messages and conversation titles matching every word of `query`, best first.
+
+    Each hit carries the conversation it belongs to and an HTML-safe snippet with the
+    matched words wrapped in <mark>. Title hits have no message_id or role.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    if session.get_bind().dialect.name == "postgresql":
+        match = _tsquery(terms)
+        ranked_query, queries, extra = _POSTGRES_RANKED, {
+            "message": _POSTGRES_MESSAGES, "conversation": _POSTGRES_CONVERSATIONS
+        }, {"options": _HEADLINE_OPTIONS}
+    else:
+        match = _fts5_match(terms)
+        ranked_query, queries, extra = _SQLITE_RANKED, {
+            "message": _SQLITE_MESSAGES, "conversation": _SQLITE_CONVERSATIONS
+        }, {}
+
+    ranked = (await session.execute(ranked_query, {
+        "match": match, "title_weight": TITLE_WEIGHT, "limit": limit, "offset": offset
+    })).all()
+
+    details: Dict[tuple, Dict] = {}
+    for kind, statement in queries.items():
+        ids = [row.id for row in ranked if row.kind == kind]
+        if not ids:
+            continue
+        rows = await session.execute(statement, {"match": match, "ids": ids, **extra})
+        for row in rows.mappings():
+            key = row["message_id"] if kind == "message" else row["conversation_id"]
+            details[(kind, key)] = dict(row)
+
+    hits = []
+    for row in ranked:
+        hit = details.get((row.kind, row.id))
+        if hit is None:
+            # Deleted between the two queries
+            continue
+        hits.append({
+            "conversation_id": hit["conversation_id"],
+            "conversation_title": hit["conversation_title"],
+            "message_id": hit.get("message_id"),
+            "role": hit.get("role"),
+            "created_at": hit["created_at"],
+            "snippet": highlight_html(hit["snippet"]),
+            "score": -row.score,
+        })
+    return hits
@@ -1,14 +1,42 @@
-from typing import List, Dict, AsyncGenerator, Optional
+from typing import Callable, List, Dict, AsyncGenerator, Optional
+from contextlib import asynccontextmanager
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.core.config import settings
 from app.models import Message, LLMModel
 from app.schemas.llm import infer_provider_type
-import litellm
+import asyncio
 import logging
 import os
 
 
+_litellm = None
+
+
+def get_litellm():
+    """Import LiteLLM on first use.
+
+    LiteLLM drags in every provider SDK, so importing it at module load kept the
+    API from answering /health until all of it had loaded. The bundled model
+    cost map is used instead of fetching one over the network during import.
+    """
+    global _litellm
+    if _litellm is None:
+        os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+        import litellm
+        _litellm = litellm
+    return _litellm
+
+
+async def prewarm_litellm() -> None:
+    """Import LiteLLM in a worker thread so the first chat request doesn't pay for it"""
+    try:
+        await asyncio.to_thread(get_litellm)
+        logging.getLogger(__name__).info("LiteLLM pre-warmed")
+    except Exception:
+        logging.getLogger(__name__).exception("LiteLLM pre-warm failed")
+
+
 class LLMService:
     def __init__(self):
         self.current_model = None
@@ -38,7 +66,7 @@ class LLMService:
             if model.base_url:
                 # LiteLLM uses custom_base_url parameter
                 # For Ollama, we need to set it per model call
-                litellm.drop_params = True  # Don't drop custom params
+                get_litellm().drop_params = True  # Don't drop custom params
                 # Store base_url in model object for use in completion calls
 
             return True
@@ -108,43 +136,23 @@ Format your response:
         self,
         query: str,
         search_results: List[Dict],
-        conversation_id: int,
+        conversation_id: Optional[int],
         db: AsyncSession,
-        model_id: Optional[int] = None
+        model_id: Optional[int] = None,
+        staged_messages: Optional[List[Message]] = None
     ) -> Dict:
         """Generate a complete AI response"""
 
         # Set model if specified, otherwise try to get default
-        if model_id:
-            success = await self.set_model(model_id, db)
-            if not success:
-                return {
-                    "content": "I apologize, but the selected model is not available or inactive.",
-                    "follow_up_questions": []
-                }
-        elif not self.current_model:
-            # Try to get first active model as default
-            result = await db.execute(
-                select(LLMModel)
-                .where(LLMModel.is_active == True)
-                .limit(1)
-            )
-            default_model = result.scalar_one_or_none()
-            if default_model:
-                success = await self.set_model(default_model.id, db)
-                if not success:
-                    return {
-                        "content": "I apologize, but no active model is available.",
-                        "follow_up_questions": []
-                    }
-            else:
-                return {
-                    "content": "No model selected. Please select a model to continue.",
-                    "follow_up_questions": []
-                }
+        error_message = await self._resolve_model(model_id, db)
+        if error_message:
+            return {
+                "content": error_message,
+                "follow_up_questions": []
+            }
 
         # Get conversation history
-        history = await self._get_conversation_history(conversation_id, db)
+        history = await self._get_conversation_history(conversation_id, db, staged_messages)
         
         # Format context
         context = self._format_sources_for_context(search_results)
@@ -185,7 +193,7 @@ Format your response:
                 completion_params["api_key"] = self.current_model.api_key
             
             # Call LiteLLM
-            response = await litellm.acompletion(**completion_params)
+            response = await get_litellm().acompletion(**completion_params)
             
             content = response.choices[0].message.content
             
@@ -208,37 +216,30 @@ Format your response:
         self,
         query: str,
         search_results: List[Dict],
-        conversation_id: int,
-        db: AsyncSession,
-        model_id: Optional[int] = None
+        conversation_id: Optional[int],
+        db: Optional[AsyncSession] = None,
+        model_id: Optional[int] = None,
+        staged_messages: Optional[List[Message]] = None,
+        session_factory: Optional[Callable[[], AsyncSession]] = None
     ) -> AsyncGenerator[str, None]:
-        """Generate streaming AI response"""
+        """Generate streaming AI response
 
-        # Set model if specified, otherwise try to get default
-        if model_id:
-            success = await self.set_model(model_id, db)
-            if not success:
-                yield "I apologize, but the selected model is not available or inactive."
-                return
-        elif not self.current_model:
-            # Try to get first active model as default
-            result = await db.execute(
-                select(LLMModel)
-                .where(LLMModel.is_active == True)
-                .limit(1)
-            )
-            default_model = result.scalar_one_or_none()
-            if default_model:
-                success = await self.set_model(default_model.id, db)
-                if not success:
-                    yield "I apologize, but no active model is available."
-                    return
-            else:
-                yield "No model selected. Please select a model to continue."
-                return
+        Pass either `db` or `session_factory`; the latter opens a short-lived session for
+        the model and history reads only.
+        """
 
-        # Get conversation history
-        history = await self._get_conversation_history(conversation_id, db)
+        # Database work happens up front; with a session factory the connection is
+        # released before the (potentially long) completion stream starts
+        async with self._db_reads(db, session_factory) as session:
+            # Set model if specified, otherwise try to get default
+            error_message = await self._resolve_model(model_id, session)
+            if not error_message:
+                # Get conversation history
+                history = await self._get_conversation_history(conversation_id, session, staged_messages)
+
+        if error_message:
+            yield error_message
+            return
         
         # Format context
         context = self._format_sources_for_context(search_results)
@@ -279,7 +280,7 @@ Format your response:
                 completion_params["api_key"] = self.current_model.api_key
             
             # Stream response from LiteLLM
-            response = await litellm.acompletion(**completion_params)
+            response = await get_litellm().acompletion(**completion_params)
             
             async for chunk in response:
                 if chunk.choices[0].delta.content:
@@ -289,18 +290,57 @@ Format your response:
             logging.getLogger(__name__).exception("LLM streaming error")
             yield "\n\nI apologize, but I encountered an error."
     
-    async def _get_conversation_history(
-        self,
-        conversation_id: int,
-        db: AsyncSession
-    ) -> List[Message]:
-        """Get conversation history"""
-        result = await db.execute(
+    @asynccontextmanager
+    async def _db_reads(self, db: Optional[AsyncSession], session_factory: Optional[Callable[[], AsyncSession]]):
+        if db is not None:
+            yield db
+        else:
+            async with session_factory() as session:
+                yield session
+
+    async def _resolve_model(self, model_id: Optional[int], db: AsyncSession) -> Optional[str]:
+        """Load the requested (or first active) model; returns a user-facing message on failure"""
+        if model_id:
+            success = await self.set_model(model_id, db)
+            if not success:
+                return "I apologize, but the selected model is not available or inactive."
+        elif not self.current_model:
+            # Try to get first active model as default
+            result = await db.execute(
+                select(LLMModel)
+                .where(LLMModel.is_active == True)
+                .limit(1)
+            )
+            default_model = result.scalar_one_or_none()
+            if default_model:
+                success = await self.set_model(default_model.id, db)
+                if not success:
+                    return "I apologize, but no active model is available."
+            else:
+                return "No model selected. Please select a model to continue."
+        return None
+
+    @staticmethod
+    def _history_query(conversation_id: int):
+        """Messages of a conversation in order (served by ix_messages_conversation_id_created_at_id)"""
+        return (
             select(Message)
             .where(Message.conversation_id == conversation_id)
-            .order_by(Message.created_at)
+            .order_by(Message.created_at, Message.id)
         )
-        return result.scalars().all()
+
+    async def _get_conversation_history(
+        self,
+        conversation_id: Optional[int],
+        db: AsyncSession,
+        staged_messages: Optional[List[Message]] = None
+    ) -> List[Message]:
+        """Get conversation history, followed by messages of the current turn that are not persisted yet"""
+        history: List[Message] = []
+        if conversation_id is not None:
+            result = await db.execute(self._history_query(conversation_id))
+            history = list(result.scalars().all())
+        return history + list(staged_messages or [])
     
     async def _evaluate_result_quality(
         self,
@@ -383,7 +423,7 @@ Format your response:
                 }
             ]
             
-            response = await litellm.acompletion(
+            response = await get_litellm().acompletion(
                 model=self.current_model.model_name,
                 messages=messages,
                 temperature=0.8,
@@ -0,0 +1,125 @@
+"""
+Local knowledge provider.
+
+Every result a network provider returns is remembered in knowledge_entries, one row per
+canonical URL (the full-text index and the backfill from stored sources and cached
+searches are created by migration 6, see create_knowledge_index). Searching it is a single
+indexed query against our own database, so it runs alongside the network providers and
+still has answers when they are rate-limited or offline. Relevance is weighted down the
+longer it has been since a provider last returned the URL.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import KnowledgeEntry
+from app.utils.migrations import KNOWLEDGE_SEARCH_COLUMNS, tsvector_document
+from app.utils.text import query_terms
+from app.utils.urls import canonical_url
+
+# Marks results served from the local index (they are never written back into it)
+LOCAL_PROVIDER = "local"
+
+_FOCUS_SOURCE_TYPES = {"web", "social", "academic"}
+
+_SQLITE_SEARCH = (
+    "SELECT k.title, k.url, k.snippet, k.source_type"
+    " FROM knowledge_fts JOIN knowledge_entries k ON k.id = knowledge_fts.rowid"
+    " WHERE knowledge_fts MATCH :match{source_filter}"
+    # bm25 is negative (lower is better); age shrinks it towards zero
+    " ORDER BY bm25(knowledge_fts) / (1.0 + (julianday('now') - julianday(k.last_seen_at)) / :half_life)"
+    " LIMIT :limit"
+)
+
+_POSTGRES_SEARCH = (
+    "SELECT k.title, k.url, k.snippet, k.source_type"
+    " FROM knowledge_entries k, to_tsquery('english', :match) AS q"
+    " WHERE {document} @@ q{source_filter}"
+    " ORDER BY ts_rank({document}, q)"
+    " / (1 + extract(epoch FROM now() - k.last_seen_at) / 86400.0 / CAST(:half_life AS double precision)) DESC"
+    " LIMIT :limit"
+)
+
+
+def knowledge_entries(results: Iterable, seen_at: Optional[datetime] = None) -> List[Dict]:
+    """knowledge_entries rows for search results (dicts or row mappings with title/url/snippet/source_type)"""
+    if seen_at is None:
+        seen_at = datetime.now(timezone.utc)
+    elif seen_at.tzinfo is None:
+        # SQLite hands back naive UTC timestamps
+        seen_at = seen_at.replace(tzinfo=timezone.utc)
+    entries = []
+    for result in results:
+        url, title = result.get("url"), result.get("title")
+        if not url or not title or result.get("provider") == LOCAL_PROVIDER:
+            continue
+        entries.append({
+            "url_key": canonical_url(url)[:2048],
+            "url": url,
+            "title": title[:500],
+            "snippet": result.get("snippet") or "",
+            "source_type": result.get("source_type") or "web",
+            "last_seen_at": seen_at,
+        })
+    return entries
+
+
+def knowledge_upsert(dialect_name: str, entries: List[Dict]):
+    """INSERT ... ON CONFLICT (url_key) that keeps the most recent sighting of each URL"""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    # One row per key: PostgreSQL refuses to update the same row twice in one statement
+    latest: Dict[str, Dict] = {}
+    for entry in entries:
+        current = latest.get(entry["url_key"])
+        if current is None or entry["last_seen_at"] >= current["last_seen_at"]:
+            latest[entry["url_key"]] = entry
+
+    statement = insert(KnowledgeEntry).values(list(latest.values()))
+    return statement.on_conflict_do_update(
+        index_elements=[KnowledgeEntry.url_key],
+        set_={
+            column: statement.excluded[column]
+            for column in ("url", "title", "snippet", "source_type", "last_seen_at")
+        },
+        where=statement.excluded.last_seen_at >= KnowledgeEntry.last_seen_at
+    )
+
+
+class LocalKnowledgeProvider:
+    """Full-text search over results we have already fetched"""
+
+    def __init__(self, half_life_days: float = 30.0):
+        # Age at which a result counts half as much as a fresh one with the same text score
+        self.half_life_days = half_life_days
+
+    async def search(
+        self, session: AsyncSession, query: str, max_results: int, focus_mode: Optional[str] = None
+    ) -> List[Dict]:
+        """Best local matches for any of the query's words, restricted to the focus mode's source type"""
+        terms = query_terms(query)
+        if not terms or max_results <= 0:
+            return []
+
+        params = {"limit": max_results, "half_life": self.half_life_days}
+        source_filter = ""
+        if focus_mode in _FOCUS_SOURCE_TYPES:
+            source_filter = " AND k.source_type = :source_type"
+            params["source_type"] = focus_mode
+
+        if session.get_bind().dialect.name == "postgresql":
+            statement = _POSTGRES_SEARCH.format(
+                document=tsvector_document(KNOWLEDGE_SEARCH_COLUMNS, prefix="k."), source_filter=source_filter
+            )
+            params["match"] = " | ".join(terms)
+        else:
+            statement = _SQLITE_SEARCH.format(source_filter=source_filter)
+            params["match"] = " OR ".join(f'"{term}"' for term in terms)
+
+        rows = await session.execute(text(statement), params)
+        return [{**row._mapping, "provider": LOCAL_PROVIDER} for row in rows]
@@ -0,0 +1,146 @@
+"""
+Background prefetch of search results for suggested follow-up questions.
+
+Each answer comes with follow-up questions, and clicking one used to start a cold search.
+When enabled, the follow-ups are searched in the background right after they are
+produced, so the click finds its results in the search cache. Prefetching is low
+priority: one search at a time, only while no more than max_active_searches other
+searches are running (a prefetch in progress is cancelled once that is exceeded), never
+while a provider the modes use is degraded by errors (rate limiting), and within a
+budget of searches per minute. Follow-ups that do not fit are dropped, not delayed.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.search_providers import DEGRADED, FAILING, ProviderExecutor, provider_executor
+
+logger = logging.getLogger(__name__)
+
+class FollowUpPrefetcher:
+    """Warms the search cache for follow-up questions; started from the application lifespan"""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        max_per_minute: float = 6,
+        max_active_searches: int = 0,
+        queue_size: int = 32,
+        poll_interval: float = 0.2,
+        executor: Optional[ProviderExecutor] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.enabled = enabled
+        self.max_per_minute = max_per_minute
+        self.max_active_searches = max_active_searches
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.executor = executor or provider_executor
+        self._clock = clock
+        # Token bucket holding up to a minute's budget
+        self._tokens = float(max_per_minute)
+        self._refilled_at = clock()
+        # Jobs: (search service, query, modes, max_results)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.completed = 0
+        self.dropped = 0
+        self.cancelled = 0
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self) -> None:
+        if self.enabled and not self.running:
+            self._queue = asyncio.Queue(self.queue_size)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    def submit(self, search_service, queries: List[str], modes: List[str], max_results: int) -> None:
+        """Queue follow-up searches (no-op while the prefetcher is not running)"""
+        if not self.running:
+            return
+        for query in queries:
+            try:
+                self._queue.put_nowait((search_service, query, list(modes), max_results))
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "completed": self.completed, "dropped": self.dropped, "cancelled": self.cancelled,
+        }
+
+    def _take_token(self) -> bool:
+        now = self._clock()
+        self._tokens = min(float(self.max_per_minute), self._tokens + (now - self._refilled_at) * self.max_per_minute / 60)
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _busy(self, prefetching: bool) -> bool:
+        """Other searches beyond the allowance are running (a running prefetch counts itself out)"""
+        return self.executor.active_runs - int(prefetching) > self.max_active_searches
+
+    def _strained(self, modes: List[str]) -> bool:
+        """A provider serving these modes is erroring, typically rate limited"""
+        return any(
+            self.executor.state(mode, spec) in (DEGRADED, FAILING)
+            for mode in modes for spec in self.executor.providers.values() if mode in spec.modes
+        )
+
+    async def _run(self) -> None:
+        while True:
+            search_service, query, modes, max_results = await self._queue.get()
+            try:
+                if self._busy(False) or self._strained(modes) or not self._take_token():
+                    self.dropped += 1
+                    continue
+                await self._prefetch(search_service, query, modes, max_results)
+            except Exception:
+                logger.exception("Follow-up prefetch failed: %s", query)
+            finally:
+                self._queue.task_done()
+
+    async def _prefetch(self, search_service, query: str, modes: List[str], max_results: int) -> None:
+        # The same search the chat endpoint runs for this query, so it hits the cache entries
+        if len(modes) == 1:
+            search = search_service.multi_source_search(query, max_results, modes[0])
+        else:
+            search = search_service.search_across_modes(query, modes, max_results)
+        task = asyncio.ensure_future(search)
+        while not task.done():
+            await asyncio.wait({task}, timeout=self.poll_interval)
+            if not task.done() and self._busy(True):
+                task.cancel()
+                self.cancelled += 1
+                logger.info("Follow-up prefetch cancelled under load: %s", query)
+        if not task.cancelled():
+            task.result()
+            self.completed += 1
+
+
+def build_prefetcher() -> FollowUpPrefetcher:
+    return FollowUpPrefetcher(
+        enabled=settings.prefetch_follow_ups,
+        max_per_minute=settings.prefetch_max_per_minute,
+        max_active_searches=settings.prefetch_max_active_searches,
+    )
+
+
+follow_up_prefetcher = build_prefetcher()
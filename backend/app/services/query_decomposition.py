@@ -0,0 +1,135 @@
+"""
+Pro-mode query decomposition.
+
+A question that asks several things ("What causes inflation and how do central banks
+respond?", "Rust vs Go for web servers") is split into sub-queries, which are searched in
+parallel next to the literal question under one shared deadline. The merged sources give
+each sub-query a quota, so one part of the question cannot crowd out the others.
+
+Splitting is rule-based, on clause boundaries and comparisons, and sub-queries are built
+from the key terms WikipediaService._extract_key_terms picks out; a question with a single
+clause is searched as before.
+"""
+import asyncio
+import logging
+import math
+import re
+from typing import Dict, List, Sequence
+
+from app.services.dedup import collapse_duplicates
+from app.services.wikipedia_service import WikipediaService
+from app.utils.text import STOP_WORDS
+
+logger = logging.getLogger(__name__)
+
+_QUESTION_WORDS = r"(?:how|what|why|when|where|which|who|whose|is|are|does|do|did|can|could|should|will|would)"
+_QUESTION_WORD = re.compile(_QUESTION_WORDS)
+# A period ends a sentence unless it closes an abbreviation ("Mr.", "U.S.") or sits inside a
+# token ("3.11", "python.org")
+_ABBREVIATIONS = ("mr", "mrs", "ms", "dr", "prof", "st", "jr", "sr", "inc", "ltd", "no", "[a-z]")
+_SENTENCE_PERIOD = "".join(rf"(?<!\b{abbreviation})" for abbreviation in _ABBREVIATIONS) + r"\.(?!\w)"
+# Clause boundaries: sentence/question ends, "... and how ...", and comparisons
+_CLAUSE_BOUNDARY = re.compile(
+    rf"\s*(?:[?;!]|{_SENTENCE_PERIOD}|,?\s+(?:and|or|but|also)\s+(?={_QUESTION_WORDS}\b)"
+    r"|\s+(?:vs\.?|versus|compared\s+(?:to|with)|compares?\s+(?:to|with))\s+)\s*",
+    re.IGNORECASE,
+)
+# Question filler that says nothing about the topic
+_FILLER = {"about", "between", "compare", "difference", "you", "your"}
+# Words by which a clause refers back to an earlier one ("When is the next one?")
+_REFERRING = {"it", "its", "they", "them", "their", "this", "that", "these", "those", "one", "ones"}
+
+
+def _key_terms(text: str) -> List[str]:
+    terms, seen = [], set()
+    for term in WikipediaService._extract_key_terms(text):
+        lowered = term.lower()
+        if lowered in STOP_WORDS or lowered in _FILLER or lowered in seen:
+            continue
+        seen.add(lowered)
+        terms.append(term)
+    return terms
+
+
+def decompose_query(query: str, max_queries: int = 3) -> List[str]:
+    """
+    The query followed by up to max_queries - 1 sub-queries, one per clause. A clause that
+    refers back, or is a short follow-up question, takes the topic of the clause before; any
+    other clause with a single key term (one side of "X vs Y ...") borrows the terms its
+    siblings share.
+    """
+    parts: List[List[str]] = []
+    for clause in _CLAUSE_BOUNDARY.split(query):
+        terms = _key_terms(clause)
+        words = re.findall(r"\w+", clause.lower())
+        # A short follow-up question ("What year?") is about the clause before, like one
+        # that refers back to it ("When is the next one?")
+        elliptical = len(terms) == 1 and bool(words) and _QUESTION_WORD.fullmatch(words[0]) is not None
+        if parts and (elliptical or _REFERRING & set(words)):
+            # Name what the clause is about: the capitalized terms (entities) of the one before,
+            # or without any, its leading term ("How does photosynthesis work ... why is it ...")
+            entities = [term for term in parts[-1] if term[0].isupper()] or parts[-1][:1]
+            terms = [term for term in terms if term.lower() not in _REFERRING] + entities
+        if terms:
+            parts.append(terms)
+    if len(parts) < 2 or max_queries < 2:
+        return [query]
+
+    # Shared context: every term that is not the subject (first term) of some clause
+    subjects = {terms[0].lower() for terms in parts}
+    context = [term for terms in parts for term in terms if term.lower() not in subjects]
+    sub_queries = [query]
+    for terms in parts:
+        if len(terms) == 1:
+            terms = terms + [term for term in context if term.lower() != terms[0].lower()]
+        sub_query = " ".join(terms)
+        if sub_query.lower() not in (existing.lower() for existing in sub_queries):
+            sub_queries.append(sub_query)
+    return sub_queries[:max_queries]
+
+
+def merge_with_quotas(result_lists: Sequence[List[Dict]], max_results: int) -> List[Dict]:
+    """
+    Up to max_results results, each list contributing its best ones up to an equal quota
+    (a duplicate counts for the earliest list); unused quota goes to the rest, in order.
+    """
+    kept = {id(result) for result in collapse_duplicates([r for results in result_lists for r in results])}
+    unique = []
+    for results in result_lists:
+        unique.append([result for result in results if id(result) in kept])
+        kept -= {id(result) for result in results}
+
+    quota = math.ceil(max_results / max(1, len(result_lists)))
+    picked = [result for results in unique for result in results[:quota]]
+    rest = [result for results in unique for result in results[quota:]]
+    return (picked + rest)[:max_results]
+
+
+async def search_sub_queries(search_service, sub_queries: List[str], modes: List[str], max_results: int,
+                             deadline: float) -> List[Dict]:
+    """
+    Search every sub-query across the modes in parallel. Searches still running at the
+    deadline are cancelled (unless none has finished, then the first to finish is used),
+    and the results are merged with per-sub-query quotas.
+    """
+    tasks = [
+        asyncio.create_task(search_service.search_across_modes(sub_query, modes, max_results))
+        for sub_query in sub_queries
+    ]
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    if not done:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    if pending:
+        logger.info("Pro search deadline: %d of %d sub-queries dropped", len(pending), len(tasks))
+
+    result_lists = []
+    for sub_query, task in zip(sub_queries, tasks):
+        if task not in done:
+            continue
+        try:
+            result_lists.append(task.result())
+        except Exception:
+            logger.exception("Sub-query search failed: %s", sub_query)
+    return merge_with_quotas(result_lists, max_results)
@@ -0,0 +1,94 @@
+"""
+Relevance re-ranking of merged search results.
+
+Providers are queried in a fixed order and used to win result slots simply by answering
+first. Instead, every candidate's title and snippet is scored against the query with
+BM25 (computed for the whole candidate set at once with NumPy), scaled by a prior for the
+provider it came from, and only then is the list cut to the number of sources wanted.
+"""
+from collections import Counter
+from typing import Dict, List
+
+import numpy as np
+
+from app.utils.text import query_terms, tokenize
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Title words count this many times over snippet words
+TITLE_REPEAT = 2
+# Weight of a provider's own ordering relative to text relevance (normalized to [0, 1])
+POSITION_WEIGHT = 0.3
+# Results sharing no word with the query are dropped once this many others do
+MIN_RELEVANT = 3
+
+# How much each provider's results are trusted relative to one another
+PROVIDER_PRIORS: Dict[str, float] = {
+    "duckduckgo": 1.0,
+    "bing": 1.0,
+    "google": 1.0,
+    "scholarly": 1.0,
+    "wikipedia": 0.9,
+    "reddit": 0.85,
+    "github": 0.85,
+    "youtube": 0.8,
+    "twitter": 0.7,
+    "local": 0.7,
+    "linkedin": 0.6,
+}
+DEFAULT_PRIOR = 0.8
+
+def bm25_scores(terms: List[str], documents: List[List[str]]) -> np.ndarray:
+    """BM25 score of each tokenized document for the query terms, using the documents as the corpus"""
+    if not terms or not documents:
+        return np.zeros(len(documents))
+
+    # Term frequencies of the query terms only: documents x terms
+    frequencies = np.zeros((len(documents), len(terms)))
+    for row, tokens in enumerate(documents):
+        counts = Counter(tokens)
+        frequencies[row] = [counts.get(term, 0) for term in terms]
+    lengths = np.array([len(tokens) for tokens in documents], dtype=float)
+
+    document_frequency = np.count_nonzero(frequencies, axis=0)
+    idf = np.log1p((len(documents) - document_frequency + 0.5) / (document_frequency + 0.5))
+    average_length = lengths.mean() or 1.0
+    saturation = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+    weighted = frequencies * (BM25_K1 + 1) / (frequencies + saturation[:, None])
+    return weighted @ idf
+
+
+def rank_results(query: str, results: List[Dict], limit: int) -> List[Dict]:
+    """
+    The best `limit` results for the query.
+
+    score = provider prior x (normalized BM25 + POSITION_WEIGHT / (1 + rank within its
+    provider)); ties keep the incoming order. Results that share no word with the query
+    only make the cut when fewer than MIN_RELEVANT others do.
+    """
+    if not results or limit <= 0:
+        return []
+
+    documents = [
+        tokenize(result.get("title")) * TITLE_REPEAT + tokenize(result.get("snippet"))
+        for result in results
+    ]
+    terms = list(dict.fromkeys(query_terms(query)))
+    relevance = bm25_scores(terms, documents)
+    top = relevance.max()
+    normalized = relevance / top if top > 0 else relevance
+
+    positions, seen = [], Counter()
+    for result in results:
+        provider = result.get("provider")
+        positions.append(seen[provider])
+        seen[provider] += 1
+    priors = np.array([PROVIDER_PRIORS.get(result.get("provider"), DEFAULT_PRIOR) for result in results])
+    scores = priors * (normalized + POSITION_WEIGHT / (1 + np.array(positions, dtype=float)))
+
+    order = np.argsort(-scores, kind="stable")
+    relevant = relevance > 0
+    if np.count_nonzero(relevant) >= min(MIN_RELEVANT, limit):
+        order = order[relevant[order]]
+    return [results[index] for index in order[:limit]]
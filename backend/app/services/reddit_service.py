@@ -24,42 +24,38 @@ class RedditService:
                     raise
     
     async def search_reddit(self, query: str, max_results: int = 5) -> List[Dict]:
-        """Search Reddit using RSS feeds"""
+        """Search Reddit using RSS feeds; raises when the feed cannot be fetched"""
         results = []
         
-        try:
-            # Clean query for URL
-            clean_query = query.replace(" ", "+")
-            
-            # Search across all of Reddit
-            rss_url = f"{self.base_url}/search.rss?q={clean_query}&limit={max_results}"
-            
-            # Fetch RSS feed
-            response_text = await self._http_get(rss_url)
+        # Clean query for URL
+        clean_query = query.replace(" ", "+")
+        
+        # Search across all of Reddit
+        rss_url = f"{self.base_url}/search.rss?q={clean_query}&limit={max_results}"
+        
+        # Fetch RSS feed
+        response_text = await self._http_get(rss_url)
+        
+        # Parse RSS feed
+        feed = feedparser.parse(response_text)
+        
+        for entry in feed.entries[:max_results]:
+            # Extract subreddit from link if possible
+            subreddit_match = re.search(r'/r/([^/]+)/', entry.link)
+            subreddit = subreddit_match.group(1) if subreddit_match else "reddit"
             
-            # Parse RSS feed
-            feed = feedparser.parse(response_text)
+            # Clean up summary
+            summary = entry.get('summary', '')
+            # Remove HTML tags
+            summary = re.sub(r'<[^>]+>', '', summary)
+            summary = summary[:500] + "..." if len(summary) > 500 else summary
             
-            for entry in feed.entries[:max_results]:
-                # Extract subreddit from link if possible
-                subreddit_match = re.search(r'/r/([^/]+)/', entry.link)
-                subreddit = subreddit_match.group(1) if subreddit_match else "reddit"
-                
-                # Clean up summary
-                summary = entry.get('summary', '')
-                # Remove HTML tags
-                summary = re.sub(r'<[^>]+>', '', summary)
-                summary = summary[:500] + "..." if len(summary) > 500 else summary
-                
-                results.append({
-                    "title": f"[r/{subreddit}] {entry.title}",
-                    "url": entry.link,
-                    "snippet": summary,
-                    "source_type": "reddit"
-                })
-        
-        except Exception as e:
-            logging.getLogger(__name__).exception("Reddit search error")
+            results.append({
+                "title": f"[r/{subreddit}] {entry.title}",
+                "url": entry.link,
+                "snippet": summary,
+                "source_type": "reddit"
+            })
         
         return results
     
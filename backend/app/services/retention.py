@@ -0,0 +1,186 @@
+"""
+Conversation deletion and the retention job.
+
+Deletes are set-based: sources, messages and conversations are removed with one DELETE
+each instead of loading the object graph for the ORM cascade. The retention job trims
+conversations by age and/or count in bounded batches, each its own write-queue
+transaction, so chat writes keep flowing while it runs; afterwards it hands freed SQLite
+pages back to the filesystem with incremental vacuum.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence
+
+from sqlalchemy import delete, desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.versions import resource_versions
+from app.core.write_queue import WriteQueue
+from app.models import Conversation, KnowledgeEntry, Message, SearchCache, Source
+from app.services.search_service import CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+async def delete_conversations(session: AsyncSession, conversation_ids: Sequence[int]) -> List[int]:
+    """Delete conversations with their messages and sources; returns the ids that existed"""
+    if not conversation_ids:
+        return []
+    existing = (await session.scalars(
+        select(Conversation.id).where(Conversation.id.in_(conversation_ids))
+    )).all()
+    if not existing:
+        return []
+
+    # Children first, so this works whether or not the database enforces foreign keys
+    message_ids = select(Message.id).where(Message.conversation_id.in_(existing))
+    for statement in (
+        delete(Source).where(Source.message_id.in_(message_ids)),
+        delete(Message).where(Message.conversation_id.in_(existing)),
+        delete(Conversation).where(Conversation.id.in_(existing)),
+    ):
+        await session.execute(statement.execution_options(synchronize_session=False))
+    return list(existing)
+
+
+def _expired_conversations(batch_size: int, max_age_days: Optional[int], max_conversations: Optional[int]):
+    """Next batch of conversation ids outside the retention limits, oldest first"""
+    if max_age_days is not None:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+        return (
+            select(Conversation.id)
+            .where(Conversation.updated_at < cutoff)
+            .order_by(Conversation.updated_at, Conversation.id)
+            .limit(batch_size)
+        )
+    # Everything after the newest max_conversations
+    return (
+        select(Conversation.id)
+        .order_by(desc(Conversation.updated_at), desc(Conversation.id))
+        .offset(max_conversations)
+        .limit(batch_size)
+    )
+
+
+def _incremental_vacuum(connection, max_pages: int) -> int:
+    if connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:  # 2 = INCREMENTAL
+        return 0
+    pages = min(connection.exec_driver_sql("PRAGMA freelist_count").scalar() or 0, max_pages)
+    # pysqlite steps a statement only once and incremental_vacuum frees one page per step
+    for _ in range(pages):
+        connection.exec_driver_sql("PRAGMA incremental_vacuum(1)")
+    return pages
+
+
+class RetentionJob:
+    """Periodically applies the retention policy; started from the application lifespan"""
+
+    def __init__(
+        self,
+        writer: WriteQueue,
+        max_age_days: Optional[int] = None,
+        max_conversations: Optional[int] = None,
+        batch_size: int = 200,
+        interval_seconds: float = 3600,
+        vacuum_pages: int = 2000,
+        knowledge_max_age_days: Optional[int] = None
+    ):
+        self.writer = writer
+        self.max_age_days = max_age_days
+        self.max_conversations = max_conversations
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.vacuum_pages = vacuum_pages
+        self.knowledge_max_age_days = knowledge_max_age_days
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return any(limit is not None for limit in (self.max_age_days, self.max_conversations, self.knowledge_max_age_days))
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.enabled and not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Retention run failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def run_once(self) -> int:
+        """Apply the policy until nothing is left to delete; returns the number of conversations removed"""
+        removed = 0
+        for max_age_days, max_conversations in ((self.max_age_days, None), (None, self.max_conversations)):
+            if max_age_days is None and max_conversations is None:
+                continue
+            query = _expired_conversations(self.batch_size, max_age_days, max_conversations)
+
+            async def delete_batch(session: AsyncSession) -> List[int]:
+                return await delete_conversations(session, (await session.scalars(query)).all())
+
+            while True:
+                deleted = await self.writer.submit(delete_batch)
+                for conversation_id in deleted:
+                    resource_versions.conversation_changed(conversation_id)
+                removed += len(deleted)
+                if len(deleted) < self.batch_size:
+                    break
+                # Let queued chat writes in between batches
+                await asyncio.sleep(0)
+
+        await self.writer.submit(self._purge_search_cache)
+        if self.knowledge_max_age_days is not None:
+            await self.writer.submit(self._purge_knowledge)
+        pages = await self.writer.submit(self._vacuum)
+        if removed or pages:
+            logger.info("Retention removed %d conversations and released %d pages", removed, pages)
+        return removed
+
+    async def _purge_search_cache(self, session: AsyncSession) -> None:
+        cutoff = datetime.now(timezone.utc) - CACHE_TTL
+        await session.execute(
+            delete(SearchCache).where(SearchCache.created_at < cutoff).execution_options(synchronize_session=False)
+        )
+
+    async def _purge_knowledge(self, session: AsyncSession) -> None:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.knowledge_max_age_days)
+        await session.execute(
+            delete(KnowledgeEntry).where(KnowledgeEntry.last_seen_at < cutoff).execution_options(synchronize_session=False)
+        )
+
+    async def _vacuum(self, session: AsyncSession) -> int:
+        if session.get_bind().dialect.name != "sqlite" or self.vacuum_pages <= 0:
+            return 0
+        connection = await session.connection()
+        return await connection.run_sync(_incremental_vacuum, self.vacuum_pages)
+
+
+def build_retention_job(writer: WriteQueue) -> RetentionJob:
+    return RetentionJob(
+        writer,
+        max_age_days=settings.retention_max_age_days,
+        max_conversations=settings.retention_max_conversations,
+        batch_size=settings.retention_batch_size,
+        interval_seconds=settings.retention_interval_seconds,
+        vacuum_pages=settings.retention_vacuum_pages,
+        knowledge_max_age_days=settings.local_knowledge_max_age_days
+    )
@@ -0,0 +1,634 @@
+"""
+Search provider registry and the executor that runs focus-mode plans.
+
+Each provider is declared once as a ProviderSpec: the focus modes it can serve, its
+priority, timeout, concurrency limit and relative cost, and how to call it. A focus mode
+is a FocusPlan: the providers to ask, when (always, only while the pool is short of
+max_results, or only when it is still empty) and how many results to ask each for. Steps
+run stage by stage (ALWAYS, WHEN_EMPTY, WHEN_SHORT) and by provider priority within a
+stage; a provider that declares a mode but is not named in its plan is asked last, while
+the pool is short. The ProviderExecutor runs every call with the provider's timeout and
+concurrency limit, turns failures into empty results and records per-provider latency
+and yield. Empty and failed answers are remembered per provider and query for a short
+while (NegativeCache), so repeating a miss does not go through retries and backoff again.
+
+The executor also keeps rolling statistics (latency, error rate, yield) per focus mode and
+provider and adapts plans to them: within a stage, providers that answer well are
+reordered by results per second, degraded ones are asked last, failing ones and ones too
+slow for what is left of the request deadline are skipped. A small exploration rate still
+sends them the odd request, so a provider that recovers comes back. A combined site query
+counts for every site it covers, and its sites are ordered and skipped as one unit.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, FrozenSet, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.core.config import settings
+from app.services.youtube_service import YouTubeService
+
+logger = logging.getLogger(__name__)
+
+# When a plan step runs, in stage order
+ALWAYS = "always"
+WHEN_EMPTY = "empty"
+WHEN_SHORT = "short"
+_STAGES = (ALWAYS, WHEN_EMPTY, WHEN_SHORT)
+
+# fetch(search_service, query, count) -> results
+ProviderFetch = Callable[[object, str, int], Awaitable[List[Dict]]]
+
+
+@dataclass(frozen=True)
+class ProviderSpec:
+    name: str
+    fetch: ProviderFetch
+    modes: FrozenSet[str]
+    # Lower runs first within a plan stage
+    priority: int = 100
+    timeout: float = 10.0
+    # Calls in flight at once across all searches
+    concurrency: int = 4
+    # Relative cost of one call (paid quota, rate-limit pressure), reported in the metrics
+    cost: float = 1.0
+    # Provider name recorded on results, when several specs share one (e.g. a fallback)
+    label: Optional[str] = None
+    # False while the provider is not configured (missing API key)
+    available: Callable[[], bool] = lambda: True
+    # Upstream engine the provider queries through; calls share the engine's concurrency limit
+    engine: Optional[str] = None
+    # Domains a site-scoped provider is restricted to
+    sites: Tuple[str, ...] = ()
+    # Whether the engine answers several site: filters joined with OR in one query
+    combines_sites: bool = False
+    # Adds provider-specific fields to results labelled as this provider (a combined site
+    # query returns plain engine results)
+    annotate: Optional[Callable[[Dict], None]] = None
+
+    @property
+    def result_provider(self) -> str:
+        return self.label or self.name
+
+
+@dataclass(frozen=True)
+class PlanStep:
+    provider: str
+    when: str = ALWAYS
+    # A fixed number of results (never more than max_results) ...
+    limit: Optional[int] = None
+    # ... or this share of what the pool still lacks, at least `minimum`
+    share: float = 1.0
+    minimum: int = 1
+
+    def count(self, max_results: int, remaining: int) -> int:
+        if self.limit is not None:
+            return min(self.limit, max_results)
+        return max(int(remaining * self.share), self.minimum)
+
+
+@dataclass(frozen=True)
+class FocusPlan:
+    mode: str
+    steps: Tuple[PlanStep, ...]
+    # Source type given to every result, when the mode overrides the provider's
+    source_type: Optional[str] = None
+
+
+PROVIDERS: Dict[str, ProviderSpec] = {}
+FOCUS_PLANS: Dict[str, FocusPlan] = {}
+
+
+def register_provider(spec: ProviderSpec) -> ProviderSpec:
+    PROVIDERS[spec.name] = spec
+    return spec
+
+
+def register_plan(plan: FocusPlan) -> FocusPlan:
+    FOCUS_PLANS[plan.mode] = plan
+    return plan
+
+
+def plan_steps(mode: str, providers: Optional[Dict[str, ProviderSpec]] = None) -> List[Tuple[PlanStep, ProviderSpec]]:
+    """The steps of a focus mode's plan in execution order, for available providers only"""
+    providers = PROVIDERS if providers is None else providers
+    plan = FOCUS_PLANS.get(mode)
+    steps = list(plan.steps) if plan else []
+    named = {step.provider for step in steps}
+    steps += [
+        PlanStep(spec.name, WHEN_SHORT) for spec in providers.values() if mode in spec.modes and spec.name not in named
+    ]
+    resolved = [
+        (step, providers[step.provider]) for step in steps
+        if step.provider in providers and mode in providers[step.provider].modes
+        and providers[step.provider].available()
+    ]
+    return sorted(resolved, key=lambda pair: (_STAGES.index(pair[0].when), pair[1].priority))
+
+
+# Outcomes remembered by the negative cache
+EMPTY = "empty"
+ERROR = "error"
+
+
+class NegativeCache:
+    """
+    Recent empty and failed answers per (provider, query), each kind with its own TTL
+    (0 disables it). In-process and bounded: the oldest entries are evicted first.
+    """
+
+    def __init__(self, empty_ttl: float, error_ttl: float, max_entries: int = 4096,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttls = {EMPTY: empty_ttl, ERROR: error_ttl}
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+
+    def get(self, provider: str, query: str) -> Optional[str]:
+        """EMPTY or ERROR while a miss is remembered, else None"""
+        key = (provider, query)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        outcome, expires = entry
+        if expires <= self._clock():
+            del self._entries[key]
+            return None
+        return outcome
+
+    def put(self, provider: str, query: str, outcome: str) -> None:
+        ttl = self.ttls[outcome]
+        if ttl <= 0:
+            return
+        key = (provider, query)
+        self._entries.pop(key, None)
+        self._entries[key] = (outcome, self._clock() + ttl)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Weight of the newest call in the rolling statistics
+STATS_ALPHA = 0.2
+# Calls seen before a provider's statistics are acted on
+MIN_SAMPLES = 5
+# Rolling error rates at which a provider is asked last, or skipped unless exploring
+DEGRADED_ERROR_RATE = 0.5
+FAILING_ERROR_RATE = 0.9
+# Latency floor when comparing results per second
+_MIN_LATENCY = 0.05
+# No call is started with less than this many seconds left before the request deadline
+MIN_CALL_SECONDS = 0.25
+
+# Provider states under the rolling statistics
+UNSAMPLED = "unsampled"
+HEALTHY = "healthy"
+DEGRADED = "degraded"
+FAILING = "failing"
+
+
+@dataclass
+class RollingStats:
+    """Exponentially weighted latency, error rate and yield of one provider in one focus mode"""
+    samples: int = 0
+    latency: float = 0.0
+    error_rate: float = 0.0
+    mean_yield: float = 0.0
+
+    def record(self, latency: float, failed: bool, results: int) -> None:
+        weight = 1.0 if self.samples == 0 else STATS_ALPHA
+        self.latency += weight * (latency - self.latency)
+        self.error_rate += weight * (float(failed) - self.error_rate)
+        self.mean_yield += weight * (results - self.mean_yield)
+        self.samples += 1
+
+    @property
+    def state(self) -> str:
+        if self.samples < MIN_SAMPLES:
+            return UNSAMPLED
+        if self.error_rate >= FAILING_ERROR_RATE:
+            return FAILING
+        if self.error_rate >= DEGRADED_ERROR_RATE:
+            return DEGRADED
+        return HEALTHY
+
+    @property
+    def throughput(self) -> float:
+        """Results per second"""
+        return self.mean_yield / max(self.latency, _MIN_LATENCY)
+
+
+@dataclass
+class ProviderMetrics:
+    calls: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    results: int = 0
+    latency_seconds: float = 0.0
+    cost: float = 0.0
+    # Calls answered from the negative cache (not counted in calls)
+    cached_misses: int = 0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.latency_seconds / self.calls if self.calls else 0.0
+
+    @property
+    def mean_yield(self) -> float:
+        """Results returned per call"""
+        return self.results / self.calls if self.calls else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "calls": self.calls, "failures": self.failures, "timeouts": self.timeouts, "results": self.results,
+            "mean_latency": round(self.mean_latency, 4), "mean_yield": round(self.mean_yield, 2),
+            "cost": round(self.cost, 2), "cached_misses": self.cached_misses,
+        }
+
+
+class ProviderExecutor:
+    """Runs focus-mode plans; shared by all searches so limits and metrics are process-wide"""
+
+    def __init__(self, providers: Optional[Dict[str, ProviderSpec]] = None,
+                 negative_cache: Optional[NegativeCache] = None,
+                 deadline: Optional[float] = None, exploration_rate: Optional[float] = None,
+                 rng: Optional[random.Random] = None):
+        self.providers = PROVIDERS if providers is None else providers
+        self.negative_cache = negative_cache or NegativeCache(
+            settings.search_negative_cache_empty_seconds, settings.search_negative_cache_error_seconds
+        )
+        # Seconds a whole plan may take (0 for no deadline)
+        self.deadline = settings.search_deadline_seconds if deadline is None else deadline
+        self.exploration_rate = settings.search_exploration_rate if exploration_rate is None else exploration_rate
+        self._random = rng or random.Random()
+        self.metrics: Dict[str, ProviderMetrics] = {}
+        self.stats: Dict[Tuple[str, str], RollingStats] = {}
+        # Whole-plan latency and yield per focus mode
+        self.plan_stats: Dict[str, RollingStats] = {}
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        # Plans running right now: the load background work yields to
+        self.active_runs = 0
+
+    def reset(self) -> None:
+        """Forget statistics, metrics and remembered misses"""
+        self.negative_cache.clear()
+        self.metrics.clear()
+        self.stats.clear()
+        self.plan_stats.clear()
+
+    def _limit(self, spec: ProviderSpec) -> asyncio.Semaphore:
+        key = spec.engine or spec.name
+        if key not in self._limits:
+            engine = self.providers.get(key, spec)
+            self._limits[key] = asyncio.Semaphore(engine.concurrency)
+        return self._limits[key]
+
+    async def call(self, spec: ProviderSpec, service, query: str, count: int,
+                   mode: Optional[str] = None, deadline: Optional[float] = None,
+                   members: Tuple[ProviderSpec, ...] = ()) -> List[Dict]:
+        """
+        One provider call under its concurrency limit and timeout (cut short by the loop-time
+        deadline, if any); failures return []. With a mode, the call feeds that mode's
+        rolling statistics: the provider's, or those of each member for a combined call.
+        A call the deadline cut short says nothing about the provider, so it is neither
+        counted as a timeout nor remembered as a miss; with less than MIN_CALL_SECONDS left
+        none is started.
+        """
+        metrics = self.metrics.setdefault(spec.name, ProviderMetrics())
+        if self.negative_cache.get(spec.name, query) is not None:
+            metrics.cached_misses += 1
+            return []
+        async with self._limit(spec):
+            timeout = spec.timeout
+            if deadline is not None:
+                timeout = min(timeout, deadline - asyncio.get_running_loop().time())
+                if timeout < min(MIN_CALL_SECONDS, spec.timeout):
+                    return []
+            started = time.perf_counter()
+            try:
+                results = list(await asyncio.wait_for(spec.fetch(service, query, count), timeout) or [])
+            except asyncio.TimeoutError:
+                if timeout < spec.timeout:
+                    logger.info("%s search cut off by the request deadline after %.1fs", spec.name, timeout)
+                    # The call still counts (and costs) in the metrics, via the finally block
+                    return []
+                metrics.timeouts += 1
+                logger.warning("%s search timed out after %.1fs", spec.name, timeout)
+                results = None
+            except Exception:
+                metrics.failures += 1
+                logger.exception("%s search failed", spec.name)
+                results = None
+            finally:
+                elapsed = time.perf_counter() - started
+                metrics.calls += 1
+                metrics.cost += spec.cost
+                metrics.latency_seconds += elapsed
+        if mode is not None:
+            for member in members or (spec,):
+                stats = self.stats.setdefault((mode, member.name), RollingStats())
+                stats.record(elapsed, results is None, len(results or ()))
+        if not results:
+            self.negative_cache.put(spec.name, query, EMPTY if results is not None else ERROR)
+            return []
+        metrics.results += len(results)
+        return results
+
+    def state(self, mode: str, spec: ProviderSpec) -> str:
+        stats = self.stats.get((mode, spec.name))
+        return stats.state if stats else UNSAMPLED
+
+    def _unit_state(self, mode: str, unit: List[Tuple[PlanStep, ProviderSpec]]) -> str:
+        """A site group is as good as its best member, and healthy only when all members are"""
+        states = {self.state(mode, spec) for _, spec in unit}
+        if states == {HEALTHY}:
+            return HEALTHY
+        if states & {UNSAMPLED, HEALTHY}:
+            return UNSAMPLED
+        return DEGRADED if DEGRADED in states else FAILING
+
+    def _unit_throughput(self, mode: str, unit: List[Tuple[PlanStep, ProviderSpec]]) -> float:
+        return max(self.stats[(mode, spec.name)].throughput for _, spec in unit)
+
+    def order(self, mode: str, steps: List[Tuple[PlanStep, ProviderSpec]]) -> List[Tuple[PlanStep, ProviderSpec]]:
+        """
+        Plan steps reordered by the rolling statistics, stage by stage: healthy providers
+        trade places by results per second (providers without enough samples keep their
+        place), degraded and failing ones move to the end of their stage. Site-scoped steps
+        sent as one query (see _units) move together.
+        """
+        ordered = []
+        for stage in _STAGES:
+            units = self._units([pair for pair in steps if pair[0].when == stage])
+            preferred = [unit for unit in units if self._unit_state(mode, unit) in (UNSAMPLED, HEALTHY)]
+            slots = [i for i, unit in enumerate(preferred) if self._unit_state(mode, unit) == HEALTHY]
+            fastest = sorted((preferred[i] for i in slots), key=lambda unit: -self._unit_throughput(mode, unit))
+            for i, unit in zip(slots, fastest):
+                preferred[i] = unit
+            demoted = [unit for unit in units if unit not in preferred]
+            ordered += [pair for unit in preferred + demoted for pair in unit]
+        return ordered
+
+    def _units(self, steps: List[Tuple[PlanStep, ProviderSpec]]) -> List[List[Tuple[PlanStep, ProviderSpec]]]:
+        """
+        Steps in runs that execute as one: consecutive site-scoped steps of a stage on an
+        engine that combines site filters form one unit, every other step is its own.
+        """
+        units: List[List[Tuple[PlanStep, ProviderSpec]]] = []
+        for step, spec in steps:
+            if units and self._combinable(spec):
+                last_step, last_spec = units[-1][-1]
+                if last_step.when == step.when and last_spec.engine == spec.engine and self._combinable(last_spec):
+                    units[-1].append((step, spec))
+                    continue
+            units.append([(step, spec)])
+        return units
+
+    def _skip(self, mode: str, spec: ProviderSpec, deadline: Optional[float]) -> bool:
+        """Whether to pass over a failing provider, or one slower than the time left"""
+        stats = self.stats.get((mode, spec.name))
+        if stats is None or stats.state == UNSAMPLED:
+            return False
+        too_slow = deadline is not None and stats.latency > deadline - asyncio.get_running_loop().time()
+        if stats.state != FAILING and not too_slow:
+            return False
+        # Explore: now and then ask anyway, so a provider that has recovered gets noticed
+        return self._random.random() >= self.exploration_rate
+
+    def _combinable(self, spec: ProviderSpec) -> bool:
+        engine = self.providers.get(spec.engine) if spec.engine else None
+        return bool(spec.sites) and engine is not None and engine.combines_sites
+
+    async def run(self, service, mode: str, query: str, max_results: int, fetch_size: int) -> List[Dict]:
+        """
+        Run a focus mode's plan. Whether a WHEN_SHORT step runs depends on max_results;
+        counts are taken from fetch_size, the size of the candidate pool wanted.
+        Consecutive site-scoped steps on an engine that combines site filters are sent as
+        one query (see _run_site_group). Steps are ordered and skipped by the rolling
+        statistics, and no step starts after the deadline.
+        """
+        self.active_runs += 1
+        started = time.perf_counter()
+        try:
+            results = await self._run_plan(service, mode, query, max_results, fetch_size)
+        finally:
+            self.active_runs -= 1
+        self.plan_stats.setdefault(mode, RollingStats()).record(time.perf_counter() - started, False, len(results))
+        return results
+
+    def expected_latency(self, mode: str) -> Optional[float]:
+        """Seconds a mode's plan typically takes, once it has run often enough to tell"""
+        stats = self.plan_stats.get(mode)
+        return stats.latency if stats is not None and stats.samples >= MIN_SAMPLES else None
+
+    async def _run_plan(self, service, mode: str, query: str, max_results: int, fetch_size: int) -> List[Dict]:
+        plan = FOCUS_PLANS.get(mode)
+        source_type = plan.source_type if plan else None
+        steps = self.order(mode, plan_steps(mode, self.providers))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline if self.deadline else None
+        results: List[Dict] = []
+        for group in self._units(steps):
+            step, spec = group[0]
+            if step.when == WHEN_SHORT and len(results) >= max_results:
+                continue
+            if step.when == WHEN_EMPTY and results:
+                continue
+            if deadline is not None and loop.time() >= deadline:
+                logger.warning("%s search deadline reached; remaining providers skipped", mode)
+                break
+            # A site group is passed over only when every member would be
+            if all(self._skip(mode, member, deadline) for _, member in group):
+                logger.info("%s skipped for %s search (%s)", "+".join(member.name for _, member in group), mode,
+                            self._unit_state(mode, group))
+                continue
+            if len(group) > 1:
+                fetched = await self._run_site_group(service, [spec for _, spec in group], query, max_results,
+                                                     fetch_size - len(results), len(results), mode, deadline)
+            else:
+                count = step.count(max_results, fetch_size - len(results))
+                fetched = self._label(await self.call(spec, service, query, count, mode, deadline), spec)
+            if source_type:
+                for result in fetched:
+                    result["source_type"] = source_type
+            results.extend(fetched)
+        return results
+
+    @staticmethod
+    def _label(results: List[Dict], spec: ProviderSpec) -> List[Dict]:
+        for result in results:
+            result["provider"] = spec.result_provider
+            if spec.annotate is not None:
+                spec.annotate(result)
+        return results
+
+    async def _run_site_group(
+        self, service, specs: List[ProviderSpec], query: str, max_results: int, remaining: int, collected: int,
+        mode: Optional[str] = None, deadline: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        One engine query with every site's filter ORed together, partitioned back into sites
+        by host with an equal quota each. Only sites left under quota get their own follow-up
+        query, emptiest first and only while the pool is still short of max_results; results
+        beyond a site's quota are used last.
+        """
+        quota = max(1, -(-remaining // len(specs)))
+        engine = self.providers[specs[0].engine]
+        combined = ProviderSpec(
+            "+".join(spec.name for spec in specs), engine.fetch, engine.modes,
+            timeout=max(spec.timeout for spec in specs), cost=engine.cost, engine=engine.name,
+        )
+        sites = [site for spec in specs for site in spec.sites]
+        fetched = await self.call(combined, service, site_query(query, sites), quota * len(specs), mode, deadline,
+                                  members=tuple(specs))
+
+        partitions: Dict[str, List[Dict]] = {spec.name: [] for spec in specs}
+        surplus: List[Dict] = []
+        for result in fetched:
+            spec = next((spec for spec in specs if _on_sites(result.get("url"), spec.sites)), None)
+            if spec is None:
+                continue
+            self._label([result], spec)
+            (partitions[spec.name] if len(partitions[spec.name]) < quota else surplus).append(result)
+
+        # An empty combined answer means the engine failed or has nothing; asking it per site won't help
+        if fetched:
+            # Emptiest sites first
+            for spec in sorted(specs, key=lambda spec: len(partitions[spec.name])):
+                missing = quota - len(partitions[spec.name])
+                if missing <= 0 or collected + sum(map(len, partitions.values())) >= max_results:
+                    continue
+                if mode is not None and self._skip(mode, spec, deadline):
+                    continue
+                topped_up = await self.call(spec, service, query, missing, mode, deadline)
+                partitions[spec.name].extend(self._label(topped_up, spec)[:missing])
+
+        results = [result for spec in specs for result in partitions[spec.name]]
+        return results + surplus[:max(0, remaining - len(results))]
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {name: metrics.as_dict() for name, metrics in sorted(self.metrics.items())}
+
+    def stats_snapshot(self) -> List[Dict]:
+        """Rolling statistics per focus mode and provider, with the state the plans act on"""
+        return [
+            {"mode": mode, "provider": provider, "samples": stats.samples, "latency_seconds": round(stats.latency, 4),
+             "error_rate": round(stats.error_rate, 4), "mean_yield": round(stats.mean_yield, 2), "state": stats.state}
+            for (mode, provider), stats in sorted(self.stats.items())
+        ]
+
+
+def site_query(query: str, sites: Tuple[str, ...]) -> str:
+    """The query restricted to the sites: `query site:a` or `query (site:a OR site:b)`"""
+    filters = [f"site:{site}" for site in sites]
+    return f"{query} {filters[0]}" if len(filters) == 1 else f"{query} ({' OR '.join(filters)})"
+
+
+def _on_sites(url: Optional[str], sites: Tuple[str, ...]) -> bool:
+    host = (urlsplit(url or "").hostname or "").lower()
+    return any(host == site or host.endswith("." + site) for site in sites)
+
+
+def _youtube_video(result: Dict) -> None:
+    # The video id YouTubeService.search_youtube results carry, for transcripts later
+    result.setdefault("video_id", YouTubeService.extract_video_id(result.get("url") or ""))
+
+
+def _site_search(suffix: str) -> ProviderFetch:
+    """A DuckDuckGo search restricted by query operators"""
+    return lambda service, query, count: service._duckduckgo_search(f"{query} {suffix}", count)
+
+
+def _sites_search(*sites: str) -> ProviderFetch:
+    return lambda service, query, count: service._duckduckgo_search(site_query(query, sites), count)
+
+
+_ALL_MODES = frozenset({"web", "social", "academic"})
+
+register_provider(ProviderSpec(
+    "wikipedia", lambda service, query, count: service.wikipedia_service.search_wikipedia(query, max_results=count),
+    modes=_ALL_MODES, priority=10, timeout=8.0, concurrency=8, cost=0.1,
+))
+register_provider(ProviderSpec(
+    "wikipedia_fallback",
+    lambda service, query, count: service.wikipedia_service.search_wikipedia_fallback(query, max_results=count),
+    modes=frozenset({"web"}), priority=10, timeout=12.0, concurrency=4, cost=0.3, label="wikipedia",
+))
+# DuckDuckGo retries with backoff on its own, hence the longer timeouts; it rate-limits
+# aggressively, so it and every site-scoped search through it share two calls at a time
+register_provider(ProviderSpec(
+    "duckduckgo", lambda service, query, count: service._duckduckgo_search(query, count),
+    modes=_ALL_MODES, priority=20, timeout=15.0, concurrency=2, cost=0.5, combines_sites=True,
+))
+register_provider(ProviderSpec(
+    "bing", lambda service, query, count: service._bing_search(query, count),
+    modes=frozenset({"web"}), priority=30, timeout=10.0, concurrency=4, cost=1.0,
+    available=lambda: bool(settings.bing_search_api_key),
+))
+register_provider(ProviderSpec(
+    "google", lambda service, query, count: service._google_search(query, count),
+    modes=frozenset({"web"}), priority=40, timeout=10.0, concurrency=4, cost=1.0,
+    available=lambda: bool(settings.google_search_api_key and settings.google_cse_id),
+))
+register_provider(ProviderSpec(
+    "reddit", lambda service, query, count: service.reddit_service.search_reddit(query, max_results=count),
+    modes=frozenset({"social"}), priority=1, timeout=10.0, concurrency=4, cost=0.3,
+))
+# YouTube is searched through DuckDuckGo too (site:youtube.com), so it joins the combined site query
+register_provider(ProviderSpec(
+    "youtube", lambda service, query, count: service.youtube_service.search_youtube(query, max_results=count),
+    modes=frozenset({"social"}), priority=2, timeout=10.0, cost=0.3, engine="duckduckgo",
+    sites=("youtube.com", "youtu.be"), annotate=_youtube_video,
+))
+register_provider(ProviderSpec(
+    "linkedin", _sites_search("linkedin.com"),
+    modes=frozenset({"social"}), priority=3, timeout=15.0, cost=0.5, engine="duckduckgo", sites=("linkedin.com",),
+))
+register_provider(ProviderSpec(
+    "twitter", _sites_search("twitter.com", "x.com"),
+    modes=frozenset({"social"}), priority=4, timeout=15.0, cost=0.5, engine="duckduckgo", sites=("twitter.com", "x.com"),
+))
+register_provider(ProviderSpec(
+    "github", _sites_search("github.com"),
+    modes=frozenset({"social"}), priority=5, timeout=15.0, cost=0.5, engine="duckduckgo", sites=("github.com",),
+))
+register_provider(ProviderSpec(
+    "scholarly", _site_search("(site:edu OR site:org OR site:gov OR filetype:pdf)"),
+    modes=frozenset({"academic"}), priority=1, timeout=15.0, cost=0.5, engine="duckduckgo",
+))
+
+# Web: Wikipedia (reliable) and DuckDuckGo always; Wikipedia's term-by-term fallback when
+# both came back empty; the keyed APIs only to fill up
+register_plan(FocusPlan("web", (
+    PlanStep("wikipedia", limit=3),
+    PlanStep("duckduckgo"),
+    PlanStep("wikipedia_fallback", WHEN_EMPTY, limit=3),
+    PlanStep("bing", WHEN_SHORT),
+    PlanStep("google", WHEN_SHORT),
+)))
+# Social: Reddit for a third of the pool, then YouTube and the other site-scoped searches
+# (one combined DuckDuckGo query, topped up per site), then Wikipedia and the open web;
+# everything counts as a social source
+register_plan(FocusPlan("social", (
+    PlanStep("reddit", share=1 / 3, minimum=3),
+    PlanStep("youtube", WHEN_SHORT, share=1 / 2, minimum=2),
+    PlanStep("linkedin", WHEN_SHORT),
+    PlanStep("twitter", WHEN_SHORT),
+    PlanStep("github", WHEN_SHORT),
+    PlanStep("wikipedia", WHEN_SHORT, limit=2),
+    PlanStep("duckduckgo", WHEN_SHORT),
+), source_type="social"))
+# Academic: scholarly domains and PDFs, then Wikipedia and the open web
+register_plan(FocusPlan("academic", (
+    PlanStep("scholarly"),
+    PlanStep("wikipedia", WHEN_SHORT, limit=2),
+    PlanStep("duckduckgo", WHEN_SHORT),
+), source_type="academic"))
+
+# Shared by every SearchService
+provider_executor = ProviderExecutor()
@@ -1,23 +1,49 @@
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
 from app.models import SearchCache
+from app.core.write_queue import WriteQueue
 from app.services.youtube_service import YouTubeService
 from app.services.reddit_service import RedditService
 from app.services.wikipedia_service import WikipediaService
+from app.services.local_knowledge import LocalKnowledgeProvider, knowledge_entries, knowledge_upsert
+from app.services.dedup import collapse_duplicates
+from app.services.ranking import rank_results
+from app.services.search_providers import ProviderExecutor, provider_executor
 from app.core.config import settings
 import logging
 import asyncio
 import json
-from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 
 
+# How long cached search results are served (expired rows are purged by the retention job)
+CACHE_TTL = timedelta(hours=1)
+
 class SearchService:
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: Optional[AsyncSession] = None,
+        writer: Optional[WriteQueue] = None,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        executor: Optional[ProviderExecutor] = None
+    ):
+        # Either a session to use throughout, or a factory for short-lived sessions that
+        # are only open around cache reads (nothing is held while providers are queried)
         self.db = db
+        self.session_factory = session_factory
+        # Cache inserts go through the shared write queue when one is given
+        self.writer = writer
+        # Runs the focus-mode plans (see search_providers); shared so limits and metrics are process-wide
+        self.executor = executor or provider_executor
         self.youtube_service = YouTubeService()
         self.reddit_service = RedditService()
         self.wikipedia_service = WikipediaService()
+        self.local_knowledge = (
+            LocalKnowledgeProvider(settings.local_knowledge_half_life_days)
+            if settings.local_knowledge_enabled else None
+        )
         self._timeout = 10.0
     
     async def _fetch_json(self, url: str, headers: Optional[Dict] = None, params: Optional[Dict] = None) -> Dict:
@@ -37,211 +63,80 @@ class SearchService:
     async def multi_source_search(self, query: str, max_results: int = 10, focus_mode: str = 'web') -> List[Dict]:
         """Perform multi-source search based on focus mode
         
-        Supports: web, social, academic
+        Supports: web, social, academic (the plans in search_providers)
+
+        Providers are asked for more results than needed (the same requests, larger
+        counts); the pool is re-ranked against the query before it is cut to max_results.
         """
         
         # Check cache first (cache for 1 hour)
         cache_key = f"{query}_{focus_mode}"
         cached_results = await self._get_cached_results(cache_key)
         if cached_results:
-            return cached_results[:max_results]
-        
-        results = []
-        
-        if focus_mode == 'web':
-            # Web search: Always include Wikipedia, then DuckDuckGo, Bing, Google
-            # Try Wikipedia first as it's reliable
-            try:
-                wiki_results = await self.wikipedia_service.search_wikipedia(query, max_results=min(3, max_results))
-                if wiki_results:
-                    results.extend(wiki_results)
-                    logging.getLogger(__name__).info("Wikipedia search returned %d results", len(wiki_results))
-            except Exception as e:
-                logging.getLogger(__name__).exception("Wikipedia search failed")
-            
-            # Then try DuckDuckGo
-            try:
-                ddg_results = await self._duckduckgo_search(query, max_results - len(results))
-                if ddg_results:
-                    results.extend(ddg_results)
-                    logging.getLogger(__name__).info("DuckDuckGo search returned %d results", len(ddg_results))
-                else:
-                    logging.getLogger(__name__).info("DuckDuckGo search returned no results")
-            except Exception as e:
-                logging.getLogger(__name__).exception("DuckDuckGo search failed")
-            
-            # If still no results, try Wikipedia fallback
-            if len(results) == 0:
-                try:
-                    wiki_fallback = await self.wikipedia_service.search_wikipedia_fallback(query, max_results=3)
-                    if wiki_fallback:
-                        results.extend(wiki_fallback)
-                        logging.getLogger(__name__).info("Wikipedia fallback returned %d results", len(wiki_fallback))
-                except Exception as e:
-                    logging.getLogger(__name__).exception("Wikipedia fallback failed")
-            
-            if len(results) < max_results and settings.bing_search_api_key:
-                try:
-                    bing_results = await self._bing_search(query, max_results - len(results))
-                    results.extend(bing_results)
-                except Exception as e:
-                    logging.getLogger(__name__).exception("Bing search failed")
-            
-            if len(results) < max_results and settings.google_search_api_key and settings.google_cse_id:
-                try:
-                    google_results = await self._google_search(query, max_results - len(results))
-                    results.extend(google_results)
-                except Exception as e:
-                    logging.getLogger(__name__).exception("Google search failed")
+            local_results = await self._local_search(query, max_results, focus_mode)
+            return self._rank_with_local(query, cached_results, local_results, max_results)
         
-        elif focus_mode == 'social':
-            # Social search: Reddit, YouTube, LinkedIn, Twitter, GitHub - all marked as 'social'
-            try:
-                reddit_results = await self.reddit_service.search_reddit(query, max_results=max(max_results // 3, 3))
-                # Mark as social
-                for result in reddit_results:
-                    result["source_type"] = "social"
-                results.extend(reddit_results)
-            except Exception as e:
-                logging.getLogger(__name__).exception("Reddit search failed")
-            
-            # YouTube search
-            if len(results) < max_results:
-                try:
-                    youtube_results = await self.youtube_service.search_youtube(query, max_results=max((max_results - len(results)) // 2, 2))
-                    # Mark as social
-                    for result in youtube_results:
-                        result["source_type"] = "social"
-                    results.extend(youtube_results)
-                except Exception as e:
-                    logging.getLogger(__name__).exception("YouTube search failed")
-            
-            # LinkedIn search using structured query
-            if len(results) < max_results:
-                linkedin_query = f"{query} site:linkedin.com"
-                try:
-                    ddg_results = await self._duckduckgo_search(linkedin_query, max_results - len(results))
-                    # Mark as social
-                    for result in ddg_results:
-                        result["source_type"] = "social"
-                    results.extend(ddg_results)
-                except Exception as e:
-                    logging.getLogger(__name__).exception("LinkedIn search failed")
-            
-            # Twitter/X search
-            if len(results) < max_results:
-                twitter_query = f"{query} (site:twitter.com OR site:x.com)"
-                try:
-                    ddg_results = await self._duckduckgo_search(twitter_query, max_results - len(results))
-                    # Mark as social
-                    for result in ddg_results:
-                        result["source_type"] = "social"
-                    results.extend(ddg_results)
-                except Exception as e:
-                    logging.getLogger(__name__).exception("Twitter search failed")
-            
-            # GitHub search
-            if len(results) < max_results:
-                github_query = f"{query} site:github.com"
-                try:
-                    ddg_results = await self._duckduckgo_search(github_query, max_results - len(results))
-                    # Mark as social
-                    for result in ddg_results:
-                        result["source_type"] = "social"
-                    results.extend(ddg_results)
-                except Exception as e:
-                    logging.getLogger(__name__).exception("GitHub search failed")
-            
-            # Fallback to Wikipedia and web if not enough results
-            if len(results) < max_results:
-                try:
-                    wiki_results = await self.wikipedia_service.search_wikipedia(query, max_results=2)
-                    # Mark as social since user selected social mode
-                    for result in wiki_results:
-                        result["source_type"] = "social"
-                    results.extend(wiki_results)
-                except Exception as e:
-                    logging.getLogger(__name__).exception("Wikipedia fallback failed")
-                
-                if len(results) < max_results:
-                    try:
-                        ddg_results = await self._duckduckgo_search(query, max_results - len(results))
-                        # Mark as social since user selected social mode
-                        for result in ddg_results:
-                            result["source_type"] = "social"
-                        results.extend(ddg_results)
-                    except Exception as e:
-                        logging.getLogger(__name__).exception("DuckDuckGo search failed")
+        # Our own corpus is searched while the network providers are queried
+        local_task = asyncio.create_task(self._local_search(query, max_results, focus_mode))
+        # Candidate pool size; whether another provider is tried still depends on max_results
+        fetch_size = max_results * max(1, settings.search_overfetch_factor)
         
-        elif focus_mode == 'academic':
-            # Academic search: Focus on scholarly sources
-            academic_query = f"{query} (site:edu OR site:org OR site:gov OR filetype:pdf)"
-            try:
-                ddg_results = await self._duckduckgo_search(academic_query, max_results)
-                # Mark as academic source type
-                for result in ddg_results:
-                    result["source_type"] = "academic"
-                results.extend(ddg_results)
-            except Exception as e:
-                logging.getLogger(__name__).exception("Academic search failed")
-            
-            # Fallback to Wikipedia and regular web search (still mark as academic)
-            if len(results) < max_results:
-                try:
-                    wiki_results = await self.wikipedia_service.search_wikipedia(query, max_results=2)
-                    # Mark as academic since user selected academic mode
-                    for result in wiki_results:
-                        result["source_type"] = "academic"
-                    results.extend(wiki_results)
-                except Exception as e:
-                    logging.getLogger(__name__).exception("Wikipedia fallback failed")
-                
-                if len(results) < max_results:
-                    try:
-                        ddg_results = await self._duckduckgo_search(query, max_results - len(results))
-                        # Mark as academic since user selected academic mode
-                        for result in ddg_results:
-                            result["source_type"] = "academic"
-                        results.extend(ddg_results)
-                    except Exception as e:
-                        logging.getLogger(__name__).exception("DuckDuckGo search failed")
+        try:
+            results = await self.executor.run(self, focus_mode, query, max_results, fetch_size)
+        except BaseException:
+            # Cancelled (a discarded speculative fallback) or failed: don't leave the local search running
+            local_task.cancel()
+            raise
         
-        # Cache results
+        # Collected before caching: the cache write may use the same session
+        local_results = await local_task
+
+        # Cache the whole candidate pool (network results only; local ones are already stored)
         await self._cache_results(cache_key, results)
         
-        return results[:max_results]
+        return self._rank_with_local(query, results, local_results, max_results)
+
+    async def _local_search(self, query: str, max_results: int, focus_mode: str) -> List[Dict]:
+        """Results from the local knowledge index; never fails the search"""
+        if self.local_knowledge is None:
+            return []
+        try:
+            async with self._session() as session:
+                return await self.local_knowledge.search(session, query, max_results, focus_mode)
+        except Exception:
+            logging.getLogger(__name__).exception("Local knowledge search failed")
+            return []
+
+    @staticmethod
+    def merge_results(query: str, result_lists: List[List[Dict]], max_results: int) -> List[Dict]:
+        """
+        Concatenate result lists (earlier lists win duplicates), collapse duplicate URLs and
+        near-duplicate snippets in one linear pass, and keep the best max_results
+        """
+        candidates = [result for results in result_lists for result in results]
+        return rank_results(query, collapse_duplicates(candidates), max_results)
+
+    @classmethod
+    def _rank_with_local(cls, query: str, results: List[Dict], local_results: List[Dict], max_results: int) -> List[Dict]:
+        """Re-rank network results together with local ones for pages the network did not return"""
+        return cls.merge_results(query, [results, local_results], max_results)
 
     async def search_across_modes(self, query: str, modes: List[str], max_results: int = 10) -> List[Dict]:
-        seen_urls = set()
-        merged: List[Dict] = []
+        partials: List[List[Dict]] = []
         for mode in modes:
-            partial = await self.multi_source_search(query, max_results, mode)
-            for r in partial:
-                u = r.get('url', '')
-                if u in seen_urls:
-                    continue
-                merged.append(r)
-                seen_urls.add(u)
-            if len(merged) >= max_results:
+            partials.append(await self.multi_source_search(query, max_results, mode))
+            if len(collapse_duplicates([r for partial in partials for r in partial])) >= max_results:
                 break
-        return merged[:max_results]
+        return self.merge_results(query, partials, max_results)
 
     async def search_all_sources(self, query: str, max_results: int = 10) -> List[Dict]:
         """Aggregate results across web, social, and academic with de-duplication"""
-        modes = ['web', 'social', 'academic']
-        seen_urls = set()
-        merged: List[Dict] = []
-        for mode in modes:
-            partial = await self.multi_source_search(query, max_results, mode)
-            for r in partial:
-                u = r.get('url', '')
-                if not u or u in seen_urls:
-                    continue
-                merged.append(r)
-                seen_urls.add(u)
-            if len(merged) >= max_results:
-                break
-        return merged[:max_results]
+        return await self.search_across_modes(query, ['web', 'social', 'academic'], max_results)
+
+    @classmethod
+    def merge_fallback(cls, query: str, results: List[Dict], fallback_results: List[Dict], max_results: int) -> List[Dict]:
+        """Add cross-source fallback results to the focus-mode ones and keep the best max_results"""
+        return cls.merge_results(query, [results, fallback_results], max_results)
     
     async def _duckduckgo_search(self, query: str, max_results: int) -> List[Dict]:
         """Search using DuckDuckGo with retry logic"""
@@ -292,7 +187,8 @@ class SearchService:
                         continue
                     else:
                         logging.getLogger(__name__).warning("DuckDuckGo rate limit exceeded after all retries")
-                        return []
+                        # An error, not an empty answer (the executor caches the two differently)
+                        raise
                 
                 # For other errors, try again if not last attempt
                 if attempt < max_retries - 1:
@@ -300,7 +196,7 @@ class SearchService:
                     retry_delay *= 2
                 else:
                     logging.getLogger(__name__).warning("DuckDuckGo search failed after %d attempts", max_retries)
-                    return []
+                    raise
         
         return []
     
@@ -309,65 +205,72 @@ class SearchService:
         if not settings.bing_search_api_key:
             return []
         
-        try:
-            url = "https://api.bing.microsoft.com/v7.0/search"
-            headers = {"Ocp-Apim-Subscription-Key": settings.bing_search_api_key}
-            params = {"q": query, "count": max_results}
-            data = await self._fetch_json(url, headers=headers, params=params)
-            
-            results = []
-            for item in data.get("webPages", {}).get("value", []):
-                results.append({
-                    "title": item.get("name", ""),
-                    "url": item.get("url", ""),
-                    "snippet": item.get("snippet", ""),
-                    "source_type": "web"
-                })
-            return results
-        except Exception as e:
-            logging.getLogger(__name__).exception("Bing search error")
-            return []
+        # Errors propagate: the provider executor logs them and caches the failure briefly
+        url = "https://api.bing.microsoft.com/v7.0/search"
+        headers = {"Ocp-Apim-Subscription-Key": settings.bing_search_api_key}
+        params = {"q": query, "count": max_results}
+        data = await self._fetch_json(url, headers=headers, params=params)
+        
+        results = []
+        for item in data.get("webPages", {}).get("value", []):
+            results.append({
+                "title": item.get("name", ""),
+                "url": item.get("url", ""),
+                "snippet": item.get("snippet", ""),
+                "source_type": "web"
+            })
+        return results
     
     async def _google_search(self, query: str, max_results: int) -> List[Dict]:
         """Search using Google Custom Search API"""
         if not settings.google_search_api_key or not settings.google_cse_id:
             return []
         
-        try:
-            url = "https://www.googleapis.com/customsearch/v1"
-            params = {
-                "key": settings.google_search_api_key,
-                "cx": settings.google_cse_id,
-                "q": query,
-                "num": min(max_results, 10)
-            }
-            data = await self._fetch_json(url, params=params)
-            
-            results = []
-            for item in data.get("items", []):
-                results.append({
-                    "title": item.get("title", ""),
-                    "url": item.get("link", ""),
-                    "snippet": item.get("snippet", ""),
-                    "source_type": "web"
-                })
-            return results
-        except Exception as e:
-            logging.getLogger(__name__).exception("Google search error")
-            return []
+        url = "https://www.googleapis.com/customsearch/v1"
+        params = {
+            "key": settings.google_search_api_key,
+            "cx": settings.google_cse_id,
+            "q": query,
+            "num": min(max_results, 10)
+        }
+        data = await self._fetch_json(url, params=params)
+        
+        results = []
+        for item in data.get("items", []):
+            results.append({
+                "title": item.get("title", ""),
+                "url": item.get("link", ""),
+                "snippet": item.get("snippet", ""),
+                "source_type": "web"
+            })
+        return results
     
+    @asynccontextmanager
+    async def _session(self):
+        if self.db is not None:
+            yield self.db
+        else:
+            async with self.session_factory() as session:
+                yield session
+
+    @staticmethod
+    def _cache_lookup(cache_key: str, fresh_after: datetime):
+        """Fresh cache entry for a key (served by the unique index on query)"""
+        return (
+            select(SearchCache)
+            .where(SearchCache.query == cache_key)
+            .where(SearchCache.created_at > fresh_after)
+            .order_by(SearchCache.created_at.desc())
+            .limit(1)
+        )
+
     async def _get_cached_results(self, cache_key: str) -> Optional[List[Dict]]:
         """Get cached search results if available and fresh"""
         try:
-            one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-            result = await self.db.execute(
-                select(SearchCache)
-                .where(SearchCache.query == cache_key)
-                .where(SearchCache.created_at > one_hour_ago)
-                .order_by(SearchCache.created_at.desc())
-                .limit(1)
-            )
-            cache_entry = result.scalar_one_or_none()
+            fresh_after = datetime.now(timezone.utc) - CACHE_TTL
+            async with self._session() as session:
+                result = await session.execute(self._cache_lookup(cache_key, fresh_after))
+                cache_entry = result.scalar_one_or_none()
             
             if cache_entry:
                 return cache_entry.results_json
@@ -376,16 +279,47 @@ class SearchService:
         
         return None
     
+    @staticmethod
+    def _cache_upsert(session: AsyncSession, cache_key: str, results: List[Dict]):
+        """INSERT ... ON CONFLICT (query) DO UPDATE, so refreshing a key never duplicates rows"""
+        if session.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(SearchCache).values(query=cache_key, results_json=results, created_at=func.now())
+        return statement.on_conflict_do_update(
+            index_elements=[SearchCache.query],
+            set_={"results_json": statement.excluded.results_json, "created_at": statement.excluded.created_at}
+        )
+
+    @staticmethod
+    async def _remember(session: AsyncSession, results: List[Dict]):
+        """Add the results to the local knowledge index"""
+        entries = knowledge_entries(results)
+        if entries:
+            await session.execute(knowledge_upsert(session.get_bind().dialect.name, entries))
+
     async def _cache_results(self, cache_key: str, results: List[Dict]):
         """Cache search results"""
+        if self.writer is not None:
+            async def upsert_cache_entry(session: AsyncSession):
+                await session.execute(self._cache_upsert(session, cache_key, results))
+                await self._remember(session, results)
+
+            try:
+                await self.writer.submit(upsert_cache_entry)
+            except Exception as e:
+                logging.getLogger(__name__).exception("Cache storage error")
+            return
+
         try:
-            cache_entry = SearchCache(
-                query=cache_key,
-                results_json=results
-            )
-            self.db.add(cache_entry)
-            await self.db.commit()
+            async with self._session() as session:
+                try:
+                    await session.execute(self._cache_upsert(session, cache_key, results))
+                    await self._remember(session, results)
+                    await session.commit()
+                except Exception:
+                    await session.rollback()
+                    raise
         except Exception as e:
             logging.getLogger(__name__).exception("Cache storage error")
-            await self.db.rollback()
-
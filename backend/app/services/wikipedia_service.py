@@ -12,53 +12,52 @@ class WikipediaService:
         self.search_url = "https://en.wikipedia.org/w/api.php"
     
     async def search_wikipedia(self, query: str, max_results: int = 5) -> List[Dict]:
-        """Search Wikipedia for articles matching the query"""
+        """Search Wikipedia for articles matching the query
+
+        A failed search request raises (callers tell errors from "no articles"); articles
+        whose summary cannot be fetched are skipped.
+        """
         results = []
         
-        try:
-            # Use Wikipedia Search API
-            params = {
-                "action": "query",
-                "list": "search",
-                "srsearch": query,
-                "srlimit": max_results,
-                "format": "json",
-                "utf8": 1
-            }
-            
-            # Wikipedia requires a User-Agent header
-            headers = {
-                "User-Agent": "Moplexity/1.0 (https://github.com/yourusername/moplexity; contact@example.com)"
-            }
-            
-            async with httpx.AsyncClient(timeout=10.0, headers=headers) as client:
-                response = await client.get(self.search_url, params=params)
-                response.raise_for_status()
-                data = response.json()
-            
-            search_results = data.get("query", {}).get("search", [])
-            
-            # Fetch summaries for each result
-            for item in search_results:
-                title = item.get("title", "")
-                page_id = item.get("pageid")
-                
-                if title and page_id:
-                    # Get article summary
-                    summary_result = await self._get_article_summary(title)
-                    if summary_result:
-                        results.append({
-                            "title": title,
-                            "url": f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}",
-                            "snippet": summary_result.get("extract", ""),
-                            "source_type": "web"
-                        })
-            
-            return results
+        # Use Wikipedia Search API
+        params = {
+            "action": "query",
+            "list": "search",
+            "srsearch": query,
+            "srlimit": max_results,
+            "format": "json",
+            "utf8": 1
+        }
+        
+        # Wikipedia requires a User-Agent header
+        headers = {
+            "User-Agent": "Moplexity/1.0 (https://github.com/yourusername/moplexity; contact@example.com)"
+        }
+        
+        async with httpx.AsyncClient(timeout=10.0, headers=headers) as client:
+            response = await client.get(self.search_url, params=params)
+            response.raise_for_status()
+            data = response.json()
+        
+        search_results = data.get("query", {}).get("search", [])
+        
+        # Fetch summaries for each result
+        for item in search_results:
+            title = item.get("title", "")
+            page_id = item.get("pageid")
             
-        except Exception as e:
-            logging.getLogger(__name__).exception("Wikipedia search error")
-            return []
+            if title and page_id:
+                # Get article summary
+                summary_result = await self._get_article_summary(title)
+                if summary_result:
+                    results.append({
+                        "title": title,
+                        "url": f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}",
+                        "snippet": summary_result.get("extract", ""),
+                        "source_type": "web"
+                    })
+        
+        return results
     
     async def _get_article_summary(self, title: str) -> Optional[Dict]:
         """Get article summary using Wikipedia REST API"""
@@ -87,27 +86,23 @@ class WikipediaService:
             return None
     
     async def search_wikipedia_fallback(self, query: str, max_results: int = 3) -> List[Dict]:
-        """Simplified Wikipedia search for fallback scenarios"""
-        try:
-            # Try direct article lookup first
-            results = await self.search_wikipedia(query, max_results)
-            
-            # If no results, try searching for related topics
-            if not results:
-                # Extract key terms from query
-                key_terms = self._extract_key_terms(query)
-                for term in key_terms[:2]:  # Try top 2 terms
-                    results = await self.search_wikipedia(term, max_results=2)
-                    if results:
-                        break
-            
-            return results
-            
-        except Exception as e:
-            logging.getLogger(__name__).exception("Wikipedia fallback error")
-            return []
+        """Simplified Wikipedia search for fallback scenarios (raises like search_wikipedia)"""
+        # Try direct article lookup first
+        results = await self.search_wikipedia(query, max_results)
+        
+        # If no results, try searching for related topics
+        if not results:
+            # Extract key terms from query
+            key_terms = self._extract_key_terms(query)
+            for term in key_terms[:2]:  # Try top 2 terms
+                results = await self.search_wikipedia(term, max_results=2)
+                if results:
+                    break
+        
+        return results
     
-    def _extract_key_terms(self, query: str) -> List[str]:
+    @staticmethod
+    def _extract_key_terms(query: str) -> List[str]:
         """Extract key terms from query for better Wikipedia searching"""
         # Remove common words
         stop_words = {"what", "is", "the", "a", "an", "how", "why", "when", "where", "who", "do", "does", "did", "can", "could", "should", "will", "would"}
@@ -1,7 +1,5 @@
 from typing import List, Dict
 import re
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
 import logging
 
 
@@ -9,7 +7,8 @@ class YouTubeService:
     def __init__(self):
         pass
     
-    def extract_video_id(self, url: str) -> str:
+    @staticmethod
+    def extract_video_id(url: str) -> str:
         """Extract video ID from YouTube URL"""
         patterns = [
             r'(?:youtube\.com\/watch\?v=|youtu\.be\/)([^&\n?#]+)',
@@ -26,6 +25,9 @@ class YouTubeService:
     
     async def get_transcript(self, video_id: str) -> Dict:
         """Get transcript for a YouTube video"""
+        # Imported here so the transcript client (and requests) stay off the startup path
+        from youtube_transcript_api import YouTubeTranscriptApi
+        from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
         try:
             transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
             
@@ -71,36 +73,32 @@ class YouTubeService:
         return results
 
     async def search_youtube(self, query: str, max_results: int = 5) -> List[Dict]:
-        """Search YouTube via DuckDuckGo (no Google API) and return video links"""
-        try:
-            # Prefer site-scoped search to YouTube
-            ddg_query = f"{query} site:youtube.com"
-            from duckduckgo_search import DDGS
-            fetched = []
-            results: List[Dict] = []
-            with DDGS() as ddgs:
-                # Run blocking search in a thread to avoid event loop blocking
-                import asyncio
-                fetched = await asyncio.to_thread(lambda: list(ddgs.text(ddg_query, max_results=max_results)))
-            for item in fetched:
-                title = item.get("title", "")
-                href = item.get("href", "")
-                body = item.get("body", "")
-                if not title or not href:
-                    continue
-                # Extract video id if present to enable transcripts later
-                vid = self.extract_video_id(href)
-                results.append({
-                    "title": title,
-                    "url": href,
-                    "snippet": body[:500],
-                    "source_type": "youtube",
-                    "video_id": vid
-                })
-            return results
-        except Exception as e:
-            logging.getLogger(__name__).exception("YouTube search error")
-            return []
+        """Search YouTube via DuckDuckGo (no Google API) and return video links; raises on search errors"""
+        # Prefer site-scoped search to YouTube
+        ddg_query = f"{query} site:youtube.com"
+        from duckduckgo_search import DDGS
+        fetched = []
+        results: List[Dict] = []
+        with DDGS() as ddgs:
+            # Run blocking search in a thread to avoid event loop blocking
+            import asyncio
+            fetched = await asyncio.to_thread(lambda: list(ddgs.text(ddg_query, max_results=max_results)))
+        for item in fetched:
+            title = item.get("title", "")
+            href = item.get("href", "")
+            body = item.get("body", "")
+            if not title or not href:
+                continue
+            # Extract video id if present to enable transcripts later
+            vid = self.extract_video_id(href)
+            results.append({
+                "title": title,
+                "url": href,
+                "snippet": body[:500],
+                "source_type": "youtube",
+                "video_id": vid
+            })
+        return results
     
     async def get_transcript_by_url(self, url: str) -> Dict:
         """Get transcript by YouTube URL"""
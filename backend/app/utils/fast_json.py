@@ -0,0 +1,73 @@
+"""
+orjson fast path for read endpoints.
+
+Endpoints select Core rows, arrange them in the field order of the matching response
+schema, and stream the encoded bytes, skipping ORM hydration, Pydantic validation and
+jsonable_encoder. The output is byte-for-byte what FastAPI renders for the response model.
+"""
+from typing import Any, Dict, Iterable, Iterator, Mapping, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency; endpoints keep the regular path
+    orjson = None
+
+# Array elements encoded per chunk of the response body
+CHUNK_SIZE = 100
+
+
+def fast_json_enabled() -> bool:
+    return settings.fast_json_responses and orjson is not None
+
+
+def dumps(value: Any) -> bytes:
+    # Pydantic renders UTC datetimes with a "Z" suffix
+    return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+
+
+def schema_fields(schema: Type[BaseModel], row: Mapping[str, Any], **nested: Any) -> Dict[str, Any]:
+    """Pick the schema's fields from a row, in declaration order; nested values override the row"""
+    return {name: nested[name] if name in nested else row[name] for name in schema.model_fields}
+
+
+class StreamedArray:
+    """Marks a value of a streamed object whose elements are encoded in chunks"""
+
+    def __init__(self, items: Iterable[Any]):
+        self.items = items
+
+
+def encode_array(items: Iterable[Any]) -> Iterator[bytes]:
+    yield b"["
+    batch = []
+    separator = b""
+    for item in items:
+        batch.append(dumps(item))
+        if len(batch) == CHUNK_SIZE:
+            yield separator + b",".join(batch)
+            batch = []
+            separator = b","
+    if batch:
+        yield separator + b",".join(batch)
+    yield b"]"
+
+
+def encode_object(fields: Mapping[str, Any]) -> Iterator[bytes]:
+    yield b"{"
+    for index, (key, value) in enumerate(fields.items()):
+        prefix = (b"," if index else b"") + dumps(key) + b":"
+        if isinstance(value, StreamedArray):
+            yield prefix
+            yield from encode_array(value.items)
+        else:
+            yield prefix + dumps(value)
+    yield b"}"
+
+
+def json_stream_response(body: Iterator[bytes], headers: Mapping[str, str] = None) -> StreamingResponse:
+    return StreamingResponse(body, media_type="application/json", headers=headers)
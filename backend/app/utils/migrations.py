@@ -1,68 +1,40 @@
 """
-Auto-migration utilities for database schema changes.
-Handles adding missing columns and updating schema based on SQLAlchemy models.
+Versioned schema migrations.
+
+The schema version is stored in the ``schema_version`` table. A database that is
+already at head is verified with a single query; pending steps run together in one
+transaction, and a file lock (plus an advisory lock on PostgreSQL) keeps several
+uvicorn workers or replicas from migrating at once.
 """
-from sqlalchemy import inspect, text, Column
+import asyncio
+import logging
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncEngine
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no fcntl; rely on the database lock alone
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+# Arbitrary application-wide key for pg_advisory_xact_lock
+MIGRATION_LOCK_KEY = 4242_0001
+
+
+def _column_ddl(conn: Connection, column: Column) -> str:
+    """Render the column definition used by ALTER TABLE ... ADD COLUMN"""
+    column_type = column.type.compile(conn.dialect)
 
-async def check_column_exists(engine: AsyncEngine, table_name: str, column_name: str) -> bool:
-    """Check if a column exists in a table"""
-    async with engine.connect() as conn:
-        # For SQLite, we query the sqlite_master table
-        if 'sqlite' in str(engine.url):
-            result = await conn.execute(
-                text(f"PRAGMA table_info({table_name})")
-            )
-            columns = result.fetchall()
-            return any(col[1] == column_name for col in columns)
-        else:
-            # For other databases, use information_schema
-            result = await conn.execute(
-                text("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = :table_name AND column_name = :column_name
-                """),
-                {"table_name": table_name, "column_name": column_name}
-            )
-            return result.fetchone() is not None
-
-
-async def check_table_exists(engine: AsyncEngine, table_name: str) -> bool:
-    """Check if a table exists"""
-    async with engine.connect() as conn:
-        if 'sqlite' in str(engine.url):
-            result = await conn.execute(
-                text("SELECT name FROM sqlite_master WHERE type='table' AND name=:name"),
-                {"name": table_name}
-            )
-            return result.fetchone() is not None
-        else:
-            result = await conn.execute(
-                text("""
-                    SELECT table_name 
-                    FROM information_schema.tables 
-                    WHERE table_name = :table_name
-                """),
-                {"table_name": table_name}
-            )
-            return result.fetchone() is not None
-
-
-async def add_column(engine: AsyncEngine, table_name: str, column: Column) -> bool:
-    """Add a column to a table if it doesn't exist"""
-    column_name = column.name
-    
-    # Check if column already exists
-    if await check_column_exists(engine, table_name, column_name):
-        print(f"Column {table_name}.{column_name} already exists, skipping")
-        return False
-    
-    # Build ALTER TABLE statement
-    column_type = column.type.compile(engine.dialect)
-    nullable = "NULL" if column.nullable else "NOT NULL"
-    
     # Handle default values
     default_clause = ""
     if column.server_default is not None:
@@ -76,153 +48,353 @@ async def add_column(engine: AsyncEngine, table_name: str, column: Column) -> bo
                 else:
                     # Otherwise, quote it
                     default_clause = f" DEFAULT '{default_value}'"
-            else:
-                default_clause = f" DEFAULT {default_value}"
+            elif conn.dialect.name != "sqlite":
+                # SQL expressions such as func.now(); SQLite rejects non-constant defaults on ADD COLUMN
+                default_clause = f" DEFAULT {default_value.compile(dialect=conn.dialect)}"
     elif column.default is not None:
         if hasattr(column.default, 'arg'):
             default_value = column.default.arg
             if isinstance(default_value, str):
                 default_clause = f" DEFAULT '{default_value}'"
-            else:
+            elif not callable(default_value):
                 default_clause = f" DEFAULT {default_value}"
-    
-    alter_sql = f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type} {nullable}{default_clause}"
-    
+
+    # Existing rows need a value, so NOT NULL is only enforced when there is a default to fill them
+    nullable = "NOT NULL" if not column.nullable and default_clause else "NULL"
+
+    # Both SQLite and PostgreSQL accept an inline REFERENCES clause on ADD COLUMN
+    references_clause = ""
+    for fk in column.foreign_keys:
+        ref_table, ref_column = fk.target_fullname.split(".")
+        references_clause = f" REFERENCES {ref_table}({ref_column})"
+
+    return f"{column.name} {column_type} {nullable}{default_clause}{references_clause}"
+
+
+def _add_missing_columns(conn: Connection, table) -> None:
+    """Add columns declared on the model but missing from an existing table"""
+    existing = {col["name"] for col in inspect(conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {_column_ddl(conn, column)}"))
+        logger.info("Added column %s.%s", table.name, column.name)
+
+
+def _baseline(conn: Connection) -> None:
+    """Bring pre-versioning databases (and fresh ones) up to the current models"""
+    from app.base import Base
+    import app.models  # noqa: F401 - register every model on Base.metadata
+
+    existing_tables = set(inspect(conn).get_table_names())
+
+    # llm_models used to reference a separate providers table; that schema is dropped and recreated
+    if 'llm_models' in existing_tables:
+        llm_columns = {col["name"] for col in inspect(conn).get_columns('llm_models')}
+        if {'provider_id', 'display_name'} & llm_columns or 'api_key' not in llm_columns:
+            logger.info("Detected old llm_models schema, dropping and recreating")
+            # PostgreSQL refuses to drop a table that conversations still reference
+            cascade = " CASCADE" if conn.dialect.name == "postgresql" else ""
+            conn.execute(text(f"DROP TABLE IF EXISTS llm_providers{cascade}"))
+            conn.execute(text(f"DROP TABLE IF EXISTS llm_models{cascade}"))
+            existing_tables -= {'llm_providers', 'llm_models'}
+
+    for table in Base.metadata.sorted_tables:
+        if table.name in existing_tables:
+            _add_missing_columns(conn, table)
+
+    Base.metadata.create_all(conn)
+
+
+def _search_cache_upsert_key(conn: Connection) -> None:
+    """Make search_cache.query unique so cache writes can upsert; JSONB payloads on PostgreSQL"""
+    # Keep the newest row per key before enforcing uniqueness
+    conn.execute(text(
+        "DELETE FROM search_cache WHERE id NOT IN (SELECT MAX(id) FROM search_cache GROUP BY query)"
+    ))
+    conn.execute(text("DROP INDEX IF EXISTS ix_search_cache_query"))
+    conn.execute(text("CREATE UNIQUE INDEX ix_search_cache_query ON search_cache (query)"))
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "ALTER TABLE search_cache ALTER COLUMN results_json TYPE JSONB USING results_json::jsonb"
+        ))
+
+
+# Indexes backing the hot queries (conversation list, history loads, source joins, cache expiry)
+QUERY_INDEXES = [
+    ("conversations", "ix_conversations_updated_at_id"),
+    ("messages", "ix_messages_conversation_id_created_at_id"),
+    ("sources", "ix_sources_message_id"),
+    ("search_cache", "ix_search_cache_created_at"),
+]
+
+
+def _query_indexes(conn: Connection) -> None:
+    """Create the indexes declared on the models for sort columns and foreign keys"""
+    from app.base import Base
+    import app.models  # noqa: F401 - register every model on Base.metadata
+
+    for table_name, index_name in QUERY_INDEXES:
+        table = Base.metadata.tables[table_name]
+        index = next(index for index in table.indexes if index.name == index_name)
+        # A database created by this version's baseline already has them
+        index.create(conn, checkfirst=True)
+
+
+def _conversation_summaries(conn: Connection) -> None:
+    """Add and backfill the denormalized columns read by the conversation list"""
+    from app.base import Base
+    import app.models  # noqa: F401 - register every model on Base.metadata
+
+    _add_missing_columns(conn, Base.metadata.tables["conversations"])
+    conn.execute(text(
+        "UPDATE conversations SET "
+        "message_count = (SELECT COUNT(*) FROM messages WHERE messages.conversation_id = conversations.id), "
+        # Keyset pagination compares (updated_at, id); NULLs would drop out of every page
+        "updated_at = COALESCE(updated_at, created_at, CURRENT_TIMESTAMP)"
+    ))
+
+    # The preview is the latest message on one line, cut to 200 characters, as chat writes it;
+    # the whitespace folding is done here because SQL has no portable equivalent
+    last_id = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, (SELECT content FROM messages WHERE messages.conversation_id = conversations.id "
+            "ORDER BY created_at DESC, id DESC LIMIT 1) AS content "
+            "FROM conversations WHERE id > :last_id ORDER BY id LIMIT 500"
+        ), {"last_id": last_id}).all()
+        if not rows:
+            break
+        previews = [{"id": row.id, "preview": " ".join(row.content.split())[:200]} for row in rows if row.content]
+        if previews:
+            conn.execute(text("UPDATE conversations SET last_message_preview = :preview WHERE id = :id"), previews)
+        last_id = rows[-1].id
+
+
+def tsvector_document(columns: List[str], prefix: str = "") -> str:
+    """The to_tsvector() expression PostgreSQL full-text indexes are built on; queries must repeat it"""
+    if len(columns) == 1:
+        return f"to_tsvector('english', {prefix}{columns[0]})"
+    joined = " || ' ' || ".join(f"coalesce({prefix}{column}, '')" for column in columns)
+    return f"to_tsvector('english', {joined})"
+
+
+def _create_fts_index(conn: Connection, fts_table: str, table: str, columns: List[str]) -> None:
+    """
+    Full-text index over columns of table.
+
+    SQLite gets an external-content FTS5 table (the text is not stored twice) kept in sync
+    by triggers; PostgreSQL gets a GIN index over tsvector_document(), which it maintains
+    itself.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_{'_'.join(columns)}_fts ON {table} "
+            f"USING GIN ({tsvector_document(columns)})"
+        ))
+        return
+
+    column_list = ", ".join(columns)
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+        f"{column_list}, content='{table}', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2')"
+    ))
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    delete_old = f"INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values});"
+    for name, event, body in (
+        ("ai", "AFTER INSERT", insert_new),
+        ("ad", "AFTER DELETE", delete_old),
+        ("au", f"AFTER UPDATE OF {column_list}", delete_old + " " + insert_new),
+    ):
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_{name} {event} ON {table} BEGIN {body} END"
+        ))
+    # Index the rows written before the triggers existed
+    conn.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+
+
+# Full-text indexes over conversation history: (FTS5 table, content table, indexed column)
+HISTORY_SEARCH_TABLES = [
+    ("messages_fts", "messages", "content"),
+    ("conversations_fts", "conversations", "title"),
+]
+
+
+def create_history_search_index(conn: Connection) -> None:
+    """Index message content and conversation titles for full-text search"""
+    for fts_table, table, column in HISTORY_SEARCH_TABLES:
+        _create_fts_index(conn, fts_table, table, [column])
+
+
+# Columns of knowledge_entries searched by the local knowledge provider
+KNOWLEDGE_SEARCH_COLUMNS = ["title", "snippet"]
+
+
+# Every result of every cached search as (url, title, snippet, source_type, provider, seen_at)
+_CACHED_RESULTS = {
+    "sqlite": (
+        "SELECT json_extract(r.value, '$.url'), json_extract(r.value, '$.title'), json_extract(r.value, '$.snippet'),"
+        " json_extract(r.value, '$.source_type'), json_extract(r.value, '$.provider'), c.created_at"
+        " FROM search_cache c,"
+        " json_each(CASE WHEN json_type(c.results_json) = 'array' THEN c.results_json ELSE '[]' END) r"
+    ),
+    "postgresql": (
+        "SELECT r.value ->> 'url', r.value ->> 'title', r.value ->> 'snippet', r.value ->> 'source_type',"
+        " r.value ->> 'provider', c.created_at"
+        " FROM search_cache c, jsonb_array_elements(CASE WHEN jsonb_typeof(CAST(c.results_json AS jsonb)) = 'array'"
+        " THEN CAST(c.results_json AS jsonb) ELSE CAST('[]' AS jsonb) END) r"
+    ),
+}
+
+
+def create_knowledge_index(conn: Connection) -> None:
+    """Create knowledge_entries with its full-text index and fill it from stored sources and cached results"""
+    from app.models import KnowledgeEntry
+
+    KnowledgeEntry.__table__.create(conn, checkfirst=True)
+    _create_fts_index(conn, "knowledge_fts", "knowledge_entries", KNOWLEDGE_SEARCH_COLUMNS)
+
+    # Stored sources and cached results, the most recent sighting of each URL. Plain SQL, so
+    # this step does the same work whatever the application code looks like later; rows are
+    # keyed by their URL as is (migration 7 re-keys them canonically).
+    conn.execute(text(
+        "INSERT INTO knowledge_entries (url_key, url, title, snippet, source_type, last_seen_at)"
+        " SELECT substr(url, 1, 2048), url, substr(title, 1, 500), COALESCE(snippet, ''),"
+        " COALESCE(source_type, 'web'), COALESCE(seen_at, CURRENT_TIMESTAMP)"
+        " FROM (SELECT candidates.*, ROW_NUMBER() OVER ("
+        "PARTITION BY substr(url, 1, 2048) ORDER BY seen_at DESC) AS sighting"
+        " FROM (SELECT url, title, snippet, source_type, NULL AS provider, created_at AS seen_at FROM sources"
+        f" UNION ALL {_CACHED_RESULTS[conn.dialect.name]}"
+        ") AS candidates"
+        " WHERE url <> '' AND title <> '' AND COALESCE(provider, '') <> 'local') AS ranked"
+        " WHERE sighting = 1"
+    ))
+
+
+def _canonical_knowledge_keys(conn: Connection) -> None:
+    """Re-key knowledge_entries with canonical_url, keeping the most recent entry of each merged group"""
+    from app.models import KnowledgeEntry
+    from app.utils.urls import canonical_url
+
+    table = KnowledgeEntry.__table__
+    rows = conn.execute(
+        select(table.c.id, table.c.url, table.c.url_key)
+        .order_by(table.c.last_seen_at.desc(), table.c.id.desc())
+        .execution_options(yield_per=1000)
+    )
+    kept = set()
+    for row in rows:
+        key = canonical_url(row.url)[:2048]
+        if key in kept:
+            conn.execute(table.delete().where(table.c.id == row.id))
+            continue
+        kept.add(key)
+        if key != row.url_key:
+            # An older entry may still hold the new key; canonicalization would merge it into this one
+            conn.execute(table.delete().where(table.c.url_key == key))
+            conn.execute(table.update().where(table.c.id == row.id).values(url_key=key))
+
+
+# Ordered (version, description, step) entries. Steps receive a synchronous connection
+# inside the migration transaction and must never be edited once released; add a new
+# entry instead.
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline schema", _baseline),
+    (2, "unique search cache keys", _search_cache_upsert_key),
+    (3, "indexes for foreign keys and sort columns", _query_indexes),
+    (4, "conversation list summary columns", _conversation_summaries),
+    (5, "full-text search over conversation history", create_history_search_index),
+    (6, "local knowledge index over sources and cached results", create_knowledge_index),
+    (7, "canonical URL keys for local knowledge", _canonical_knowledge_keys),
+]
+
+HEAD_VERSION = MIGRATIONS[-1][0]
+
+
+async def get_schema_version(engine: AsyncEngine) -> int:
+    """Return the stored schema version, or 0 for an unversioned database"""
     try:
-        async with engine.begin() as conn:
-            await conn.execute(text(alter_sql))
-            print(f"✓ Added column {table_name}.{column_name}")
-            return True
-    except Exception as e:
-        print(f"✗ Error adding column {table_name}.{column_name}: {e}")
-        raise
-
-
-async def add_foreign_key_constraint(engine: AsyncEngine, table_name: str, column_name: str, 
-                                     referenced_table: str, referenced_column: str = "id") -> bool:
-    """Add a foreign key constraint (SQLite limited support)"""
-    if 'sqlite' in str(engine.url):
-        # SQLite has limited ALTER TABLE support
-        # Foreign keys are typically defined at table creation
-        # We'll check if FK exists by examining the table schema
         async with engine.connect() as conn:
-            result = await conn.execute(
-                text(f"PRAGMA foreign_key_list({table_name})")
-            )
-            fks = result.fetchall()
-            # Check if FK already exists
-            for fk in fks:
-                if fk[3] == column_name and fk[2] == referenced_table:
-                    print(f"Foreign key {table_name}.{column_name} -> {referenced_table}.{referenced_column} already exists")
-                    return False
-            
-            # SQLite doesn't support adding FKs via ALTER TABLE easily
-            # We'll just log a warning - the FK will be enforced at application level
-            print(f"Note: SQLite foreign key {table_name}.{column_name} -> {referenced_table}.{referenced_column} "
-                  f"should be defined at table creation. FK relationship is handled at application level.")
-            return False
-    else:
-        # For other databases, add FK constraint
-        constraint_name = f"fk_{table_name}_{column_name}"
+            result = await conn.execute(text(f"SELECT version FROM {SCHEMA_VERSION_TABLE}"))
+            return result.scalar() or 0
+    except SQLAlchemyError:
+        # Fresh database or one created before schema versioning existed
+        return 0
+
+
+def _lock_path(engine: AsyncEngine) -> str:
+    database = engine.url.database
+    if engine.url.get_backend_name() == "sqlite" and database and database != ":memory:":
+        return f"{os.path.abspath(database)}.migrate.lock"
+    return os.path.join(tempfile.gettempdir(), "moplexity-migrate.lock")
+
+
+@asynccontextmanager
+async def _migration_lock(engine: AsyncEngine):
+    """Hold an exclusive file lock so only one worker process migrates at a time"""
+    if fcntl is None:
+        yield
+        return
+
+    with open(_lock_path(engine), "a") as lock_file:
+        # flock blocks, so wait for it off the event loop
+        await asyncio.to_thread(fcntl.flock, lock_file.fileno(), fcntl.LOCK_EX)
         try:
-            async with engine.begin() as conn:
-                await conn.execute(
-                    text(f"""
-                        ALTER TABLE {table_name} 
-                        ADD CONSTRAINT {constraint_name} 
-                        FOREIGN KEY ({column_name}) 
-                        REFERENCES {referenced_table}({referenced_column})
-                    """)
-                )
-                print(f"✓ Added foreign key constraint {constraint_name}")
-                return True
-        except Exception as e:
-            print(f"⚠ Could not add foreign key constraint {constraint_name}: {e}")
-            return False
-
-
-async def drop_table_if_exists(engine: AsyncEngine, table_name: str) -> bool:
-    """Drop a table if it exists"""
-    if not await check_table_exists(engine, table_name):
-        return False
-    
-    try:
-        async with engine.begin() as conn:
-            await conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
-            print(f"✓ Dropped table {table_name}")
-            return True
-    except Exception as e:
-        print(f"✗ Error dropping table {table_name}: {e}")
-        raise
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _apply_migrations(conn: Connection, current_version: int) -> int:
+    version = current_version
+    for step_version, description, step in MIGRATIONS:
+        if step_version <= current_version:
+            continue
+        logger.info("Applying migration %d: %s", step_version, description)
+        step(conn)
+        version = step_version
+
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (version INTEGER NOT NULL)"))
+    conn.execute(text(f"DELETE FROM {SCHEMA_VERSION_TABLE}"))
+    conn.execute(text(f"INSERT INTO {SCHEMA_VERSION_TABLE} (version) VALUES (:version)"), {"version": version})
+    return version
 
 
-async def migrate_schema(engine: AsyncEngine) -> None:
+async def migrate_schema(engine: AsyncEngine) -> int:
     """
-    Auto-migrate database schema by comparing existing tables with SQLAlchemy models
-    and adding missing columns.
+    Upgrade the database to HEAD_VERSION and return the resulting version.
+
+    All pending steps and the version bump commit (or roll back) together.
     """
-    from app.base import Base
-    from app.models import Conversation, Message, Source, SearchCache, LLMModel
-    
-    print("Starting schema migration...")
-    
-    # Special handling for llm_models table - drop and recreate if it has old schema
-    if await check_table_exists(engine, 'llm_models'):
-        # Check if it has old columns (provider_id or display_name) or missing new columns (api_key)
-        has_old_schema = await check_column_exists(engine, 'llm_models', 'provider_id') or \
-                         await check_column_exists(engine, 'llm_models', 'display_name')
-        missing_new_schema = not await check_column_exists(engine, 'llm_models', 'api_key')
-        
-        if has_old_schema or missing_new_schema:
-            print("Detected old llm_models schema, dropping and recreating...")
-            # Drop old llm_providers table if it exists
-            await drop_table_if_exists(engine, 'llm_providers')
-            # Drop old llm_models table
-            await drop_table_if_exists(engine, 'llm_models')
-    
-    # Get all models
-    models = {
-        'conversations': Conversation,
-        'messages': Message,
-        'sources': Source,
-        'search_cache': SearchCache,
-        'llm_models': LLMModel,
-    }
-    
-    # Map of foreign keys: (table, column) -> (referenced_table, referenced_column)
-    foreign_keys = {
-        ('conversations', 'selected_model_id'): ('llm_models', 'id'),
-        ('messages', 'conversation_id'): ('conversations', 'id'),
-        ('sources', 'message_id'): ('messages', 'id'),
-    }
-    
-    for table_name, model_class in models.items():
-        # Check if table exists
-        if not await check_table_exists(engine, table_name):
-            print(f"Table {table_name} does not exist, will be created by create_all()")
-            continue
-        
-        # Get columns from model
-        mapper = inspect(model_class)
-        model_columns = {col.key: col for col in mapper.columns}
-        
-        # Check each column
-        for column_name, column in model_columns.items():
-            if not await check_column_exists(engine, table_name, column_name):
-                print(f"Column {table_name}.{column_name} is missing, adding...")
-                try:
-                    await add_column(engine, table_name, column)
-                    
-                    # Try to add foreign key if this column has one
-                    fk_key = (table_name, column_name)
-                    if fk_key in foreign_keys:
-                        ref_table, ref_column = foreign_keys[fk_key]
-                        await add_foreign_key_constraint(engine, table_name, column_name, ref_table, ref_column)
-                except Exception as e:
-                    print(f"✗ Failed to add column {table_name}.{column_name}: {e}")
-                    # Continue with other columns
-            else:
-                pass  # Column exists, skip
-    
-    print("Schema migration completed")
+    if await get_schema_version(engine) >= HEAD_VERSION:
+        return HEAD_VERSION
+
+    async with _migration_lock(engine):
+        # Another worker may have finished the migration while we waited for the lock
+        current_version = await get_schema_version(engine)
+        if current_version >= HEAD_VERSION:
+            return current_version
+
+        async with engine.begin() as conn:
+            if engine.dialect.name == "sqlite":
+                # pysqlite only opens transactions implicitly before DML; take the write lock up front
+                # so the DDL below is part of the same transaction
+                await conn.exec_driver_sql("BEGIN IMMEDIATE")
+            elif engine.dialect.name == "postgresql":
+                # Replicas on other hosts don't share the file lock; serialize on the database instead
+                await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                has_version_table = await conn.run_sync(
+                    lambda sync_conn: inspect(sync_conn).has_table(SCHEMA_VERSION_TABLE)
+                )
+                if has_version_table:
+                    current_version = (await conn.execute(
+                        text(f"SELECT version FROM {SCHEMA_VERSION_TABLE}")
+                    )).scalar() or 0
+                if current_version >= HEAD_VERSION:
+                    return current_version
+            version = await conn.run_sync(_apply_migrations, current_version)
 
+    logger.info("Schema migrated from version %d to %d", current_version, version)
+    return version
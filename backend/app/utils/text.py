@@ -0,0 +1,29 @@
+"""Word splitting shared by the search services, so a query is broken into terms one way"""
+import re
+from typing import List, Optional
+
+# Words kept from a query; anything beyond is dropped rather than making the match slower
+MAX_QUERY_TERMS = 12
+
+# Words too common to say anything about a match
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "in", "is",
+    "it", "of", "on", "or", "the", "to", "was", "what", "when", "where", "which", "who", "why", "with",
+}
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased words of a text"""
+    return _TOKEN.findall((text or "").lower())
+
+
+def search_terms(query: str) -> List[str]:
+    """The words of a user query; FTS syntax (quotes, operators, column filters) is ignored"""
+    return tokenize(query)[:MAX_QUERY_TERMS]
+
+
+def query_terms(query: str) -> List[str]:
+    """The words of a user query that say something about a match"""
+    return [term for term in search_terms(query) if term not in STOP_WORDS and len(term) > 1]
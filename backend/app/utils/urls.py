@@ -0,0 +1,59 @@
+"""URL canonicalization, so the same page reached through different spellings shares one key"""
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Host labels that only select a mobile or AMP rendering of the same page (m.youtube.com,
+# en.m.wikipedia.org, amp.theguardian.com)
+_MOBILE_LABELS = {"m", "mobile", "amp"}
+
+# Query parameters that track the click rather than select content
+_TRACKING_PREFIXES = ("utm_",)
+_TRACKING_PARAMETERS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "ref_src", "ref_url", "spm", "si",
+}
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in _TRACKING_PARAMETERS or name.startswith(_TRACKING_PREFIXES)
+
+
+def canonical_url(url: str) -> str:
+    """
+    A comparison key for a URL. http and https are treated alike; the host is lowercased
+    without "www.", mobile/AMP labels or default ports; tracking parameters, the
+    fragment, an /amp suffix and trailing slashes are dropped and the remaining query
+    parameters sorted.
+
+    The key is for matching only; keep the original URL for display and links.
+    """
+    url = (url or "").strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.netloc:
+        return url
+
+    scheme = parts.scheme.lower()
+    labels = (parts.hostname or "").lower().split(".")
+    if labels[0] == "www":
+        labels = labels[1:]
+    if len(labels) > 2:
+        labels = [label for label in labels[:-2] if label not in _MOBILE_LABELS] + labels[-2:]
+    host = ".".join(labels)
+    if port is not None and port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    if scheme in _DEFAULT_PORTS:
+        scheme = "https"
+
+    path = parts.path.rstrip("/")
+    if path.endswith("/amp"):
+        path = path[:-len("/amp")]
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(name)
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
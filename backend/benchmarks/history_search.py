@@ -0,0 +1,103 @@
+"""
+Conversation history search benchmark.
+
+Builds a synthetic history (random words from a fixed vocabulary, so term frequencies
+follow a Zipf-like curve) in a migrated SQLite database, then compares the FTS5-backed
+search_history() against the LIKE '%term%' scan it replaces, for rare and common terms.
+
+Usage (from backend/):
+    python -m benchmarks.history_search --messages 200000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.database import build_engine
+from app.services.history_search import search_history
+from app.utils.migrations import migrate_schema
+
+VOCABULARY = [f"word{i}" for i in range(5000)]
+MESSAGES_PER_CONVERSATION = 20
+WORDS_PER_MESSAGE = 60
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    # Low indexes are drawn far more often than high ones
+    return " ".join(VOCABULARY[min(int(rng.paretovariate(1.0)) - 1, len(VOCABULARY) - 1)] for _ in range(words))
+
+
+async def _seed(sessions, messages: int) -> None:
+    rng = random.Random(42)
+    conversations = max(1, messages // MESSAGES_PER_CONVERSATION)
+    async with sessions() as session:
+        await session.execute(
+            text("INSERT INTO conversations (id, title) VALUES (:id, :title)"),
+            [{"id": c + 1, "title": _sentence(rng, 5)} for c in range(conversations)],
+        )
+        for start in range(0, messages, 10000):
+            await session.execute(
+                text("INSERT INTO messages (conversation_id, role, content) VALUES (:conversation_id, :role, :content)"),
+                [
+                    {"conversation_id": m // MESSAGES_PER_CONVERSATION + 1, "role": "assistant" if m % 2 else "user",
+                     "content": _sentence(rng, WORDS_PER_MESSAGE)}
+                    for m in range(start, min(start + 10000, messages))
+                ],
+            )
+        await session.commit()
+
+
+async def _time(operation, repeat: int) -> float:
+    """Best-of-N wall time in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await operation()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+async def main(messages: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'history.db')}", performance_profile=True)
+        sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        try:
+            await migrate_schema(engine)
+            started = time.perf_counter()
+            await _seed(sessions, messages)
+            print(f"seeded {messages} messages in {time.perf_counter() - started:.1f}s (FTS triggers included)")
+
+            async with sessions() as session:
+                for label, term in (("common", "word1"), ("medium", "word40"), ("rare", "word4000")):
+                    matches = (await session.execute(
+                        text("SELECT COUNT(*) FROM messages WHERE content LIKE :pattern"), {"pattern": f"%{term} %"}
+                    )).scalar()
+
+                    async def like_scan():
+                        await session.execute(text(
+                            "SELECT id, content FROM messages WHERE content LIKE :pattern "
+                            "ORDER BY created_at DESC LIMIT 20"
+                        ), {"pattern": f"%{term}%"})
+
+                    async def fts_search():
+                        await search_history(session, term, limit=20)
+
+                    like_ms = await _time(like_scan, repeat)
+                    fts_ms = await _time(fts_search, repeat)
+                    print(f"{label:>6} ({term}, ~{matches} matches): LIKE {like_ms:8.1f} ms   "
+                          f"FTS {fts_ms:8.1f} ms   ({like_ms / fts_ms:.1f}x)")
+        finally:
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.repeat))
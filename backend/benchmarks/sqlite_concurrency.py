@@ -0,0 +1,86 @@
+"""
+Concurrency benchmark for the SQLite performance profile.
+
+Simulates concurrent chat streams: each "turn" writes a message and a search cache row
+in their own transactions and then reads the conversation back. The same workload runs
+against SQLite defaults and against the tuned profile (WAL + pragmas, reader pool plus a
+single-connection writer).
+
+Usage (from backend/):
+    python -m benchmarks.sqlite_concurrency --streams 32 --turns 20
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from app.core.database import build_engine
+
+SCHEMA = [
+    "CREATE TABLE messages (id INTEGER PRIMARY KEY, conversation_id INTEGER, content TEXT)",
+    "CREATE TABLE search_cache (id INTEGER PRIMARY KEY, query TEXT, results_json TEXT)",
+]
+
+
+async def _run(database_url: str, profile: bool, streams: int, turns: int) -> dict:
+    reader = build_engine(database_url, performance_profile=profile)
+    writer = build_engine(database_url, writer=True, performance_profile=profile) if profile else reader
+    errors = 0
+
+    async with writer.begin() as conn:
+        for statement in SCHEMA:
+            await conn.execute(text(statement))
+
+    async def stream(stream_id: int):
+        nonlocal errors
+        for turn in range(turns):
+            try:
+                async with writer.begin() as conn:
+                    await conn.execute(
+                        text("INSERT INTO messages (conversation_id, content) VALUES (:c, :m)"),
+                        {"c": stream_id, "m": "x" * 2000},
+                    )
+                async with writer.begin() as conn:
+                    await conn.execute(
+                        text("INSERT INTO search_cache (query, results_json) VALUES (:q, :r)"),
+                        {"q": f"query-{stream_id}-{turn}", "r": "[]" * 500},
+                    )
+                async with reader.connect() as conn:
+                    await conn.execute(
+                        text("SELECT id, content FROM messages WHERE conversation_id = :c"), {"c": stream_id}
+                    )
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(stream(i) for i in range(streams)))
+    elapsed = time.perf_counter() - start
+
+    await reader.dispose()
+    if writer is not reader:
+        await writer.dispose()
+
+    return {"turns_per_sec": streams * turns / elapsed, "elapsed": elapsed, "errors": errors}
+
+
+async def main(streams: int, turns: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, profile in (("defaults", False), ("profile", True)):
+            database_url = f"sqlite+aiosqlite:///{os.path.join(tmp, name + '.db')}"
+            results[name] = await _run(database_url, profile, streams, turns)
+            print(f"{name:>9}: {results[name]['turns_per_sec']:8.1f} turns/s "
+                  f"({results[name]['elapsed']:.2f}s, {results[name]['errors']} errors)")
+        gain = results["profile"]["turns_per_sec"] / results["defaults"]["turns_per_sec"]
+        print(f"speedup: {gain:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, default=32)
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.streams, args.turns))
@@ -3,40 +3,82 @@ import pytest_asyncio
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.main import app
-from app.core.database import Base, get_db
+from app.core.database import Base, get_db, get_session_factory
+from app.core.write_queue import WriteQueue, get_write_queue
 from app.core.config import settings
+from app.services.search_providers import provider_executor
+from app.utils.migrations import create_history_search_index, create_knowledge_index
 import os
 
-# Use an in-memory SQLite database for testing
-TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+# Use an in-memory SQLite database for testing. Set TEST_DATABASE_URL to run the suite
+# against PostgreSQL instead, e.g. postgresql+asyncpg://postgres@localhost:5432/moplexity_test
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+@pytest.fixture(autouse=True)
+def fresh_provider_state():
+    # Provider misses and statistics from one test must not steer the next
+    provider_executor.reset()
+    yield
+
 
 @pytest_asyncio.fixture(scope="function")
-async def db_session():
-    """Create a fresh database session for each test."""
+async def db_engine():
+    """Create a fresh in-memory database for each test."""
     engine = create_async_engine(TEST_DATABASE_URL, echo=False)
-    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # Full-text indexes live outside the models; the migrations add them
+        await conn.run_sync(create_history_search_index)
+        await conn.run_sync(create_knowledge_index)
 
-    async with async_session() as session:
-        yield session
-        await session.rollback()
+    yield engine
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
-    
+
     await engine.dispose()
 
 @pytest_asyncio.fixture(scope="function")
-async def client(db_session):
-    """Create a test client with the overridden database dependency."""
+async def db_session(db_engine):
+    """Create a fresh database session for each test."""
+    async_session = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with async_session() as session:
+        yield session
+        await session.rollback()
+
+@pytest_asyncio.fixture(scope="function")
+async def llm_model(db_session):
+    """An active model row, so model_id references are valid on databases that enforce foreign keys."""
+    from app.models import LLMModel
+
+    model = LLMModel(model_name="test/model", api_key="test-key")
+    db_session.add(model)
+    await db_session.commit()
+    return model
+
+@pytest_asyncio.fixture(scope="function")
+async def write_queue(db_engine):
+    """A running write queue bound to the test database."""
+    queue = WriteQueue(async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False))
+    await queue.start()
+    yield queue
+    await queue.stop()
+
+@pytest_asyncio.fixture(scope="function")
+async def client(db_engine, db_session, write_queue):
+    """Create a test client with the overridden database dependencies."""
     async def override_get_db():
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
-    
+    app.dependency_overrides[get_session_factory] = lambda: async_sessionmaker(
+        db_engine, class_=AsyncSession, expire_on_commit=False
+    )
+    app.dependency_overrides[get_write_queue] = lambda: write_queue
+
     async with AsyncClient(app=app, base_url="http://test") as c:
         yield c
-    
+
     app.dependency_overrides.clear()
@@ -3,7 +3,7 @@ from unittest.mock import AsyncMock, patch, MagicMock
 from app.schemas import ChatRequest
 
 @pytest.mark.asyncio
-async def test_chat_endpoint(client, db_session):
+async def test_chat_endpoint(client, db_session, llm_model):
     """Test the non-streaming chat endpoint."""
     
     # Mock SearchService
@@ -27,7 +27,7 @@ async def test_chat_endpoint(client, db_session):
 
             response = await client.post("/api/chat/", json={
                 "query": "Hello world",
-                "model_id": 1,
+                "model_id": llm_model.id,
                 "pro_mode": False
             })
 
@@ -38,7 +38,7 @@ async def test_chat_endpoint(client, db_session):
             assert data["sources"][0]["title"] == "Test Source"
 
 @pytest.mark.asyncio
-async def test_chat_stream_endpoint(client, db_session):
+async def test_chat_stream_endpoint(client, db_session, llm_model):
     """Test the streaming chat endpoint."""
     
     # Mock SearchService
@@ -62,7 +62,7 @@ async def test_chat_stream_endpoint(client, db_session):
 
             async with client.stream("POST", "/api/chat/stream", json={
                 "query": "Stream test",
-                "model_id": 1
+                "model_id": llm_model.id
             }) as response:
                 assert response.status_code == 200
                 
@@ -73,3 +73,68 @@ async def test_chat_stream_endpoint(client, db_session):
                         chunks.append(line)
                 
                 assert len(chunks) > 0
+
+@pytest.mark.asyncio
+async def test_chat_turn_commits_once(client, db_engine, db_session):
+    """A whole chat turn (user message, assistant message, sources) is one transaction."""
+    from sqlalchemy import event, select
+    from app.models import Message, Source
+
+    commits = []
+    event.listen(db_engine.sync_engine, "commit", lambda conn: commits.append(conn))
+
+    with patch('app.api.v1.chat.SearchService') as MockSearchService:
+        mock_search_instance = MockSearchService.return_value
+        mock_search_instance.multi_source_search = AsyncMock(return_value=[
+            {"title": f"Source {i}", "url": f"http://test.com/{i}", "snippet": "Snippet", "source_type": "web"}
+            for i in range(3)
+        ])
+
+        with patch('app.api.v1.chat.LLMService') as MockLLMService:
+            mock_llm_instance = MockLLMService.return_value
+            mock_llm_instance._evaluate_result_quality = AsyncMock(return_value={"is_sufficient": True, "score": 1.0})
+            mock_llm_instance.generate_response = AsyncMock(return_value={
+                "content": "Answer",
+                "follow_up_questions": []
+            })
+
+            response = await client.post("/api/chat/", json={"query": "One transaction"})
+
+    assert response.status_code == 200
+    assert len(commits) == 1
+    data = response.json()
+    assert [s["title"] for s in data["sources"]] == ["Source 0", "Source 1", "Source 2"]
+
+    roles = (await db_session.execute(
+        select(Message.role).where(Message.conversation_id == data["conversation_id"]).order_by(Message.id)
+    )).scalars().all()
+    assert roles == ["user", "assistant"]
+    source_count = len((await db_session.execute(
+        select(Source.id).where(Source.message_id == data["message_id"])
+    )).all())
+    assert source_count == 3
+
+
+@pytest.mark.asyncio
+async def test_chat_turn_inserts_each_table_once(db_engine, db_session):
+    """Messages and sources are written with one multi-row INSERT each, whatever their number."""
+    from sqlalchemy import event
+    from app.services.chat_turn import ChatTurn
+
+    results = [
+        {"title": f"Source {i}", "url": f"http://test.com/{i}", "snippet": "Snippet", "source_type": "web"}
+        for i in range(5)
+    ]
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        conversation_id, message, sources = await ChatTurn("Question", title="Bulk").complete("Answer", results)(db_session)
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", listener)
+
+    inserts = [statement for statement in statements if statement.lstrip().upper().startswith("INSERT")]
+    assert len(inserts) == 3  # conversation, messages, sources
+    assert message.role == "assistant" and message.conversation_id == conversation_id
+    assert [source.title for source in sources] == [f"Source {i}" for i in range(5)]
+    assert all(source.message_id == message.id for source in sources)
@@ -0,0 +1,114 @@
+import pytest
+from sqlalchemy import event, update
+
+from app.core.config import settings
+from app.models import Conversation
+from app.services.chat_turn import ChatTurn
+
+
+async def _revalidate(client, url, params=None):
+    first = await client.get(url, params=params)
+    assert first.status_code == 200
+    again = await client.get(url, params=params, headers={"If-None-Match": first.headers["ETag"]})
+    return first, again
+
+
+@pytest.mark.asyncio
+async def test_conversation_detail_not_modified_with_one_query(client, db_session, db_engine):
+    db_session.add(Conversation(title="Cached"))
+    await db_session.commit()
+
+    first = await client.get("/api/conversations/1")
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    assert "Last-Modified" in first.headers
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        again = await client.get("/api/conversations/1", headers={"If-None-Match": first.headers["ETag"]})
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", listener)
+
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+    # Only the row-version lookup; no messages, sources or serialization
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_conversation_detail_changes_after_chat_turn(client, db_session, write_queue):
+    from app.api.v1 import chat
+
+    db_session.add(Conversation(title="Thread"))
+    await db_session.commit()
+    first, again = await _revalidate(client, "/api/conversations/1")
+    assert again.status_code == 304
+
+    await write_queue.submit(ChatTurn("Question", conversation_id=1).complete("Answer", []))
+    chat.resource_versions.conversation_changed(1)
+    # The client fixture shares one session across requests; a real request gets a fresh one
+    db_session.expire_all()
+
+    changed = await client.get("/api/conversations/1", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert len(changed.json()["messages"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_write_from_another_worker_invalidates_etag(client, db_session):
+    """The in-memory counters miss writes made by other processes; the row version does not."""
+    db_session.add(Conversation(title="Thread"))
+    await db_session.commit()
+    first, _ = await _revalidate(client, "/api/conversations/1")
+
+    await db_session.execute(update(Conversation).where(Conversation.id == 1).values(message_count=2))
+    await db_session.commit()
+
+    changed = await client.get("/api/conversations/1", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_conversation_list_not_modified_until_created(client):
+    await client.post("/api/conversations/", json={"title": "One"})
+    first, again = await _revalidate(client, "/api/conversations/", {"limit": 10})
+    assert again.status_code == 304
+
+    # Different page parameters are a different representation
+    other_page = await client.get("/api/conversations/", params={"limit": 5},
+                                  headers={"If-None-Match": first.headers["ETag"]})
+    assert other_page.status_code == 200
+
+    await client.post("/api/conversations/", json={"title": "Two"})
+    changed = await client.get("/api/conversations/", params={"limit": 10},
+                               headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert len(changed.json()) == 2
+
+
+@pytest.mark.asyncio
+async def test_active_models_not_modified_until_model_updated(client, llm_model, monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    first, again = await _revalidate(client, "/api/llm/models/active")
+    assert again.status_code == 304
+
+    response = await client.put(f"/api/llm/models/{llm_model.id}", json={"is_active": False},
+                                headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+
+    changed = await client.get("/api/llm/models/active", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.json() == []
+
+
+@pytest.mark.asyncio
+async def test_fast_path_honours_conditional_get(client, db_session, monkeypatch):
+    monkeypatch.setattr(settings, "fast_json_responses", True)
+    db_session.add(Conversation(title="Fast"))
+    await db_session.commit()
+
+    first, again = await _revalidate(client, "/api/conversations/1")
+    assert "ETag" in first.headers
+    assert again.status_code == 304
@@ -0,0 +1,182 @@
+import json
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.core.write_queue import WriteQueue
+from app.models import Conversation, Message, Source
+from app.services.chat_turn import ChatTurn
+from app.services.conversation_transfer import (
+    ConversationImporter, ImportFormatError, export_conversations, import_conversations,
+)
+
+SOURCES = [
+    {"title": "Sourcé", "url": "http://example.com/a", "snippet": "line\nbreak", "source_type": "web"},
+    {"title": "Other", "url": "http://example.com/b", "snippet": None, "source_type": "academic"},
+]
+
+
+@pytest.mark.asyncio
+async def test_export_import_round_trip(client, db_session):
+    first, _, _ = await ChatTurn("Question 1", title="Første").complete("Answer 1", SOURCES)(db_session)
+    await ChatTurn("Question 2", conversation_id=first).complete("Answer 2", [])(db_session)
+    await ChatTurn("Lonely", title="Second").complete("Reply", SOURCES[:1])(db_session)
+    await db_session.commit()
+
+    export = await client.get("/api/conversations/export")
+    assert export.status_code == 200
+    assert export.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in export.text.splitlines()]
+    assert [record["type"] for record in records] == [
+        "conversation", "message", "message", "source", "source", "message", "message",
+        "conversation", "message", "message", "source",
+    ]
+
+    response = await client.post("/api/conversations/import", content=export.content)
+    assert response.json() == {"conversations": 2, "messages": 6, "sources": 3}
+
+    db_session.expire_all()
+    titles = (await db_session.scalars(select(Conversation.title).order_by(Conversation.id))).all()
+    assert titles == ["Første", "Second", "Første", "Second"]
+    imported = await db_session.scalar(select(Conversation).where(Conversation.id == 3))
+    messages = (await db_session.scalars(
+        select(Message).where(Message.conversation_id == imported.id).order_by(Message.id)
+    )).all()
+    assert [message.content for message in messages] == ["Question 1", "Answer 1", "Question 2", "Answer 2"]
+    assert imported.message_count == 4
+    sources = (await db_session.scalars(select(Source).where(Source.message_id == messages[1].id))).all()
+    assert [(source.title, source.snippet) for source in sources] == [("Sourcé", "line\nbreak"), ("Other", None)]
+
+
+@pytest.mark.asyncio
+async def test_import_rejects_malformed_lines(client):
+    body = b'{"type": "conversation", "id": 1, "title": "Ok"}\n{"type": "message", "id": 2, "conversation_id": 9}\n'
+    response = await client.post("/api/conversations/import", content=body)
+    assert response.status_code == 400
+    assert "line 2" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_failed_import_writes_nothing(db_session, write_queue):
+    lines = []
+    for conversation in range(1, 4):
+        lines.append({"type": "conversation", "id": conversation, "title": f"Imported {conversation}"})
+        lines.append({"type": "message", "id": conversation * 10, "conversation_id": conversation,
+                      "role": "user", "content": "Question"})
+    # Several batches are full before the bad line arrives
+    body = b"".join(json.dumps(line).encode() + b"\n" for line in lines) + b'{"type": "bogus"}\n'
+
+    async def chunks():
+        for start in range(0, len(body), 16):
+            yield body[start:start + 16]
+
+    with pytest.raises(ImportFormatError, match="line 7"):
+        await ConversationImporter(write_queue, batch_size=2).run(chunks())
+
+    assert await db_session.scalar(select(func.count()).select_from(Conversation)) == 0
+    assert await db_session.scalar(select(func.count()).select_from(Message)) == 0
+
+    # The same stream without the bad line is imported whole
+    valid = body[:body.rindex(b'{"type": "bogus"}')]
+
+    async def valid_chunks():
+        yield valid
+
+    assert await ConversationImporter(write_queue, batch_size=2).run(valid_chunks()) == {
+        "conversations": 3, "messages": 3, "sources": 0
+    }
+
+
+CONVERSATIONS = 1000
+MESSAGES_PER_CONVERSATION = 100
+CONTENT = "word " * 40
+
+
+async def _seed(sessions):
+    start = datetime(2024, 1, 1)
+    async with sessions() as session:
+        await session.execute(insert(Conversation), [
+            {"id": c + 1, "title": f"Conversation {c}", "message_count": MESSAGES_PER_CONVERSATION}
+            for c in range(CONVERSATIONS)
+        ])
+        for c in range(CONVERSATIONS):
+            base = c * MESSAGES_PER_CONVERSATION
+            await session.execute(insert(Message), [
+                {"id": base + m + 1, "conversation_id": c + 1, "role": "assistant" if m % 2 else "user",
+                 "content": CONTENT, "created_at": start + timedelta(seconds=m)}
+                for m in range(MESSAGES_PER_CONVERSATION)
+            ])
+            await session.execute(insert(Source), [
+                {"message_id": base + m + 1, "title": "Source", "url": f"http://example.com/{m}",
+                 "snippet": "snippet", "source_type": "web"}
+                for m in range(1, MESSAGES_PER_CONVERSATION, 2)
+            ])
+        await session.commit()
+
+
+async def _transfer(directory) -> dict:
+    """Seed a source database, stream it into an empty one and report peak memory growth"""
+    import resource
+
+    source_engine = create_async_engine(f"sqlite+aiosqlite:///{directory / 'source.db'}")
+    target_engine = create_async_engine(f"sqlite+aiosqlite:///{directory / 'target.db'}")
+    source_sessions = async_sessionmaker(source_engine, class_=AsyncSession, expire_on_commit=False)
+    target_sessions = async_sessionmaker(target_engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        for engine in (source_engine, target_engine):
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        await _seed(source_sessions)
+
+        exported_bytes = 0
+
+        async def counting_export():
+            nonlocal exported_bytes
+            async for chunk in export_conversations(source_sessions):
+                exported_bytes += len(chunk)
+                yield chunk
+
+        # ru_maxrss is a high-water mark (KiB on Linux), so its growth bounds the transfer's peak
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        counts = await import_conversations(counting_export(), WriteQueue(target_sessions))
+        rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) * 1024
+
+        async with target_sessions() as session:
+            imported_messages = await session.scalar(select(func.count()).select_from(Message))
+        return {"counts": counts, "imported_messages": imported_messages,
+                "exported_bytes": exported_bytes, "rss_growth": rss_growth}
+    finally:
+        await source_engine.dispose()
+        await target_engine.dispose()
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="ru_maxrss units differ by platform")
+def test_transfer_100k_messages_in_bounded_memory(tmp_path):
+    # A fresh interpreter, so the high-water mark isn't already raised by earlier tests
+    script = (
+        "import asyncio, json, pathlib, sys\n"
+        "from tests.test_conversation_transfer import _transfer\n"
+        "print(json.dumps(asyncio.run(_transfer(pathlib.Path(sys.argv[1])))))\n"
+    )
+    backend = Path(__file__).resolve().parents[1]
+    completed = subprocess.run(
+        [sys.executable, "-c", script, str(tmp_path)], cwd=backend, capture_output=True, text=True, check=True
+    )
+    result = json.loads(completed.stdout.splitlines()[-1])
+
+    total_messages = CONVERSATIONS * MESSAGES_PER_CONVERSATION
+    assert result["counts"] == {
+        "conversations": CONVERSATIONS, "messages": total_messages, "sources": total_messages // 2
+    }
+    assert result["imported_messages"] == total_messages
+    # The stream is far larger than what is ever held at once
+    assert result["exported_bytes"] > 25 * 1024 * 1024
+    assert result["rss_growth"] < 16 * 1024 * 1024, (
+        f"RSS grew {result['rss_growth'] / 2**20:.1f} MiB for {result['exported_bytes'] / 2**20:.1f} MiB exported"
+    )
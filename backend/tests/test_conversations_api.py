@@ -0,0 +1,123 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.models import Conversation
+from app.services.chat_turn import ChatTurn, PREVIEW_LENGTH
+
+
+@pytest.mark.asyncio
+async def test_conversation_list_pages_with_cursor(client, db_session):
+    """Keyset pages cover every conversation once, including ties on updated_at."""
+    same_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(7):
+        db_session.add(Conversation(title=f"Conversation {i}", updated_at=same_time if i < 4 else None))
+    await db_session.commit()
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/conversations/", params=params)
+        assert response.status_code == 200
+        seen.extend(item["id"] for item in response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    all_ids = (await db_session.scalars(
+        select(Conversation.id).order_by(Conversation.updated_at.desc(), Conversation.id.desc())
+    )).all()
+    assert seen == list(all_ids)
+    assert pages == 3
+
+
+@pytest.mark.asyncio
+async def test_conversation_list_projection(client, db_session):
+    db_session.add(Conversation(title="Only"))
+    await db_session.commit()
+
+    response = await client.get("/api/conversations/")
+
+    assert set(response.json()[0]) == {
+        "id", "title", "selected_model_id", "created_at", "updated_at", "message_count", "last_message_preview"
+    }
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_conversation_list_rejects_bad_cursor(client):
+    response = await client.get("/api/conversations/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_chat_turn_maintains_conversation_summary(db_session):
+    first = ChatTurn("First question", title="Summary")
+    conversation_id, _, _ = await first.complete("First answer", [])(db_session)
+    second = ChatTurn("Second question", conversation_id=conversation_id)
+    await second.complete("Second\n  answer " + "x" * 500, [])(db_session)
+    await db_session.commit()
+
+    conversation = await db_session.get(Conversation, conversation_id)
+    await db_session.refresh(conversation)
+    assert conversation.message_count == 4
+    assert conversation.last_message_preview.startswith("Second answer x")
+    assert len(conversation.last_message_preview) == PREVIEW_LENGTH
+
+
+async def _conversation_with_turns(db_session, turns):
+    conversation_id = None
+    for i in range(turns):
+        turn = ChatTurn(f"Question {i}", conversation_id=conversation_id, title="Thread")
+        sources = [
+            {"title": f"Source {i}.{j}", "url": f"http://example.com/{i}/{j}", "snippet": "", "source_type": "web"}
+            for j in range(3)
+        ]
+        conversation_id, _, _ = await turn.complete(f"Answer {i}", sources)(db_session)
+    await db_session.commit()
+    return conversation_id
+
+
+@pytest.mark.asyncio
+async def test_messages_page_newest_first_with_sources(client, db_session):
+    conversation_id = await _conversation_with_turns(db_session, 5)
+
+    contents = []
+    cursor = None
+    while True:
+        params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+        response = await client.get(f"/api/conversations/{conversation_id}/messages", params=params)
+        assert response.status_code == 200
+        for message in response.json():
+            contents.append(message["content"])
+            assert len(message["sources"]) == (3 if message["role"] == "assistant" else 0)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    expected = [text for i in range(5) for text in (f"Question {i}", f"Answer {i}")]
+    assert contents == expected[::-1]
+
+
+@pytest.mark.asyncio
+async def test_messages_page_unknown_conversation(client):
+    response = await client.get("/api/conversations/999/messages")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_conversation_detail_lightweight_mode(client, db_session):
+    conversation_id = await _conversation_with_turns(db_session, 2)
+
+    full = (await client.get(f"/api/conversations/{conversation_id}")).json()
+    light = (await client.get(f"/api/conversations/{conversation_id}", params={"include_messages": "false"})).json()
+
+    assert [message["content"] for message in full["messages"]] == ["Question 0", "Answer 0", "Question 1", "Answer 1"]
+    assert light["messages"] == []
+    assert light["title"] == full["title"]
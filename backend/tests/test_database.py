@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from app.core.database import build_engine
+
+
+@pytest.mark.asyncio
+async def test_sqlite_profile_pragmas_applied(tmp_path):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'profile.db'}")
+    try:
+        async with engine.connect() as conn:
+            journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+            synchronous = (await conn.execute(text("PRAGMA synchronous"))).scalar()
+            busy_timeout = (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+            temp_store = (await conn.execute(text("PRAGMA temp_store"))).scalar()
+        assert journal_mode == "wal"
+        assert synchronous == 1  # NORMAL
+        assert busy_timeout == 5000
+        assert temp_store == 2  # MEMORY
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_writer_engine_serializes_concurrent_writes(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'writer.db'}"
+    writer = build_engine(url, writer=True)
+    reader = build_engine(url)
+    try:
+        async with writer.begin() as conn:
+            await conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT)"))
+
+        async def write(i):
+            async with writer.begin() as conn:
+                await conn.execute(text("INSERT INTO items (value) VALUES (:v)"), {"v": f"item-{i}"})
+
+        async def read():
+            async with reader.connect() as conn:
+                return (await conn.execute(text("SELECT COUNT(*) FROM items"))).scalar()
+
+        await asyncio.gather(*(write(i) for i in range(50)), *(read() for _ in range(20)))
+        assert await read() == 50
+    finally:
+        await writer.dispose()
+        await reader.dispose()
@@ -0,0 +1,118 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.services.dedup import MAX_DISTANCE, collapse_duplicates, simhash
+from app.services.search_service import SearchService
+from app.utils.migrations import migrate_schema
+from app.utils.urls import canonical_url
+
+ARTICLE = (
+    "The central bank raised interest rates by a quarter point on Wednesday, citing persistent "
+    "inflation in services and a labour market that remains tighter than expected"
+)
+
+
+def _result(url, snippet="", title="Title", provider="duckduckgo"):
+    return {"title": title, "url": url, "snippet": snippet, "source_type": "web", "provider": provider}
+
+
+@pytest.mark.parametrize("url", [
+    "http://example.com/news/story",
+    "https://www.example.com/news/story/",
+    "https://m.example.com/news/story?utm_source=x&utm_medium=social#comments",
+    "https://example.com:443/news/story?fbclid=abc&gclid=def",
+    "https://amp.example.com/news/story/amp",
+])
+def test_canonical_url_variants(url):
+    assert canonical_url(url) == "https://example.com/news/story"
+
+
+def test_canonical_url_keeps_what_selects_content():
+    assert canonical_url("https://en.m.wikipedia.org/wiki/Tide") == "https://en.wikipedia.org/wiki/Tide"
+    assert canonical_url("https://example.com/search?q=b&page=2") == "https://example.com/search?page=2&q=b"
+    assert canonical_url("https://example.com:8443/a") == "https://example.com:8443/a"
+    assert canonical_url("https://github.com/o/r/blob/main/x.py?ref=dev") == "https://github.com/o/r/blob/main/x.py?ref=dev"
+    assert canonical_url("not a url") == "not a url"
+
+
+def test_simhash_separates_near_and_different_texts():
+    copies = [ARTICLE.replace("labour", "labor"), "Reuters - " + ARTICLE, ARTICLE.rsplit(" ", 2)[0]]
+    # Same story, written independently
+    rewrite = ("Interest rates were raised by the central bank on Wednesday as inflation in services "
+               "persists; economists expect a further quarter point increase before the end of the year")
+    for copy in copies:
+        assert bin(simhash(ARTICLE) ^ simhash(copy)).count("1") <= MAX_DISTANCE
+    assert bin(simhash(ARTICLE) ^ simhash(rewrite)).count("1") > MAX_DISTANCE
+    assert simhash("too short to judge") is None
+
+
+def test_collapse_keeps_first_of_each_group():
+    results = [
+        _result("https://news.example.com/rates", ARTICLE, title="Original"),
+        _result("http://www.news.example.com/rates/?utm_campaign=feed", "Other text", title="Same URL"),
+        _result("https://syndicator.example.org/story/123", ARTICLE + ".", title="Syndicated copy"),
+        _result("https://other.example.net/frogs", "Frogs " * 12, title="Different"),
+        _result("", ARTICLE, title="No URL"),
+        _result("https://short.example.com/a", "rates up", title="Short A"),
+        _result("https://short.example.com/b", "rates up", title="Short B"),
+    ]
+    assert [r["title"] for r in collapse_duplicates(results)] == ["Original", "Different", "Short A", "Short B"]
+
+
+def test_collapse_keeps_distinct_results():
+    results = [
+        _result(f"https://example.com/{i}", " ".join(f"word{i}x{j}" for j in range(20))) for i in range(2000)
+    ]
+    assert len(collapse_duplicates(results)) == 2000
+
+
+def test_fallback_merge_collapses_cross_site_copies():
+    primary = [_result("https://news.example.com/rates", ARTICLE, title="Rates")]
+    fallback = [
+        _result("https://m.news.example.com/rates", ARTICLE, title="Mobile copy"),
+        _result("https://mirror.example.org/rates", ARTICLE, title="Mirror"),
+        _result("https://example.com/inflation", "Inflation in services and interest rates explained", title="Explainer"),
+    ]
+    merged = SearchService.merge_fallback("interest rates inflation", primary, fallback, 5)
+    assert sorted(r["title"] for r in merged) == ["Explainer", "Rates"]
+
+
+@pytest.mark.asyncio
+async def test_knowledge_entries_are_rekeyed(tmp_path):
+    from app.models import KnowledgeEntry
+    from app.utils import migrations
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'rekey.db'}")
+    try:
+        # A database at version 6, keyed by the older normalization
+        step_7 = migrations.MIGRATIONS.pop()
+        migrations.HEAD_VERSION = 6
+        try:
+            await migrate_schema(engine)
+        finally:
+            migrations.MIGRATIONS.append(step_7)
+            migrations.HEAD_VERSION = step_7[0]
+        async with engine.begin() as conn:
+            await conn.execute(KnowledgeEntry.__table__.insert(), [
+                {"url_key": "https://example.com/a", "url": "https://example.com/a", "title": "Newest",
+                 "source_type": "web", "last_seen_at": datetime(2024, 3, 1)},
+                {"url_key": "http://example.com/a", "url": "http://example.com/a", "title": "Older",
+                 "source_type": "web", "last_seen_at": datetime(2024, 2, 1)},
+                {"url_key": "https://m.example.com/a", "url": "https://m.example.com/a?utm_source=x",
+                 "title": "Oldest", "source_type": "web", "last_seen_at": datetime(2024, 1, 1)},
+                {"url_key": "https://example.com/b", "url": "https://example.com/b", "title": "Other",
+                 "source_type": "web", "last_seen_at": datetime(2024, 1, 1)},
+            ])
+
+        await migrate_schema(engine)
+
+        async with engine.connect() as conn:
+            rows = (await conn.execute(
+                select(KnowledgeEntry.title, KnowledgeEntry.url_key).order_by(KnowledgeEntry.title)
+            )).all()
+        assert [tuple(row) for row in rows] == [("Newest", "https://example.com/a"), ("Other", "https://example.com/b")]
+    finally:
+        await engine.dispose()
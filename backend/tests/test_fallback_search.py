@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from app.services.fallback_search import ALL_MODES, CrossSourceFallback, SpeculationBudget
+from app.services.search_providers import MIN_SAMPLES, ProviderExecutor, RollingStats
+from app.services.search_service import SearchService
+
+
+class _Searches:
+    """Records fallback searches; each takes `latency` seconds"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = []
+        self.cancelled = 0
+
+    async def search_across_modes(self, query, modes, max_results):
+        self.calls.append(tuple(modes))
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return [{"title": f"{query} from {mode}", "url": f"https://{mode}.example.com", "snippet": query,
+                 "provider": "duckduckgo"} for mode in modes]
+
+    async def search_all_sources(self, query, max_results):
+        self.calls.append(tuple(ALL_MODES))
+        return []
+
+    merge_fallback = staticmethod(SearchService.merge_fallback)
+
+
+async def _primary(latency, results=()):
+    await asyncio.sleep(latency)
+    return list(results)
+
+
+@pytest.mark.asyncio
+async def test_slow_focus_search_overlaps_the_fallback():
+    searches, budget = _Searches(latency=0.2), SpeculationBudget()
+    fallback = CrossSourceFallback(searches, "tides", ["web"], 5, speculate=True, delay=0.05, budget=budget)
+
+    started = asyncio.get_running_loop().time()
+    results = await fallback.primary(_primary(0.2))
+    merged = await fallback.merge(results)
+    elapsed = asyncio.get_running_loop().time() - started
+
+    # One search of the modes the focus search did not cover, mostly hidden behind it
+    assert searches.calls == [("social", "academic")]
+    assert {r["title"] for r in merged} == {"tides from social", "tides from academic"}
+    assert elapsed < 0.35
+    assert budget.as_dict() == {"in_flight": 0, "started": 1, "used": 1, "discarded": 0}
+
+
+@pytest.mark.asyncio
+async def test_good_results_cancel_the_speculative_fallback():
+    searches, budget = _Searches(latency=1.0), SpeculationBudget()
+    fallback = CrossSourceFallback(searches, "tides", ["web"], 5, speculate=True, delay=0, budget=budget)
+
+    await fallback.primary(_primary(0.01, [{"title": "Tides", "url": "https://a", "snippet": "tides"}]))
+    fallback.discard()
+    await asyncio.sleep(0.01)
+
+    assert searches.cancelled == 1
+    assert budget.as_dict() == {"in_flight": 0, "started": 1, "used": 0, "discarded": 1}
+
+
+@pytest.mark.asyncio
+async def test_fast_searches_and_exhausted_budgets_fall_back_sequentially():
+    searches, budget = _Searches(), SpeculationBudget()
+    fast = CrossSourceFallback(searches, "tides", ["web"], 5, speculate=True, delay=0.5, budget=budget)
+    await fast.primary(_primary(0))
+    assert searches.calls == [] and budget.started == 0
+    await fast.merge([])
+    assert searches.calls == [("social", "academic")]
+
+    budget.in_flight = 2
+    busy = CrossSourceFallback(searches, "tides", ["web"], 5, speculate=True, delay=0, max_in_flight=2, budget=budget)
+    await busy.primary(_primary(0.01))
+    assert budget.started == 0 and len(searches.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_only_searches_slower_than_usual_speculate():
+    executor = ProviderExecutor()
+    stats = executor.plan_stats.setdefault("web", RollingStats())
+    for _ in range(MIN_SAMPLES):
+        stats.record(0.1, False, 5)
+
+    def fallback(searches, budget):
+        return CrossSourceFallback(searches, "tides", ["web"], 5, speculate=True, delay=0.01, budget=budget,
+                                   latency_factor=1.5, executor=executor)
+
+    # Web searches usually take 0.1s: one taking that long is past the delay but not slow
+    searches, budget = _Searches(), SpeculationBudget()
+    normal = fallback(searches, budget)
+    assert normal.speculation_delay() == pytest.approx(0.15)
+    await normal.primary(_primary(0.1))
+    assert budget.started == 0 and searches.calls == []
+
+    slow = fallback(searches, budget)
+    results = await slow.primary(_primary(0.3))
+    assert budget.started == 1 and searches.calls == [("social", "academic")]
+    await slow.merge(results)
+
+
+@pytest.mark.asyncio
+async def test_plan_latency_is_learned_from_runs():
+    executor = ProviderExecutor({}, deadline=0)
+    for _ in range(MIN_SAMPLES - 1):
+        await executor.run(None, "web", "q", 5, 5)
+    assert executor.expected_latency("web") is None
+    await executor.run(None, "web", "q", 5, 5)
+    assert executor.expected_latency("web") < 0.1
+
+
+@pytest.mark.asyncio
+async def test_all_mode_searches_only_reread_the_cache():
+    searches, budget = _Searches(), SpeculationBudget()
+    fallback = CrossSourceFallback(searches, "tides", ALL_MODES, 5, speculate=True, delay=0, budget=budget)
+    await fallback.primary(_primary(0.01))
+    await fallback.merge([])
+    assert budget.started == 0
+    assert searches.calls == [tuple(ALL_MODES)]
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+
+from app.core.config import settings
+from app.models import Conversation, Message
+from app.services.chat_turn import ChatTurn
+
+
+async def _fetch_both_ways(client, monkeypatch, url, params=None):
+    monkeypatch.setattr(settings, "fast_json_responses", False)
+    regular = await client.get(url, params=params)
+    monkeypatch.setattr(settings, "fast_json_responses", True)
+    fast = await client.get(url, params=params)
+    return regular, fast
+
+
+@pytest_asyncio.fixture
+async def conversation_id(db_session, llm_model):
+    # Non-ASCII, control characters, quotes and sub-second timestamps all go through the encoder
+    conversation = Conversation(
+        title='Café "漢字" \U0001F600',
+        selected_model_id=llm_model.id,
+        created_at=datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+    )
+    db_session.add(conversation)
+    await db_session.commit()
+
+    conversation_id = conversation.id
+    for i in range(3):
+        turn = ChatTurn(f"Question {i}\twith\ttabs", conversation_id=conversation_id)
+        sources = [
+            {"title": f"Tïtle {j}", "url": f"http://example.com/{i}/{j}?q=a&b=ü",
+             "snippet": None if j == 0 else "line\nbreak \\ backslash \x01", "source_type": "web"}
+            for j in range(2)
+        ]
+        await turn.complete(f"Answer {i}   é", sources)(db_session)
+    db_session.add(Message(conversation_id=conversation_id, role="user", content="",
+                           created_at=datetime(2024, 5, 1, 12, 31, tzinfo=timezone.utc)))
+    await db_session.commit()
+    return conversation_id
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("params", [None, {"include_messages": "false"}])
+async def test_conversation_detail_parity(client, monkeypatch, conversation_id, params):
+    regular, fast = await _fetch_both_ways(client, monkeypatch, f"/api/conversations/{conversation_id}", params)
+
+    assert regular.status_code == fast.status_code == 200
+    assert fast.headers["content-type"] == regular.headers["content-type"]
+    # Streamed body, i.e. the fast path actually served it
+    assert "content-length" not in fast.headers
+    assert fast.content == regular.content
+
+
+@pytest.mark.asyncio
+async def test_messages_page_parity(client, monkeypatch, conversation_id):
+    url = f"/api/conversations/{conversation_id}/messages"
+    regular, fast = await _fetch_both_ways(client, monkeypatch, url, {"limit": 4})
+    assert fast.content == regular.content
+    assert fast.headers["X-Next-Cursor"] == regular.headers["X-Next-Cursor"]
+
+    next_page = {"limit": 4, "cursor": regular.headers["X-Next-Cursor"]}
+    regular, fast = await _fetch_both_ways(client, monkeypatch, url, next_page)
+    assert fast.content == regular.content
+    assert "X-Next-Cursor" not in fast.headers
+
+
+@pytest.mark.asyncio
+async def test_conversation_list_parity(client, monkeypatch, conversation_id, db_session):
+    db_session.add(Conversation(title="Second é"))
+    await db_session.commit()
+
+    regular, fast = await _fetch_both_ways(client, monkeypatch, "/api/conversations/", {"limit": 1})
+
+    assert fast.content == regular.content
+    assert fast.headers["X-Next-Cursor"] == regular.headers["X-Next-Cursor"]
+
+
+@pytest.mark.asyncio
+async def test_fast_path_missing_conversation(client, monkeypatch):
+    monkeypatch.setattr(settings, "fast_json_responses", True)
+    response = await client.get("/api/conversations/999")
+    assert response.status_code == 404
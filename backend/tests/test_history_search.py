@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import update
+
+from app.models import Conversation
+from app.services.chat_turn import ChatTurn
+from app.services.history_search import search_history, search_terms
+from app.services.retention import delete_conversations
+
+
+async def _conversation(session, title, *exchanges):
+    conversation_id = None
+    for question, answer in exchanges:
+        conversation_id, _, _ = await ChatTurn(question, conversation_id=conversation_id, title=title).complete(answer, [])(session)
+    await session.commit()
+    return conversation_id
+
+
+def test_search_terms_drop_query_syntax():
+    assert search_terms('"rust" AND title:(borrow* -checker)') == ["rust", "and", "title", "borrow", "checker"]
+    assert search_terms("  ?!  ") == []
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_snippets_and_paginates(client, db_session):
+    rust = await _conversation(
+        db_session, "Rust ownership",
+        ("How does the borrow checker work?", "The borrow checker enforces ownership rules when a < b at compile time."),
+    )
+    await _conversation(db_session, "Cooking", ("Best pasta recipe?", "Boil the pasta, then toss it in the sauce."))
+    await _conversation(db_session, "Misc", ("Tell me about rust on bikes", "Rust forms when iron meets water."))
+
+    response = await client.get("/api/conversations/search", params={"q": "rust"})
+    assert response.status_code == 200
+    hits = response.json()
+    # The matching title outranks message content
+    assert hits[0]["conversation_id"] == rust and hits[0]["message_id"] is None
+    assert hits[0]["snippet"] == "<mark>Rust</mark> ownership"
+    assert {hit["conversation_title"] for hit in hits} == {"Rust ownership", "Misc"}
+
+    hits = (await client.get("/api/conversations/search", params={"q": "ownership rules"})).json()
+    [hit] = hits
+    assert hit["role"] == "assistant"
+    # Content is escaped; only the highlight markup is HTML
+    assert "<mark>ownership</mark> <mark>rules</mark> when a &lt; b" in hit["snippet"]
+
+    # Prefix match on the last word, every word required
+    assert len((await client.get("/api/conversations/search", params={"q": "boil pas"})).json()) == 1
+    assert (await client.get("/api/conversations/search", params={"q": "boil rust"})).json() == []
+
+    everything = (await client.get("/api/conversations/search", params={"q": "rust"})).json()
+    first = await client.get("/api/conversations/search", params={"q": "rust", "limit": 2})
+    second = await client.get(
+        "/api/conversations/search", params={"q": "rust", "limit": 2, "cursor": first.headers["X-Next-Cursor"]}
+    )
+    assert "X-Next-Cursor" not in second.headers
+    assert first.json() + second.json() == everything and len(everything) == 3
+
+    # A cursor is only valid for the query it was issued for
+    response = await client.get(
+        "/api/conversations/search", params={"q": "pasta", "cursor": first.headers["X-Next-Cursor"]}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_index_follows_updates_and_deletes(db_session):
+    conversation_id = await _conversation(db_session, "Original title", ("Zebra question", "Zebra answer"))
+    assert len(await search_history(db_session, "zebra")) == 2
+
+    await db_session.execute(update(Conversation).where(Conversation.id == conversation_id).values(title="Renamed"))
+    assert await search_history(db_session, "original") == []
+    assert len(await search_history(db_session, "renamed")) == 1
+
+    await delete_conversations(db_session, [conversation_id])
+    assert await search_history(db_session, "zebra") == []
+    assert await search_history(db_session, "renamed") == []
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models import KnowledgeEntry, SearchCache
+from app.services.chat_turn import ChatTurn
+from app.services.local_knowledge import LOCAL_PROVIDER, LocalKnowledgeProvider, knowledge_entries, knowledge_upsert
+from app.services.retention import RetentionJob
+from app.services.search_service import SearchService
+from app.utils.migrations import MIGRATIONS
+
+
+def _result(title, url, snippet="", source_type="web"):
+    return {"title": title, "url": url, "snippet": snippet, "source_type": source_type}
+
+
+async def _remember(session, results, seen_at=None):
+    await session.execute(knowledge_upsert(session.get_bind().dialect.name, knowledge_entries(results, seen_at)))
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_entries_are_keyed_by_normalized_url(db_session):
+    await _remember(db_session, [_result("Old title", "https://www.example.com/page/#intro", "Photosynthesis basics")])
+    await _remember(db_session, [_result("New title", "https://example.com/page", "Photosynthesis in depth")])
+
+    entries = (await db_session.scalars(select(KnowledgeEntry))).all()
+    assert [(entry.title, entry.url) for entry in entries] == [("New title", "https://example.com/page")]
+    # The full-text index followed the update
+    results = await LocalKnowledgeProvider().search(db_session, "photosynthesis depth", 5)
+    assert [result["title"] for result in results] == ["New title"]
+    assert await LocalKnowledgeProvider().search(db_session, "basics", 5) == []
+
+
+@pytest.mark.asyncio
+async def test_search_weights_recency_and_filters_by_mode(db_session):
+    now = datetime.now(timezone.utc)
+    await _remember(db_session, [_result("Volcano facts", "http://old.example.com", "volcano eruption")],
+                    seen_at=now - timedelta(days=120))
+    await _remember(db_session, [_result("Volcano news", "http://new.example.com", "volcano eruption")], seen_at=now)
+    await _remember(db_session, [_result("Volcano thread", "http://social.example.com", "volcano eruption", "social")])
+
+    provider = LocalKnowledgeProvider(half_life_days=30)
+    results = await provider.search(db_session, "what is a volcano eruption?", 5, focus_mode="web")
+    assert [result["title"] for result in results] == ["Volcano news", "Volcano facts"]
+    assert all(result["provider"] == LOCAL_PROVIDER for result in results)
+
+    social = await provider.search(db_session, "volcano", 5, focus_mode="social")
+    assert [result["title"] for result in social] == ["Volcano thread"]
+    # Only stop words: nothing to search for
+    assert await provider.search(db_session, "what is the", 5) == []
+
+
+@pytest.mark.asyncio
+async def test_local_results_fill_in_when_providers_are_offline(db_session):
+    service = SearchService(db_session)
+    service.wikipedia_service.search_wikipedia = AsyncMock(return_value=[
+        _result("Tides explained", "https://en.wikipedia.org/wiki/Tide", "Tides are caused by the moon")
+    ])
+    service.wikipedia_service.search_wikipedia_fallback = AsyncMock(return_value=[])
+    with patch.object(SearchService, "_duckduckgo_search", new_callable=AsyncMock) as duckduckgo:
+        duckduckgo.return_value = [_result("Moon and tides", "https://example.com/moon-tides", "The moon pulls the ocean")]
+        first = await service.multi_source_search("why do tides happen", max_results=5)
+        assert [result["title"] for result in first] == ["Tides explained", "Moon and tides"]
+
+        # Every provider is down for a related question
+        service.wikipedia_service.search_wikipedia.return_value = []
+        duckduckgo.return_value = []
+        offline = await service.multi_source_search("moon tides", max_results=5)
+
+    assert {result["title"] for result in offline} == {"Tides explained", "Moon and tides"}
+    assert all(result["provider"] == LOCAL_PROVIDER for result in offline)
+    # Local results are not written back as the cached answer for the query
+    cached = await db_session.scalar(select(SearchCache.results_json).where(SearchCache.query == "moon tides_web"))
+    assert not any(result.get("provider") == LOCAL_PROVIDER for result in cached or [])
+
+
+@pytest.mark.asyncio
+async def test_migration_indexes_existing_sources_and_cache(db_engine, db_session):
+    await ChatTurn("Question", title="Conversation").complete("Answer", [
+        _result("Stored source", "https://example.com/glacier", "glacier retreat data")
+    ])(db_session)
+    db_session.add(SearchCache(query="glaciers_web", results_json=[
+        _result("Cached result", "https://example.com/ice", "glacier ice cores"),
+        _result("Duplicate", "https://www.example.com/glacier/", "glacier retreat data"),
+        # Served from the local index itself; never written back into it
+        {**_result("Local", "https://example.com/moraine", "glacier moraine"), "provider": LOCAL_PROVIDER},
+    ]))
+    await db_session.commit()
+    assert await db_session.scalar(select(func.count()).select_from(KnowledgeEntry)) == 0
+
+    # Migration 6 fills the index, migration 7 merges the two spellings of the glacier page
+    async with db_engine.begin() as conn:
+        for version, _, step in MIGRATIONS:
+            if version in (6, 7):
+                await conn.run_sync(step)
+
+    results = await LocalKnowledgeProvider().search(db_session, "glacier", 5)
+    assert sorted(result["url"] for result in results) == ["https://example.com/ice", "https://www.example.com/glacier/"]
+
+
+@pytest.mark.asyncio
+async def test_retention_drops_stale_entries(db_session, write_queue):
+    now = datetime.now(timezone.utc)
+    await _remember(db_session, [_result("Stale", "http://stale.example.com", "stale")], seen_at=now - timedelta(days=400))
+    await _remember(db_session, [_result("Fresh", "http://fresh.example.com", "fresh")], seen_at=now)
+
+    await RetentionJob(write_queue, knowledge_max_age_days=365).run_once()
+
+    assert (await db_session.scalars(select(KnowledgeEntry.title))).all() == ["Fresh"]
+    assert await LocalKnowledgeProvider().search(db_session, "stale", 5) == []
@@ -0,0 +1,105 @@
+import os
+import pytest
+from sqlalchemy import event, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.utils.migrations import HEAD_VERSION, get_schema_version, migrate_schema
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite+aiosqlite:///{tmp_path / 'migrations.db'}"
+
+
+@pytest.mark.asyncio
+async def test_fresh_database_migrates_to_head(db_url):
+    engine = create_async_engine(db_url)
+    try:
+        assert await migrate_schema(engine) == HEAD_VERSION
+        assert await get_schema_version(engine) == HEAD_VERSION
+
+        async with engine.connect() as conn:
+            tables = await conn.run_sync(lambda c: set(inspect(c).get_table_names()))
+        assert {"conversations", "messages", "sources", "search_cache", "llm_models", "schema_version"} <= tables
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_database_at_head_boots_with_one_query(db_url):
+    engine = create_async_engine(db_url)
+    try:
+        await migrate_schema(engine)
+
+        statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        await migrate_schema(engine)
+
+        assert len(statements) == 1
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_legacy_database_gets_missing_columns(db_url):
+    engine = create_async_engine(db_url)
+    try:
+        # A pre-versioning database whose conversations table predates model selection
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE conversations (id INTEGER PRIMARY KEY, title VARCHAR(500) NOT NULL)"))
+            await conn.execute(text("INSERT INTO conversations (id, title) VALUES (1, 'Existing')"))
+            await conn.execute(text(
+                "CREATE TABLE messages (id INTEGER PRIMARY KEY, conversation_id INTEGER, role VARCHAR(50), "
+                "content TEXT, created_at DATETIME)"
+            ))
+            await conn.execute(text(
+                "INSERT INTO messages (conversation_id, role, content, created_at) VALUES "
+                "(1, 'user', 'Question', '2024-01-01 10:00:00'), "
+                "(1, 'assistant', '  A multi-line\n\n   answer  ', '2024-01-01 10:00:05')"
+            ))
+
+        await migrate_schema(engine)
+
+        async with engine.connect() as conn:
+            columns = await conn.run_sync(lambda c: {col["name"] for col in inspect(c).get_columns("conversations")})
+            row = (await conn.execute(text(
+                "SELECT title, message_count, last_message_preview, updated_at FROM conversations WHERE id = 1"
+            ))).one()
+            # Rows written before the search index existed are indexed too
+            indexed = (await conn.execute(text(
+                "SELECT rowid FROM conversations_fts WHERE conversations_fts MATCH 'existing'"
+            ))).scalars().all()
+        assert indexed == [1]
+        assert {"selected_model_id", "created_at", "updated_at", "message_count", "last_message_preview"} <= columns
+        assert row.title == "Existing"
+        assert row.message_count == 2
+        # The same one-line preview chat writes for new messages
+        assert row.last_message_preview == "A multi-line answer"
+        assert row.updated_at is not None
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_postgres_migrates_to_head():
+    """Runs when TEST_DATABASE_URL points at PostgreSQL."""
+    from app.base import Base
+
+    database_url = os.environ.get("TEST_DATABASE_URL", "")
+    if not database_url.startswith("postgresql"):
+        pytest.skip("TEST_DATABASE_URL is not a PostgreSQL database")
+
+    engine = create_async_engine(database_url)
+    try:
+        assert await migrate_schema(engine) == HEAD_VERSION
+        async with engine.connect() as conn:
+            column_type = (await conn.execute(text(
+                "SELECT data_type FROM information_schema.columns "
+                "WHERE table_name = 'search_cache' AND column_name = 'results_json'"
+            ))).scalar()
+        assert column_type == "jsonb"
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.execute(text("DROP TABLE IF EXISTS schema_version"))
+        await engine.dispose()
@@ -0,0 +1,118 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.prefetch import FollowUpPrefetcher
+from app.services.search_providers import ProviderExecutor, RollingStats
+from app.services.search_service import SearchService
+
+
+class _Searches:
+    """Fake search service; a search counts as a running plan on the executor while it lasts"""
+
+    def __init__(self, executor, latency=0.0):
+        self.executor = executor
+        self.latency = latency
+        self.queries = []
+
+    async def multi_source_search(self, query, max_results, focus_mode):
+        return await self.search_across_modes(query, [focus_mode], max_results)
+
+    async def search_across_modes(self, query, modes, max_results):
+        self.queries.append(query)
+        self.executor.active_runs += 1
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.executor.active_runs -= 1
+        return []
+
+
+async def _started(**kwargs):
+    prefetcher = FollowUpPrefetcher(enabled=True, poll_interval=0.01, **kwargs)
+    await prefetcher.start()
+    return prefetcher
+
+
+@pytest.mark.asyncio
+async def test_prefetched_follow_up_is_served_from_cache(db_session):
+    prefetcher = await _started()
+    service = SearchService(db_session)
+    service.wikipedia_service.search_wikipedia = AsyncMock(return_value=[])
+    service.wikipedia_service.search_wikipedia_fallback = AsyncMock(return_value=[])
+    with patch.object(SearchService, "_duckduckgo_search", new_callable=AsyncMock) as duckduckgo:
+        duckduckgo.return_value = [{"title": "Neap tides", "url": "https://example.com/neap", "snippet": "neap tides"}]
+        prefetcher.submit(service, ["what are neap tides"], ["web"], 5)
+        await prefetcher._queue.join()
+        assert duckduckgo.await_count == 1
+
+        # Clicking the follow-up runs no provider
+        clicked = await service.multi_source_search("what are neap tides", 5, "web")
+    await prefetcher.stop()
+
+    assert [result["title"] for result in clicked] == ["Neap tides"]
+    assert duckduckgo.await_count == 1
+    assert prefetcher.as_dict() == {"queued": 0, "completed": 1, "dropped": 0, "cancelled": 0}
+
+
+@pytest.mark.asyncio
+async def test_disabled_prefetcher_ignores_follow_ups():
+    executor = ProviderExecutor()
+    prefetcher = FollowUpPrefetcher(enabled=False, executor=executor)
+    await prefetcher.start()
+    searches = _Searches(executor)
+
+    prefetcher.submit(searches, ["what are neap tides"], ["web"], 5)
+    await asyncio.sleep(0.01)
+
+    assert not prefetcher.running
+    assert searches.queries == []
+
+
+@pytest.mark.asyncio
+async def test_prefetch_yields_to_user_searches():
+    executor = ProviderExecutor()
+    prefetcher = await _started(executor=executor)
+    searches = _Searches(executor, latency=1.0)
+
+    prefetcher.submit(searches, ["what are neap tides"], ["web"], 5)
+    await asyncio.sleep(0.05)
+    assert searches.queries == ["what are neap tides"]
+    # A user search starts: the prefetch in progress is cancelled...
+    executor.active_runs += 1
+    await asyncio.sleep(0.05)
+    assert prefetcher.cancelled == 1
+    # ...and no new one starts while it runs
+    prefetcher.submit(searches, ["when is the next spring tide"], ["web"], 5)
+    await prefetcher._queue.join()
+    executor.active_runs -= 1
+    await prefetcher.stop()
+
+    assert searches.queries == ["what are neap tides"]
+    assert prefetcher.as_dict() == {"queued": 0, "completed": 0, "dropped": 1, "cancelled": 1}
+
+
+@pytest.mark.asyncio
+async def test_prefetch_stays_within_budget_and_off_strained_providers():
+    executor = ProviderExecutor()
+    now = [0.0]
+    prefetcher = await _started(executor=executor, max_per_minute=2, clock=lambda: now[0])
+    searches = _Searches(executor)
+
+    prefetcher.submit(searches, ["tides", "neap tides", "spring tides"], ["web"], 5)
+    await prefetcher._queue.join()
+    assert searches.queries == ["tides", "neap tides"]
+
+    # Half a minute later one search is available again, but a web provider is being rate limited
+    now[0] = 30.0
+    stats = executor.stats.setdefault(("web", "duckduckgo"), RollingStats())
+    for _ in range(5):
+        stats.record(1.0, True, 0)
+    prefetcher.submit(searches, ["king tides"], ["web"], 5)
+    prefetcher.submit(searches, ["tide pools"], ["social"], 5)
+    await prefetcher._queue.join()
+    await prefetcher.stop()
+
+    assert searches.queries == ["tides", "neap tides", "tide pools"]
+    assert prefetcher.as_dict() == {"queued": 0, "completed": 3, "dropped": 2, "cancelled": 0}
@@ -0,0 +1,93 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.query_decomposition import decompose_query, merge_with_quotas, search_sub_queries
+
+
+@pytest.mark.parametrize("query,expected", [
+    ("What causes inflation and how do central banks respond?", ["causes inflation", "central banks respond"]),
+    ("Rust vs Go for web servers", ["Rust web servers", "Go web servers"]),
+    ("How does Python's GIL compare to Java threads?", ["Python gil", "Java threads"]),
+    ("Who won the 2022 World Cup? When is the next one?", ["World Cup won 2022", "next World Cup"]),
+    # Without a capitalized entity, a clause referring back takes the topic of the one before
+    ("How does photosynthesis work and why is it important for humans?",
+     ["photosynthesis work", "important humans photosynthesis"]),
+    # "mr." does not end a sentence; "what year?" is about the sentence before it
+    ("mr. smith goes to washington. what year?", ["smith goes washington", "year smith"]),
+])
+def test_questions_asking_several_things_are_split(query, expected):
+    assert decompose_query(query) == [query] + expected
+
+
+@pytest.mark.parametrize("query", [
+    "Python asyncio tutorial", "salt and pepper steak recipe", "What is a tide?", "How did Python 3.12 change the U.S. job market?",
+])
+def test_single_questions_are_kept_whole(query):
+    assert decompose_query(query) == [query]
+
+
+def test_sub_queries_are_capped():
+    query = "Rust vs Go vs Zig vs Nim for systems programming"
+    assert len(decompose_query(query, max_queries=3)) == 3
+    assert decompose_query(query, max_queries=1) == [query]
+
+
+def _results(prefix, count):
+    return [{"title": f"{prefix}{i}", "url": f"https://{prefix}.example.com/{i}", "snippet": "", "source_type": "web"}
+            for i in range(count)]
+
+
+def test_each_sub_query_gets_its_quota():
+    whole, inflation, banks = _results("whole", 10), _results("inflation", 10), _results("banks", 2)
+    # The same page found for two sub-queries counts for the first
+    banks.append(dict(inflation[0]))
+
+    merged = merge_with_quotas([whole, inflation, banks], 9)
+
+    assert [r["title"] for r in merged] == [
+        "whole0", "whole1", "whole2", "inflation0", "inflation1", "inflation2", "banks0", "banks1", "whole3"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sub_queries_run_in_parallel_within_the_deadline():
+    latencies = {"question": 0.1, "first part": 0.1, "second part": 1.0}
+
+    async def search_across_modes(query, modes, max_results):
+        await asyncio.sleep(latencies[query])
+        return _results(query.replace(" ", ""), max_results)
+
+    service = AsyncMock()
+    service.search_across_modes.side_effect = search_across_modes
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    merged = await search_sub_queries(service, list(latencies), ["web"], 4, deadline=0.3)
+
+    assert loop.time() - started < 0.3 + 0.1
+    # The slow sub-query was dropped at the deadline; its quota went to the others
+    assert [r["title"] for r in merged] == ["question0", "question1", "firstpart0", "firstpart1"]
+
+
+@pytest.mark.asyncio
+async def test_pro_mode_chat_searches_the_parts(client, llm_model):
+    with patch("app.api.v1.chat.SearchService") as search_service, \
+            patch("app.api.v1.chat.LLMService") as llm_service:
+        search = search_service.return_value
+        search.search_across_modes = AsyncMock(side_effect=lambda query, modes, n: _results(query.replace(" ", ""), 3))
+        llm = llm_service.return_value
+        llm.set_model = AsyncMock()
+        llm._evaluate_result_quality = AsyncMock(return_value={"is_sufficient": True, "score": 1.0})
+        llm.generate_response = AsyncMock(return_value={"content": "Answer", "follow_up_questions": []})
+
+        response = await client.post("/api/chat/", json={
+            "query": "Rust vs Go for web servers", "model_id": llm_model.id, "pro_mode": True
+        })
+
+    assert response.status_code == 200
+    assert sorted(call.args[0] for call in search.search_across_modes.await_args_list) == [
+        "Go web servers", "Rust vs Go for web servers", "Rust web servers"
+    ]
+    assert len(response.json()["sources"]) == 9
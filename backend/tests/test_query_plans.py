@@ -0,0 +1,83 @@
+import re
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.v1.conversations import conversation_detail_query, conversation_list_query, message_page_query
+from app.services.llm_service import LLMService
+from app.services.search_service import SearchService
+from app.utils.migrations import QUERY_INDEXES, migrate_schema
+
+# "SCAN <table>" without an index is a full table scan, an automatic index is built per
+# query, and a temp b-tree means a sort step
+FULL_SCAN = re.compile(r"^SCAN \w+( LEFT-JOIN)?$")
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'plans.db'}")
+    await migrate_schema(engine)
+    yield engine
+    await engine.dispose()
+
+
+async def _query_plan(engine, statement):
+    compiled = statement.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+    async with engine.connect() as conn:
+        rows = (await conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))).all()
+    return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize("statement", [
+    pytest.param(lambda: conversation_list_query(50), id="conversation-list"),
+    pytest.param(lambda: conversation_list_query(50, ("2024-01-01 00:00:00", 10)), id="conversation-list-cursor"),
+    pytest.param(lambda: conversation_detail_query(1), id="conversation-detail"),
+    pytest.param(lambda: message_page_query(1, 50), id="message-page"),
+    pytest.param(lambda: message_page_query(1, 50, ("2024-01-01 00:00:00", 10)), id="message-page-cursor"),
+    pytest.param(lambda: LLMService._history_query(1), id="history"),
+    pytest.param(
+        lambda: SearchService._cache_lookup("query_web", datetime(2024, 1, 1, tzinfo=timezone.utc)),
+        id="cache-lookup"
+    ),
+])
+@pytest.mark.asyncio
+async def test_hot_queries_use_indexes(engine, statement):
+    plan = await _query_plan(engine, statement())
+
+    assert not [step for step in plan if FULL_SCAN.match(step)], plan
+    assert not [step for step in plan if "AUTOMATIC" in step or "TEMP B-TREE" in step], plan
+
+
+@pytest.mark.asyncio
+async def test_migration_creates_query_indexes(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+    try:
+        # A database from before the index plan: tables exist at schema version 2
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE conversations (id INTEGER PRIMARY KEY, title VARCHAR(500) NOT NULL, "
+                                    "selected_model_id INTEGER, created_at DATETIME, updated_at DATETIME)"))
+            await conn.execute(text("CREATE TABLE messages (id INTEGER PRIMARY KEY, conversation_id INTEGER, "
+                                    "role VARCHAR(50) NOT NULL, content TEXT NOT NULL, created_at DATETIME)"))
+            await conn.execute(text("CREATE TABLE sources (id INTEGER PRIMARY KEY, message_id INTEGER, "
+                                    "title VARCHAR(500) NOT NULL, url TEXT NOT NULL, snippet TEXT, "
+                                    "source_type VARCHAR(50) NOT NULL, created_at DATETIME)"))
+            await conn.execute(text("CREATE TABLE search_cache (id INTEGER PRIMARY KEY, query VARCHAR(500) NOT NULL, "
+                                    "results_json JSON NOT NULL, created_at DATETIME)"))
+            await conn.execute(text("CREATE TABLE schema_version (version INTEGER NOT NULL)"))
+            await conn.execute(text("INSERT INTO schema_version (version) VALUES (2)"))
+
+        await migrate_schema(engine)
+
+        async with engine.connect() as conn:
+            indexes = await conn.run_sync(lambda c: {
+                table: {index["name"] for index in inspect(c).get_indexes(table)}
+                for table, _ in QUERY_INDEXES
+            })
+        for table, index_name in QUERY_INDEXES:
+            assert index_name in indexes[table]
+    finally:
+        await engine.dispose()
@@ -0,0 +1,92 @@
+import math
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.ranking import BM25_B, BM25_K1, bm25_scores, rank_results, tokenize
+from app.services.search_service import SearchService
+
+
+def _result(title, snippet="", provider="duckduckgo", url=None):
+    return {"title": title, "url": url or f"https://example.com/{title}", "snippet": snippet,
+            "source_type": "web", "provider": provider}
+
+
+def _reference_bm25(terms, documents):
+    average = sum(len(document) for document in documents) / len(documents)
+    scores = []
+    for document in documents:
+        score = 0.0
+        for term in terms:
+            containing = sum(1 for other in documents if term in other)
+            idf = math.log(1 + (len(documents) - containing + 0.5) / (containing + 0.5))
+            frequency = document.count(term)
+            score += idf * frequency * (BM25_K1 + 1) / (
+                frequency + BM25_K1 * (1 - BM25_B + BM25_B * len(document) / average)
+            )
+        scores.append(score)
+    return scores
+
+
+def test_bm25_matches_the_scalar_definition():
+    documents = [tokenize(text) for text in (
+        "solar panels convert sunlight", "solar solar energy storage with batteries", "wind turbines", ""
+    )]
+    terms = ["solar", "batteries", "sunlight"]
+    assert list(bm25_scores(terms, documents)) == pytest.approx(_reference_bm25(terms, documents))
+
+
+def test_relevant_results_outrank_earlier_providers():
+    results = [
+        _result("History of Paris", "The city of Paris", provider="wikipedia"),
+        _result("Jane Doe", "Marketing manager", provider="linkedin"),
+        _result("Python asyncio tutorial", "Event loops and coroutines in Python asyncio"),
+        _result("Asyncio pitfalls", "Common asyncio mistakes"),
+        _result("Python packaging", "Wheels and sdists for python projects"),
+    ]
+
+    ranked = rank_results("how does python asyncio work", results, 3)
+
+    assert [result["title"] for result in ranked] == ["Python asyncio tutorial", "Asyncio pitfalls", "Python packaging"]
+
+
+def test_unrelated_results_are_dropped_only_when_enough_others_match():
+    results = [_result("Unrelated", "Nothing in common"), _result("Rust borrow checker", "ownership rules")]
+    assert [result["title"] for result in rank_results("rust ownership", results, 5)] == [
+        "Rust borrow checker", "Unrelated"
+    ]
+    results += [_result("Rust ownership", "borrowing"), _result("Rust lifetimes", "ownership and scopes")]
+    assert "Unrelated" not in [result["title"] for result in rank_results("rust ownership", results, 5)]
+
+
+def test_provider_priors_and_order_break_ties():
+    results = [
+        _result("Same text", "identical", provider="linkedin", url="https://a"),
+        _result("Same text", "identical", provider="wikipedia", url="https://b"),
+        _result("Same text", "identical", provider="wikipedia", url="https://c"),
+    ]
+    ranked = rank_results("same text", results, 3)
+    assert [result["url"] for result in ranked] == ["https://b", "https://c", "https://a"]
+
+
+def test_fallback_merge_reranks_instead_of_appending():
+    primary = [_result("Off topic", "nothing", provider="linkedin"), _result("Volcano", "photos")]
+    fallback = [_result("Volcano eruption", "volcano eruption history"), _result("Volcano", "photos")]
+
+    merged = SearchService.merge_fallback("volcano eruption", primary, fallback, 2)
+
+    assert [result["title"] for result in merged] == ["Volcano eruption", "Volcano"]
+
+
+@pytest.mark.asyncio
+async def test_providers_are_overfetched_and_cut_after_ranking(db_session):
+    service = SearchService(db_session)
+    service.wikipedia_service.search_wikipedia = AsyncMock(return_value=[_result("Tea", "A drink", provider=None)])
+    with patch.object(SearchService, "_duckduckgo_search", new_callable=AsyncMock) as duckduckgo:
+        duckduckgo.return_value = [_result(f"Green tea {i}", "green tea brewing") for i in range(7)]
+        results = await service.multi_source_search("green tea brewing", max_results=4)
+
+    # One request for twice as many results as will be used
+    duckduckgo.assert_awaited_once_with("green tea brewing", 7)
+    assert len(results) == 4
+    assert all(result["provider"] == "duckduckgo" for result in results)
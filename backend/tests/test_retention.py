@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import Settings
+from app.core.database import Base, build_engine
+from app.core.write_queue import WriteQueue
+from app.models import Conversation, Message, Source
+from app.services.chat_turn import ChatTurn
+from app.services import retention
+from app.services.retention import RetentionJob, build_retention_job
+
+SOURCES = [{"title": "Source", "url": "http://example.com", "snippet": "", "source_type": "web"}] * 3
+
+
+async def _add_conversations(session, count, updated_at=None):
+    ids = []
+    for i in range(count):
+        conversation_id, _, _ = await ChatTurn(f"Question {i}", title=f"Conversation {i}").complete("Answer", SOURCES)(session)
+        ids.append(conversation_id)
+    await session.commit()
+    if updated_at is not None:
+        for conversation_id in ids:
+            conversation = await session.get(Conversation, conversation_id)
+            conversation.updated_at = updated_at
+        await session.commit()
+    return ids
+
+
+async def _counts(session):
+    return tuple([
+        await session.scalar(select(func.count()).select_from(model))
+        for model in (Conversation, Message, Source)
+    ])
+
+
+@pytest.mark.asyncio
+async def test_delete_conversation_removes_messages_and_sources(client, db_session):
+    keep, remove = await _add_conversations(db_session, 2)
+
+    response = await client.delete(f"/api/conversations/{remove}")
+    assert response.status_code == 200
+    assert await _counts(db_session) == (1, 2, 3)
+
+    response = await client.delete(f"/api/conversations/{remove}")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete(client, db_session):
+    ids = await _add_conversations(db_session, 4)
+
+    response = await client.delete("/api/conversations/", params={"ids": ids[:3] + [999]})
+
+    assert response.json() == {"deleted": 3}
+    assert await _counts(db_session) == (1, 2, 3)
+
+
+@pytest.mark.asyncio
+async def test_retention_keeps_newest_conversations(db_session, write_queue):
+    ids = await _add_conversations(db_session, 7)
+
+    job = RetentionJob(write_queue, max_conversations=3, batch_size=2)
+    assert await job.run_once() == 4
+
+    remaining = (await db_session.scalars(select(Conversation.id).order_by(Conversation.id))).all()
+    assert set(remaining) <= set(ids) and len(remaining) == 3
+    assert await _counts(db_session) == (3, 6, 9)
+
+
+@pytest.mark.asyncio
+async def test_retention_removes_conversations_by_age(db_session, write_queue):
+    await _add_conversations(db_session, 5, updated_at=datetime.now(timezone.utc) - timedelta(days=40))
+    recent = await _add_conversations(db_session, 2)
+
+    job = RetentionJob(write_queue, max_age_days=30, batch_size=2)
+    assert await job.run_once() == 5
+
+    assert (await db_session.scalars(select(Conversation.id).order_by(Conversation.id))).all() == recent
+
+
+@pytest.mark.asyncio
+async def test_retention_releases_pages_with_incremental_vacuum(tmp_path):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'retention.db'}", writer=True, performance_profile=True)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as session:
+            for i in range(20):
+                await ChatTurn("Question " * 500, title=f"Conversation {i}").complete("Answer " * 2000, SOURCES)(session)
+            await session.commit()
+
+        async with engine.connect() as conn:
+            pages_before = (await conn.exec_driver_sql("PRAGMA page_count")).scalar()
+
+        job = RetentionJob(WriteQueue(sessions), max_conversations=1, batch_size=5)
+        assert await job.run_once() == 19
+
+        async with engine.connect() as conn:
+            assert (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar() == 2
+            assert (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar() == 0
+            assert (await conn.exec_driver_sql("PRAGMA page_count")).scalar() < pages_before / 2
+    finally:
+        await engine.dispose()
+
+
+def test_retention_is_off_by_default(monkeypatch):
+    monkeypatch.setattr(retention, "settings", Settings(_env_file=None))
+    assert not build_retention_job(WriteQueue(None)).enabled
+
+    monkeypatch.setattr(retention, "settings", Settings(_env_file=None, local_knowledge_max_age_days=365))
+    assert build_retention_job(WriteQueue(None)).enabled
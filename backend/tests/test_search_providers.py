@@ -0,0 +1,351 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.search_providers import (
+    DEGRADED, EMPTY, ERROR, FAILING, HEALTHY, MIN_CALL_SECONDS, MIN_SAMPLES, PROVIDERS, UNSAMPLED, WHEN_SHORT,
+    NegativeCache, ProviderExecutor, ProviderMetrics, ProviderSpec, RollingStats, plan_steps,
+)
+from app.services.search_service import SearchService
+
+
+def _result(title, host="example.com"):
+    return {"title": title, "url": f"https://{host}/{title}", "snippet": title, "source_type": "web"}
+
+
+def test_plans_run_by_stage_and_priority():
+    assert [spec.name for _, spec in plan_steps("social")] == [
+        "reddit", "youtube", "linkedin", "twitter", "github", "wikipedia", "duckduckgo"
+    ]
+    assert [spec.name for _, spec in plan_steps("academic")] == ["scholarly", "wikipedia", "duckduckgo"]
+    assert plan_steps("unknown") == []
+
+
+def test_unconfigured_providers_are_skipped_and_new_ones_join_their_modes():
+    with patch("app.services.search_providers.settings") as settings:
+        settings.bing_search_api_key = "key"
+        settings.google_search_api_key = None
+        assert [spec.name for _, spec in plan_steps("web")] == [
+            "wikipedia", "duckduckgo", "wikipedia_fallback", "bing"
+        ]
+
+    providers = dict(PROVIDERS, brave=ProviderSpec("brave", AsyncMock(), frozenset({"web"}), priority=25))
+    steps = plan_steps("web", providers)
+    assert [spec.name for _, spec in steps][-1] == "brave"
+    assert steps[-1][0].when == WHEN_SHORT
+
+
+@pytest.mark.asyncio
+async def test_executor_applies_timeouts_and_records_metrics():
+    async def slow(service, query, count):
+        await asyncio.sleep(1)
+        return [_result("late")]
+
+    async def broken(service, query, count):
+        raise RuntimeError("down")
+
+    executor = ProviderExecutor({})
+    fast = ProviderSpec("fast", AsyncMock(return_value=[_result("a"), _result("b")]), frozenset({"web"}), cost=0.5)
+    assert len(await executor.call(fast, None, "q", 2)) == 2
+    assert await executor.call(ProviderSpec("slow", slow, frozenset({"web"}), timeout=0.05), None, "q", 2) == []
+    assert await executor.call(ProviderSpec("broken", broken, frozenset({"web"})), None, "q", 2) == []
+
+    snapshot = executor.snapshot()
+    assert snapshot["fast"]["mean_yield"] == 2 and snapshot["fast"]["cost"] == 0.5
+    assert snapshot["slow"]["timeouts"] == 1 and snapshot["slow"]["results"] == 0
+    assert snapshot["broken"]["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_executor_limits_concurrent_calls_per_provider():
+    in_flight, peak = 0, 0
+
+    async def fetch(service, query, count):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return []
+
+    executor = ProviderExecutor({})
+    spec = ProviderSpec("limited", fetch, frozenset({"web"}), concurrency=2)
+    await asyncio.gather(*(executor.call(spec, None, "q", 1) for _ in range(6)))
+    assert peak == 2
+    assert executor.metrics["limited"].calls == 6
+
+
+@pytest.mark.asyncio
+async def test_social_plan_labels_results(db_session):
+    service = SearchService(db_session, executor=ProviderExecutor())
+    service.reddit_service.search_reddit = AsyncMock(return_value=[_result("thread")])
+    service.youtube_service.search_youtube = AsyncMock(side_effect=RuntimeError("quota"))
+    service.wikipedia_service.search_wikipedia = AsyncMock(return_value=[])
+    with patch.object(SearchService, "_duckduckgo_search", new_callable=AsyncMock) as duckduckgo:
+        duckduckgo.return_value = []
+        results = await service.multi_source_search("thread", max_results=3, focus_mode="social")
+
+    assert [(r["provider"], r["source_type"]) for r in results] == [("reddit", "social")]
+    service.reddit_service.search_reddit.assert_awaited_once_with("thread", max_results=3)
+    # The site-scoped searches, YouTube included (one combined query), and the open web filled
+    # in while the pool was short; with nothing from the combined query no site is asked again
+    assert [call.args[0] for call in duckduckgo.await_args_list] == [
+        "thread (site:youtube.com OR site:youtu.be OR site:linkedin.com OR site:twitter.com OR site:x.com"
+        " OR site:github.com)",
+        "thread",
+    ]
+    service.youtube_service.search_youtube.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_site_searches_share_one_query_and_top_up_short_sites(db_session):
+    service = SearchService(db_session, executor=ProviderExecutor())
+    service.reddit_service.search_reddit = AsyncMock(return_value=[])
+    service.youtube_service.search_youtube = AsyncMock(return_value=[])
+
+    async def duckduckgo(query, count):
+        if "OR" in query:
+            return ([_result(f"profile{i}", "www.linkedin.com") for i in range(4)] + [
+                _result("video", "www.youtube.com"), _result("post", "x.com"), _result("off-site", "example.org")
+            ])
+        return [_result(f"repo{i}", "github.com") for i in range(count)]
+
+    with patch.object(SearchService, "_duckduckgo_search", side_effect=duckduckgo) as search:
+        results = await service.multi_source_search("asyncio", max_results=6, focus_mode="social")
+        calls = [call.args for call in search.call_args_list]
+
+    # 12 wanted over four sites: one combined query for a quota of 3 each, then GitHub,
+    # which came back empty, is asked again; that fills the pool, so YouTube and Twitter are not
+    assert calls == [
+        ("asyncio (site:youtube.com OR site:youtu.be OR site:linkedin.com OR site:twitter.com OR site:x.com"
+         " OR site:github.com)", 12),
+        ("asyncio site:github.com", 3),
+    ]
+    service.youtube_service.search_youtube.assert_not_awaited()
+    assert len(results) == 6 and {r["provider"] for r in results} <= {"youtube", "linkedin", "twitter", "github"}
+    assert all(r["source_type"] == "social" for r in results)
+
+
+@pytest.mark.asyncio
+async def test_combined_site_query_keeps_youtube_video_ids():
+    executor = ProviderExecutor()
+    service = AsyncMock()
+    service._duckduckgo_search.return_value = [
+        {"title": "Talk", "url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42", "snippet": ""},
+        {"title": "Clip", "url": "https://youtu.be/abc123?si=share", "snippet": ""},
+        {"title": "Profile", "url": "https://www.linkedin.com/in/someone", "snippet": ""},
+    ]
+
+    results = await executor._run_site_group(
+        service, [PROVIDERS["youtube"], PROVIDERS["linkedin"]], "q", max_results=3, remaining=4, collected=0
+    )
+
+    assert [(r["provider"], r.get("video_id")) for r in results] == [
+        ("youtube", "dQw4w9WgXcQ"), ("youtube", "abc123"), ("linkedin", None)
+    ]
+
+
+def test_negative_cache_expires_each_outcome_separately():
+    now = [0.0]
+    cache = NegativeCache(empty_ttl=300, error_ttl=60, max_entries=2, clock=lambda: now[0])
+    cache.put("reddit", "q", EMPTY)
+    cache.put("duckduckgo", "q", ERROR)
+    assert (cache.get("reddit", "q"), cache.get("duckduckgo", "q")) == (EMPTY, ERROR)
+
+    now[0] = 61
+    assert (cache.get("reddit", "q"), cache.get("duckduckgo", "q")) == (EMPTY, None)
+
+    cache.put("youtube", "q", EMPTY)
+    cache.put("github", "q", EMPTY)
+    # Bounded: the oldest entry made room
+    assert cache.get("reddit", "q") is None and cache.get("github", "q") == EMPTY
+
+    NegativeCache(empty_ttl=0, error_ttl=60).put("reddit", "q", EMPTY)
+
+
+@pytest.mark.asyncio
+async def test_repeated_misses_skip_the_provider():
+    now = [0.0]
+    executor = ProviderExecutor({}, NegativeCache(empty_ttl=300, error_ttl=60, clock=lambda: now[0]))
+    empty = ProviderSpec("empty", AsyncMock(return_value=[]), frozenset({"web"}))
+    failing = ProviderSpec("failing", AsyncMock(side_effect=RuntimeError("rate limited")), frozenset({"web"}))
+
+    for _ in range(3):
+        assert await executor.call(empty, None, "q", 5) == []
+        assert await executor.call(failing, None, "q", 5) == []
+    assert empty.fetch.await_count == 1 and failing.fetch.await_count == 1
+    assert executor.metrics["failing"].cached_misses == 2
+    # Another query is not affected
+    await executor.call(empty, None, "other", 5)
+    assert empty.fetch.await_count == 2
+
+    # Errors are retried sooner than empty answers
+    now[0] = 61
+    await executor.call(empty, None, "q", 5)
+    await executor.call(failing, None, "q", 5)
+    assert empty.fetch.await_count == 2 and failing.fetch.await_count == 2
+
+
+def _stats(samples=MIN_SAMPLES, latency=1.0, error_rate=0.0, mean_yield=5.0):
+    return RollingStats(samples, latency, error_rate, mean_yield)
+
+
+def test_rolling_stats_follow_recent_calls():
+    stats = RollingStats()
+    for _ in range(MIN_SAMPLES - 1):
+        stats.record(0.4, False, 8)
+    assert stats.state == UNSAMPLED and stats.latency == pytest.approx(0.4)
+
+    stats.record(0.4, False, 8)
+    assert stats.state == HEALTHY
+    # A run of failures degrades, then fails the provider; successes bring it back
+    for _ in range(4):
+        stats.record(10.0, True, 0)
+    assert stats.state == DEGRADED
+    for _ in range(7):
+        stats.record(10.0, True, 0)
+    assert stats.state == FAILING
+    for _ in range(6):
+        stats.record(0.4, False, 8)
+    assert stats.state == HEALTHY
+
+
+def test_plans_are_reordered_by_rolling_stats():
+    executor = ProviderExecutor()
+    for name in ("youtube", "linkedin", "twitter", "github"):
+        executor.stats[("social", name)] = _stats(latency=4.0)
+    executor.stats[("social", "wikipedia")] = _stats(latency=0.5)
+    executor.stats[("social", "duckduckgo")] = _stats(error_rate=0.6)
+    # Stats of another mode do not count
+    executor.stats[("web", "reddit")] = _stats(error_rate=1.0)
+
+    ordered = executor.order("social", plan_steps("social"))
+
+    # Wikipedia and the site group swap places, DuckDuckGo goes last
+    assert [spec.name for _, spec in ordered] == [
+        "reddit", "wikipedia", "youtube", "linkedin", "twitter", "github", "duckduckgo"
+    ]
+
+
+def test_site_groups_are_ordered_as_one_unit():
+    executor = ProviderExecutor()
+    # One failing member does not break the group up or move it
+    executor.stats[("social", "twitter")] = _stats(error_rate=1.0)
+    assert [spec.name for _, spec in executor.order("social", plan_steps("social"))] == [
+        "reddit", "youtube", "linkedin", "twitter", "github", "wikipedia", "duckduckgo"
+    ]
+
+    # Once every member is failing the whole group moves to the end of its stage
+    for name in ("youtube", "linkedin"):
+        executor.stats[("social", name)] = _stats(error_rate=1.0)
+    executor.stats[("social", "github")] = _stats(error_rate=0.6)
+    assert [spec.name for _, spec in executor.order("social", plan_steps("social"))] == [
+        "reddit", "wikipedia", "duckduckgo", "youtube", "linkedin", "twitter", "github"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_combined_site_query_is_skipped_once_its_members_fail(db_session):
+    service = SearchService(db_session, executor=ProviderExecutor(exploration_rate=0))
+    service.reddit_service.search_reddit = AsyncMock(return_value=[])
+    service.youtube_service.search_youtube = AsyncMock(return_value=[])
+    service.wikipedia_service.search_wikipedia = AsyncMock(return_value=[])
+
+    with patch.object(SearchService, "_duckduckgo_search", side_effect=RuntimeError("rate limited")) as search:
+        for i in range(8):
+            await service.multi_source_search(f"asyncio {i}", max_results=6, focus_mode="social")
+        combined = [call.args[0] for call in search.call_args_list if " OR " in call.args[0]]
+
+    # The combined query's failures count for every site, so after five they are all skipped
+    assert len(combined) == 5
+    sites = ("youtube", "linkedin", "twitter", "github")
+    assert {service.executor.state("social", PROVIDERS[name]) for name in sites} == {FAILING}
+
+
+class _Dice:
+    def __init__(self, value):
+        self.value = value
+
+    def random(self):
+        return self.value
+
+
+@pytest.mark.asyncio
+async def test_failing_and_slow_providers_are_skipped_unless_exploring():
+    providers = {
+        "down": ProviderSpec("down", AsyncMock(return_value=[_result("a")]), frozenset({"web"}), priority=1),
+        "slow": ProviderSpec("slow", AsyncMock(return_value=[_result("b")]), frozenset({"web"}), priority=2),
+        "ok": ProviderSpec("ok", AsyncMock(return_value=[_result("c")]), frozenset({"web"}), priority=3),
+    }
+    executor = ProviderExecutor(providers, deadline=5.0, exploration_rate=0.1, rng=_Dice(0.5))
+    executor.stats[("web", "down")] = _stats(error_rate=0.95)
+    executor.stats[("web", "slow")] = _stats(latency=30.0)
+
+    results = await executor.run(None, "web", "q", max_results=10, fetch_size=10)
+    assert [r["provider"] for r in results] == ["ok"]
+    assert executor.stats[("web", "ok")].samples == 1
+
+    # Exploring: both get a request, and their statistics start to recover
+    executor._random = _Dice(0.05)
+    results = await executor.run(None, "web", "q2", max_results=10, fetch_size=10)
+    assert sorted(r["provider"] for r in results) == ["down", "ok", "slow"]
+    assert executor.stats[("web", "down")].error_rate < 0.95
+
+
+@pytest.mark.asyncio
+async def test_no_provider_starts_after_the_deadline():
+    async def slow(service, query, count):
+        await asyncio.sleep(0.5)
+        return [_result("late")]
+
+    providers = {
+        "first": ProviderSpec("first", slow, frozenset({"web"}), priority=1),
+        "second": ProviderSpec("second", AsyncMock(return_value=[_result("b")]), frozenset({"web"}), priority=2),
+    }
+    executor = ProviderExecutor(providers, deadline=0.3)
+    assert await executor.run(None, "web", "q", max_results=10, fetch_size=10) == []
+    providers["second"].fetch.assert_not_awaited()
+    # The first call was cut off by the deadline: that is not held against the provider
+    assert executor.metrics["first"].calls == 1 and executor.metrics["first"].timeouts == 0
+    assert executor.stats.get(("web", "first")) is None
+    assert executor.negative_cache.get("first", "q") is None
+
+    # Without the deadline the same query reaches the provider again
+    executor.deadline = 0
+    assert [r["provider"] for r in await executor.run(None, "web", "q", max_results=1, fetch_size=1)] == ["first"]
+    assert executor.stats[("web", "first")].error_rate == 0
+
+
+@pytest.mark.asyncio
+async def test_no_call_starts_without_useful_time_left():
+    fetch = AsyncMock(return_value=[_result("a")])
+    executor = ProviderExecutor({"only": ProviderSpec("only", fetch, frozenset({"web"}))})
+    deadline = asyncio.get_running_loop().time() + MIN_CALL_SECONDS / 2
+
+    assert await executor.call(executor.providers["only"], None, "q", 5, "web", deadline) == []
+    fetch.assert_not_awaited()
+    assert executor.negative_cache.get("only", "q") is None
+
+
+@pytest.mark.asyncio
+async def test_provider_stats_endpoint_requires_admin(client, monkeypatch):
+    from app.core.config import settings
+    from app.services.search_providers import provider_executor
+
+    provider_executor.stats[("web", "duckduckgo")] = _stats(latency=0.4)
+    provider_executor.metrics["duckduckgo"] = ProviderMetrics(calls=5, results=25, latency_seconds=2.0, cost=2.5)
+
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    assert (await client.get("/api/search/providers/stats")).status_code == 401
+
+    response = await client.get("/api/search/providers/stats", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["modes"] == [{
+        "mode": "web", "provider": "duckduckgo", "samples": MIN_SAMPLES, "latency_seconds": 0.4,
+        "error_rate": 0.0, "mean_yield": 5.0, "state": HEALTHY,
+    }]
+    assert body["totals"][0]["provider"] == "duckduckgo" and body["totals"][0]["mean_latency"] == 0.4
+    assert set(body["speculation"]) == {"in_flight", "started", "used", "discarded"}
+    assert set(body["prefetch"]) == {"queued", "completed", "dropped", "cancelled"}
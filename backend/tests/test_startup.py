@@ -0,0 +1,42 @@
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous ceiling for `import app.main` in a fresh interpreter; eager LiteLLM imports blow well past it
+IMPORT_BUDGET_SECONDS = float(os.environ.get("STARTUP_IMPORT_BUDGET_SECONDS", "3.0"))
+
+HEAVY_MODULES = ["litellm", "openai", "anthropic", "tiktoken", "youtube_transcript_api"]
+
+
+def _import_app_in_subprocess() -> dict:
+    script = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import app.main\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def test_app_import_does_not_load_llm_sdks():
+    """Importing the app must not pull in LiteLLM or provider SDKs."""
+    report = _import_app_in_subprocess()
+    assert report["heavy"] == []
+
+
+def test_app_import_within_budget():
+    """Guard against import-time regressions that delay /health."""
+    report = _import_app_in_subprocess()
+    assert report["elapsed"] < IMPORT_BUDGET_SECONDS
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.database import Base, get_db, get_session_factory
+from app.core.write_queue import WriteQueue, get_write_queue
+from app.main import app
+from app.models import LLMModel
+
+CONCURRENT_STREAMS = 6
+CHUNK_DELAY = 0.1
+CHUNKS = 5
+
+
+class FakeLiteLLM:
+    """Streams a few chunks slowly, like a real provider"""
+
+    async def acompletion(self, **params):
+        if params.get("stream"):
+            return self._stream()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Tell me more"))])
+
+    async def _stream(self):
+        for _ in range(CHUNKS):
+            await asyncio.sleep(CHUNK_DELAY)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="token "))])
+
+
+@pytest.mark.asyncio
+async def test_concurrent_streams_not_limited_by_pool_size(tmp_path):
+    # A single pooled connection that is never released would time out every other stream
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'load.db'}", pool_size=1, max_overflow=0, pool_timeout=1
+    )
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessions() as session:
+        session.add(LLMModel(model_name="fake/model", api_key="key"))
+        await session.commit()
+
+    queue = WriteQueue(sessions)
+    await queue.start()
+
+    async def no_request_session():
+        raise AssertionError("the stream must not depend on a request-scoped session")
+        yield
+
+    app.dependency_overrides[get_db] = no_request_session
+    app.dependency_overrides[get_session_factory] = lambda: sessions
+    app.dependency_overrides[get_write_queue] = lambda: queue
+
+    search_results = [{"title": "Result", "url": "http://example.com", "snippet": "Snippet", "source_type": "web"}]
+    try:
+        with patch("app.services.llm_service.get_litellm", return_value=FakeLiteLLM()), \
+                patch("app.api.v1.chat.SearchService.multi_source_search", new=AsyncMock(return_value=search_results)):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                async def run_stream(i):
+                    events = []
+                    async with client.stream("POST", "/api/chat/stream", json={"query": f"q{i}", "model_id": 1}) as response:
+                        async for line in response.aiter_lines():
+                            if line.startswith("data: "):
+                                events.append(json.loads(line[6:]))
+                    return events
+
+                start = time.perf_counter()
+                streams = await asyncio.gather(*(run_stream(i) for i in range(CONCURRENT_STREAMS)))
+                elapsed = time.perf_counter() - start
+    finally:
+        app.dependency_overrides.clear()
+        await queue.stop()
+        await engine.dispose()
+
+    for events in streams:
+        assert events[-1]["type"] == "done"
+        assert not any(event.get("type") == "error" for event in events)
+
+    # Streams overlap instead of queueing behind the single connection
+    single_stream = CHUNKS * CHUNK_DELAY
+    assert elapsed < single_stream * CONCURRENT_STREAMS / 2
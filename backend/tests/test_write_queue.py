@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from sqlalchemy import event, func, select
+from app.models import Conversation
+
+
+def _add_conversation(title):
+    async def operation(session):
+        conversation = Conversation(title=title)
+        session.add(conversation)
+        await session.flush()
+        return conversation.id
+    return operation
+
+
+async def _failing_operation(session):
+    raise ValueError("boom")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_share_commits(db_engine, db_session, write_queue):
+    commits = []
+    event.listen(db_engine.sync_engine, "commit", lambda conn: commits.append(conn))
+
+    ids = await asyncio.gather(*(write_queue.submit(_add_conversation(f"c{i}")) for i in range(20)))
+
+    assert len(set(ids)) == 20
+    assert len(commits) < 20
+    count = (await db_session.execute(select(func.count(Conversation.id)))).scalar()
+    assert count == 20
+
+
+@pytest.mark.asyncio
+async def test_failed_operation_does_not_discard_its_group(db_session, write_queue):
+    results = await asyncio.gather(
+        write_queue.submit(_add_conversation("kept-1")),
+        write_queue.submit(_failing_operation),
+        write_queue.submit(_add_conversation("kept-2")),
+        return_exceptions=True,
+    )
+
+    assert isinstance(results[1], ValueError)
+    titles = (await db_session.execute(select(Conversation.title).order_by(Conversation.id))).scalars().all()
+    assert titles == ["kept-1", "kept-2"]
+
+
+@pytest.mark.asyncio
+async def test_sequential_submits_keep_order(db_session, write_queue):
+    for i in range(5):
+        await write_queue.submit(_add_conversation(f"ordered-{i}"))
+
+    titles = (await db_session.execute(select(Conversation.title).order_by(Conversation.id))).scalars().all()
+    assert titles == [f"ordered-{i}" for i in range(5)]